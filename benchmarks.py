@@ -0,0 +1,350 @@
+import argparse
+import contextlib
+import importlib
+import io
+import json
+import multiprocessing
+import os
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+import xml.etree.ElementTree as ET
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+try:
+    import resource
+except ImportError:
+    # Windows has no resource module; peak RSS is reported as None there
+    resource = None
+
+import pandas as pd
+
+from geography import VALID_REGIONS, GeographyIndex
+from template_all import (METRO_REGIONS, PAC_TO_REGION, REGION_ALIASES, REGION_DISPLAY_TO_FULL,
+                          create_region_templates, generate_variants, plan_pac_variants)
+
+# The real templates, benchmarked when they are present
+REAL_TEMPLATES = [
+    Path("telephone/templates/NSW Police Service Assessment Telephone.twb"),
+    Path("walkin/templates/NSW Police Service Assessment Walk-in.twb"),
+]
+
+# Synthetic workbook sizes: worksheets, Selected PAC members and categorical filters per worksheet.
+# "medium" is roughly the walk-in template today.
+SYNTHETIC_SIZES = {
+    'small': {'worksheets': 25, 'members': 30, 'filters': 2},
+    'medium': {'worksheets': 100, 'members': 70, 'filters': 3},
+    'large': {'worksheets': 400, 'members': 250, 'filters': 6},
+    'xlarge': {'worksheets': 1600, 'members': 250, 'filters': 6},
+}
+
+# xlarge (~80 MB) is for checking the streaming paths stay flat; ask for it with --sizes
+DEFAULT_SIZES = ['small', 'medium', 'large']
+
+# Rewrite paths measured against every workbook
+CASES = ('create_pac_templates', 'create_region_templates', 'change_selected_pac', 'validate_filter_data',
+         'stream_pac_templates', 'stream_selected_pac')
+
+# Variants generated per case; timings are also reported per variant
+VARIANTS = 6
+
+RESULTS_PATH = Path("benchmark_results.json")
+BASELINE_PATH = Path("benchmark_baseline.json")
+
+# A case regresses when it is this much slower, or uses this much more peak memory, than the baseline
+TIME_THRESHOLD = 0.25
+MEMORY_THRESHOLD = 0.15
+
+SYNTHETIC_DATASOURCE = 'federated.synthetic'
+
+def synthetic_pacs(members):
+    """Return {PAC: region} for a synthetic workbook: the real PACs first, then numbered extras"""
+    pac_to_region = dict(list(PAC_TO_REGION.items())[:members])
+    for number in range(members - len(pac_to_region)):
+        pac_to_region[f"Synthetic {number + 1:04d}"] = VALID_REGIONS[number % len(VALID_REGIONS)]
+    return pac_to_region
+
+def area_member(pac, region):
+    return f'"{"PAC" if region in METRO_REGIONS else "PD"} - {pac}"'
+
+def parameter_column(parent, number, caption, domain, current):
+    """Add a list parameter column with its aliases and members, as Tableau writes it"""
+    value, alias = current
+    column = ET.SubElement(parent, 'column', {
+        'alias': alias, 'caption': caption, 'datatype': 'string', 'name': f'[Parameter {number}]',
+        'param-domain-type': 'list', 'role': 'measure', 'type': 'nominal', 'value': value})
+    ET.SubElement(column, 'calculation', {'class': 'tableau', 'formula': value})
+    aliases = ET.SubElement(column, 'aliases')
+    members = ET.SubElement(column, 'members')
+    for key, member_alias in domain:
+        ET.SubElement(aliases, 'alias', {'key': key, 'value': member_alias})
+        ET.SubElement(members, 'member', {'alias': member_alias, 'value': key})
+    return column
+
+def synthetic_workbook(worksheets, members, filters):
+    """
+    Return (.twb bytes, {PAC: region}) for a generated workbook of the given size.
+
+    It has the structures the rewrite paths touch: Selected PAC/Region parameters (also
+    copied into every worksheet's dependencies, as Tableau does), an Excel connection,
+    categorical Areas PAC/Areas Region filters, region tuple values, dashboards and windows.
+    """
+    pac_to_region = synthetic_pacs(members)
+    pac_domain = [(area_member(pac, region), pac) for pac, region in pac_to_region.items()]
+    region_domain = [(f'"{region}"', REGION_ALIASES.get(region, region)) for region in VALID_REGIONS]
+    first_pac, first_region = next(iter(pac_to_region.items()))
+    current_pac = (area_member(first_pac, first_region), first_pac)
+    current_region = (f'"{first_region}"', REGION_ALIASES.get(first_region, first_region))
+
+    root = ET.Element('workbook', {'source-build': '2024.3.0', 'version': '18.1'})
+    datasources = ET.SubElement(root, 'datasources')
+    parameters = ET.SubElement(datasources, 'datasource', {'hasconnection': 'false', 'inline': 'true',
+                                                            'name': 'Parameters', 'version': '18.1'})
+    parameter_column(parameters, 1, 'Selected PAC', pac_domain, current_pac)
+    parameter_column(parameters, 2, 'Selected Region', region_domain, current_region)
+    data = ET.SubElement(datasources, 'datasource', {'caption': 'Single Response+', 'name': SYNTHETIC_DATASOURCE})
+    federated = ET.SubElement(data, 'connection', {'class': 'federated'})
+    named = ET.SubElement(ET.SubElement(federated, 'named-connections'), 'named-connection', {'name': 'excel'})
+    ET.SubElement(named, 'connection', {'class': 'excel-direct', 'filename': 'walkin/output_walkin.xlsx'})
+    for name in ('Areas PAC', 'Areas Region', 'Survey ID', 'Overall Score'):
+        ET.SubElement(data, 'column', {'caption': name, 'datatype': 'string', 'name': f'[{name}]',
+                                       'role': 'dimension', 'type': 'nominal'})
+
+    sheet_names = [f"Sheet {number + 1}" for number in range(worksheets)]
+    worksheets_elem = ET.SubElement(root, 'worksheets')
+    for number, name in enumerate(sheet_names):
+        worksheet = ET.SubElement(worksheets_elem, 'worksheet', {'name': name})
+        view = ET.SubElement(ET.SubElement(worksheet, 'table'), 'view')
+        view_sources = ET.SubElement(view, 'datasources')
+        ET.SubElement(view_sources, 'datasource', {'name': 'Parameters'})
+        ET.SubElement(view_sources, 'datasource', {'caption': 'Single Response+', 'name': SYNTHETIC_DATASOURCE})
+        dependencies = ET.SubElement(view, 'datasource-dependencies', {'datasource': 'Parameters'})
+        parameter_column(dependencies, 1, 'Selected PAC', pac_domain, current_pac)
+        parameter_column(dependencies, 2, 'Selected Region', region_domain, current_region)
+        for index in range(filters):
+            field = 'Areas PAC' if index % 2 == 0 else 'Areas Region'
+            member = current_pac[0] if field == 'Areas PAC' else current_region[0]
+            filter_elem = ET.SubElement(view, 'filter', {
+                'class': 'categorical', 'column': f'[{SYNTHETIC_DATASOURCE}].[none:{field}:nk]',
+                'filter-group': str(index + 1)})
+            ET.SubElement(filter_elem, 'groupfilter', {'function': 'member', 'level': f'[none:{field}:nk]',
+                                                       'member': member})
+        sort = ET.SubElement(view, 'manual-sort', {'column': f'[{SYNTHETIC_DATASOURCE}].[none:Areas Region:nk]'})
+        ET.SubElement(ET.SubElement(sort, 'dictionary'), 'bucket').text = current_region[0]
+        tuple_elem = ET.SubElement(ET.SubElement(view, 'slices'), 'tuple')
+        ET.SubElement(tuple_elem, 'value').text = current_region[0]
+        ET.SubElement(worksheet, 'simple-id', {'uuid': f'{{00000000-0000-0000-0000-{number:012d}}}'})
+
+    dashboards = ET.SubElement(root, 'dashboards')
+    for page in range(4):
+        dashboard = ET.SubElement(dashboards, 'dashboard', {'name': f'Page {page + 1}'})
+        zones = ET.SubElement(dashboard, 'zones')
+        for name in sheet_names[page::4]:
+            ET.SubElement(zones, 'zone', {'name': name, 'h': '1000', 'w': '1000', 'x': '0', 'y': '0'})
+    windows = ET.SubElement(root, 'windows')
+    for name in sheet_names:
+        ET.SubElement(windows, 'window', {'class': 'worksheet', 'name': name})
+    for page in range(4):
+        ET.SubElement(windows, 'window', {'class': 'dashboard', 'name': f'Page {page + 1}'})
+
+    ET.indent(root, space='  ')
+    return ET.tostring(root, encoding='utf-8', xml_declaration=True), pac_to_region
+
+def template_pacs(template_path):
+    """{PAC: region} for the areas of a real template that have a known region"""
+    return dict(GeographyIndex(template_path).area_regions)
+
+def bench_create_pac_templates(template, pac_to_region, variants):
+    """The create_pac_templates render path for the first few PACs (discovery is replaced by the mapping)"""
+    jobs = plan_pac_variants(template, sorted(pac_to_region)[:variants], slices=False, pac_to_region=pac_to_region)
+    generate_variants(jobs, force=True)
+    return len(jobs)
+
+def bench_stream_pac_templates(template, pac_to_region, variants):
+    """bench_create_pac_templates through the streaming rewriter"""
+    jobs = plan_pac_variants(template, sorted(pac_to_region)[:variants], slices=False, pac_to_region=pac_to_region)
+    generate_variants(jobs, force=True, stream=True)
+    return len(jobs)
+
+def bench_create_region_templates(template, pac_to_region, variants):
+    return len(create_region_templates(template, list(REGION_DISPLAY_TO_FULL)[:variants], force=True))
+
+def bench_change_selected_pac(template, pac_to_region, variants):
+    automation = importlib.import_module('tableau-automation')
+    for pac, region in list(pac_to_region.items())[:variants]:
+        automation.change_selected_pac(template, pac, region)
+    return variants
+
+def bench_stream_selected_pac(template, pac_to_region, variants):
+    automation = importlib.import_module('tableau-automation')
+    for pac, region in list(pac_to_region.items())[:variants]:
+        automation.change_selected_pac(template, pac, region, stream=True)
+    return variants
+
+def bench_validate_filter_data(template, pac_to_region, variants):
+    automation = importlib.import_module('tableau-automation')
+    rows = [{'Area': pac, 'Region': region} for pac, region in pac_to_region.items()]
+    filter_path = Path(template).with_name("filter.xlsx")
+    pd.DataFrame(rows).to_excel(filter_path, index=False)
+    for _ in range(variants):
+        automation.validate_filter_data(filter_path, template)
+        # Each call should pay for its own index, as a fresh run would
+        importlib.import_module('geography')._INDEXES.clear()
+    return variants
+
+BENCHMARKS = {
+    'create_pac_templates': bench_create_pac_templates,
+    'create_region_templates': bench_create_region_templates,
+    'change_selected_pac': bench_change_selected_pac,
+    'validate_filter_data': bench_validate_filter_data,
+    'stream_pac_templates': bench_stream_pac_templates,
+    'stream_selected_pac': bench_stream_selected_pac,
+}
+
+def peak_rss_mb():
+    """Peak resident set size of this process in MB, or None where it can't be read"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and kilobytes elsewhere
+    return peak / 1e6 if sys.platform == 'darwin' else peak / 1e3
+
+def run_case(workdir, case, template, pac_to_region, variants, trace):
+    """Run one case in a fresh process; returns its timings and memory figures"""
+    os.chdir(workdir)
+    # Import the main script up front: its imports alone are ~18 MB and would swamp the figures
+    importlib.import_module('tableau-automation')
+    rss_before = peak_rss_mb()
+    if trace:
+        tracemalloc.start()
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        done = BENCHMARKS[case](template, pac_to_region, variants)
+    seconds = time.perf_counter() - start
+    result = {'seconds': seconds, 'variants': done, 'peak_rss_mb': peak_rss_mb(), 'base_rss_mb': rss_before}
+    if trace:
+        result['alloc_peak_mb'] = tracemalloc.get_traced_memory()[1] / 1e6
+        tracemalloc.stop()
+    return result
+
+def prepare_workdir(template_path, workdir):
+    """Copy a template (and its Region template) into a scratch folder laid out like the repo"""
+    template_path = Path(template_path)
+    target_dir = Path(workdir) / "templates"
+    target_dir.mkdir(parents=True, exist_ok=True)
+    target = target_dir / template_path.name
+    shutil.copy2(template_path, target)
+    region_template = template_path.with_name(f"{template_path.stem} Region.twb")
+    if region_template.exists():
+        shutil.copy2(region_template, target_dir / region_template.name)
+    return str(target.relative_to(workdir))
+
+def measure(name, template_path, pac_to_region, case, repeats=3, variants=VARIANTS):
+    """Median wall time and peak RSS over fresh-process repeats, plus one tracemalloc run"""
+    context = multiprocessing.get_context('spawn')
+    runs = []
+    for repeat in range(repeats + 1):
+        trace = repeat == repeats
+        with tempfile.TemporaryDirectory() as workdir:
+            template = prepare_workdir(template_path, workdir)
+            with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+                runs.append(pool.submit(run_case, workdir, case, template, pac_to_region, variants, trace).result())
+    timed, traced = runs[:-1], runs[-1]
+    seconds = sorted(run['seconds'] for run in timed)[len(timed) // 2]
+    done = timed[0]['variants']
+    rss = [run['peak_rss_mb'] for run in timed if run['peak_rss_mb'] is not None]
+    return {
+        'workbook': name,
+        'case': case,
+        'workbook_mb': Path(template_path).stat().st_size / 1e6,
+        'variants': done,
+        'seconds': seconds,
+        'seconds_per_variant': seconds / max(1, done),
+        'peak_rss_mb': max(rss) if rss else None,
+        'rss_growth_mb': max(run['peak_rss_mb'] - run['base_rss_mb'] for run in timed) if rss else None,
+        'alloc_peak_mb': traced['alloc_peak_mb'],
+    }
+
+def benchmark_workbooks(scratch_dir, sizes=SYNTHETIC_SIZES):
+    """Return [(name, template path, {PAC: region})] for the real templates present and each synthetic size"""
+    workbooks = []
+    for path in REAL_TEMPLATES:
+        if path.exists():
+            workbooks.append((path.stem, path, template_pacs(path)))
+        else:
+            print(f"Warning: {path} not found; benchmarking the synthetic workbooks only")
+    for size, scale in sizes.items():
+        data, pac_to_region = synthetic_workbook(**scale)
+        path = Path(scratch_dir) / f"Synthetic {size}.twb"
+        path.write_bytes(data)
+        path.with_name(f"{path.stem} Region.twb").write_bytes(data)
+        workbooks.append((f"synthetic-{size}", path, pac_to_region))
+    return workbooks
+
+def find_regressions(results, baseline, time_threshold=TIME_THRESHOLD, memory_threshold=MEMORY_THRESHOLD):
+    """Return a description of every case that is slower or bigger than the baseline allows"""
+    previous = {(entry['workbook'], entry['case']): entry for entry in baseline['results']}
+    regressions = []
+    for entry in results:
+        before = previous.get((entry['workbook'], entry['case']))
+        if before is None:
+            continue
+        label = f"{entry['workbook']} / {entry['case']}"
+        if entry['seconds_per_variant'] > before['seconds_per_variant'] * (1 + time_threshold):
+            regressions.append(f"{label}: {entry['seconds_per_variant'] * 1e3:.0f} ms per variant, "
+                               f"was {before['seconds_per_variant'] * 1e3:.0f} ms")
+        for field in ('peak_rss_mb', 'alloc_peak_mb'):
+            if entry[field] is not None and before.get(field) is not None \
+                    and entry[field] > before[field] * (1 + memory_threshold):
+                regressions.append(f"{label}: {field} {entry[field]:.1f}, was {before[field]:.1f}")
+    return regressions
+
+def print_results(results):
+    print(f"{'workbook':<48} {'case':<24} {'MB':>5} {'ms/variant':>10} {'peak RSS':>9} {'alloc MB':>9}")
+    for entry in results:
+        rss = f"{entry['peak_rss_mb']:.0f}" if entry['peak_rss_mb'] is not None else "-"
+        print(f"{entry['workbook']:<48} {entry['case']:<24} {entry['workbook_mb']:>5.2f} "
+              f"{entry['seconds_per_variant'] * 1e3:>10.1f} {rss:>9} {entry['alloc_peak_mb']:>9.1f}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the workbook rewrite paths on real and synthetic templates")
+    parser.add_argument("--sizes", nargs="*", choices=list(SYNTHETIC_SIZES), default=DEFAULT_SIZES,
+                        help="synthetic workbook sizes to include")
+    parser.add_argument("--cases", nargs="*", choices=CASES, default=list(CASES), help="rewrite paths to measure")
+    parser.add_argument("--repeats", type=int, default=3, help="timed runs per case (the median is kept)")
+    parser.add_argument("--variants", type=int, default=VARIANTS, help="variants generated per run")
+    parser.add_argument("--output", default=str(RESULTS_PATH), help="where to write the results JSON")
+    parser.add_argument("--baseline", default=str(BASELINE_PATH), help="results to compare against")
+    parser.add_argument("--save-baseline", action="store_true", help="store these results as the new baseline")
+    parser.add_argument("--time-threshold", type=float, default=TIME_THRESHOLD,
+                        help="allowed slowdown per variant before failing (0.25 = 25%%)")
+    parser.add_argument("--memory-threshold", type=float, default=MEMORY_THRESHOLD,
+                        help="allowed growth in peak memory before failing")
+    args = parser.parse_args()
+
+    results = []
+    with tempfile.TemporaryDirectory() as scratch_dir:
+        for name, path, pac_to_region in benchmark_workbooks(scratch_dir, {size: SYNTHETIC_SIZES[size] for size in args.sizes}):
+            for case in args.cases:
+                print(f"⏱️ {name}: {case}")
+                results.append(measure(name, path, pac_to_region, case, args.repeats, args.variants))
+
+    run = {'time': time.time(), 'python': sys.version.split()[0], 'platform': sys.platform, 'results': results}
+    Path(args.output).write_text(json.dumps(run, indent=2), encoding='utf-8')
+    print_results(results)
+    print(f"Results written to {args.output}")
+
+    if args.save_baseline:
+        Path(args.baseline).write_text(json.dumps(run, indent=2), encoding='utf-8')
+        print(f"✅ Baseline saved to {args.baseline}")
+    elif Path(args.baseline).exists():
+        regressions = find_regressions(results, json.loads(Path(args.baseline).read_text(encoding='utf-8')),
+                                       args.time_threshold, args.memory_threshold)
+        for regression in regressions:
+            print(f"❌ Regression: {regression}")
+        if regressions:
+            raise SystemExit(1)
+        print(f"✅ No regressions against {args.baseline}")
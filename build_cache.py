@@ -0,0 +1,73 @@
+import hashlib
+import json
+import os
+from pathlib import Path
+
+# Manifest of generated workbooks, kept next to the scripts
+MANIFEST_PATH = Path(".build_manifest.json")
+
+# Bump when the variant generation logic changes output for the same inputs
+CACHE_VERSION = 1
+
+def hash_bytes(data):
+    """Return the sha256 hex digest of some bytes"""
+    return hashlib.sha256(data).hexdigest()
+
+def hash_file(path, chunk_size=1 << 20):
+    """Return the sha256 hex digest of a file, read in chunks"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def variant_key(job, template_hash, splice):
+    """Return the cache key for a job: template content plus every parameter that shapes the output"""
+    params = {key: value for key, value in job.items() if key not in ('template', 'output')}
+    payload = json.dumps([CACHE_VERSION, template_hash, splice, params], sort_keys=True)
+    return hash_bytes(payload.encode('utf-8'))
+
+def file_stamp(path):
+    """Return (size, mtime_ns) for a file, or None if it does not exist"""
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return [stat.st_size, stat.st_mtime_ns]
+
+class BuildManifest:
+    """Maps each output workbook to the key it was built from and the file stamp written"""
+
+    def __init__(self, path=MANIFEST_PATH):
+        self.path = Path(path)
+        self.entries = {}
+        if self.path.exists():
+            try:
+                self.entries = json.loads(self.path.read_text(encoding='utf-8'))
+            except (json.JSONDecodeError, OSError) as e:
+                print(f"Warning: Ignoring unreadable build manifest {self.path}: {e}")
+        # {kind: [hits, misses]}, so data slices don't inflate the workbook figures
+        self.counts = {}
+
+    def is_fresh(self, output_path, key, kind='workbook'):
+        """Return True if the output exists unchanged since it was built from this key"""
+        entry = self.entries.get(str(output_path))
+        fresh = entry is not None and entry['key'] == key and entry['stamp'] == file_stamp(output_path)
+        self.counts.setdefault(kind, [0, 0])[0 if fresh else 1] += 1
+        return fresh
+
+    def record(self, output_path, key):
+        """Remember the key and the stamp of a freshly written output"""
+        self.entries[str(output_path)] = {'key': key, 'stamp': file_stamp(output_path)}
+
+    def save(self):
+        """Write the manifest atomically"""
+        temp_path = self.path.with_suffix('.tmp')
+        temp_path.write_text(json.dumps(self.entries, indent=1, sort_keys=True), encoding='utf-8')
+        os.replace(temp_path, self.path)
+
+    def summary(self):
+        """Return a one-line hit/miss summary, per kind of output"""
+        counts = self.counts or {'workbook': [0, 0]}
+        return "Build cache: " + "; ".join(f"{kind}s {hits} hit(s), {misses} miss(es)"
+                                           for kind, (hits, misses) in counts.items())
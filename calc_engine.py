@@ -0,0 +1,779 @@
+import argparse
+import operator
+import re
+import time
+import xml.etree.ElementTree as ET
+
+import numpy as np
+import pandas as pd
+
+from data_cache import read_sheets
+from data_slices import resolve_column
+from template_all import SERVICE_DATA_PATHS, get_service_type
+
+class UnsupportedFormula(Exception):
+    """A calculation uses syntax or semantics the evaluator does not translate"""
+
+class TableCalculation(UnsupportedFormula):
+    """A calculation uses a table calculation (TOTAL, WINDOW_SUM, ...), which needs the worksheet layout"""
+
+# A // comment runs to the end of the line; strings and [fields] may contain '//' themselves
+COMMENT_RE = re.compile(r"""("(?:[^"]|"")*"|'(?:[^']|'')*'|\[(?:[^\]]|\]\])*\])|//[^\r\n]*""")
+
+TOKEN_RE = re.compile(r"""
+    (?P<space>\s+)
+  | (?P<field>\[(?:[^\]]|\]\])*\])
+  | (?P<string>"(?:[^"]|"")*"|'(?:[^']|'')*')
+  | (?P<number>\d+\.?\d*(?:[eE][-+]?\d+)?)
+  | (?P<op><=|>=|<>|!=|==|[-+*/%=<>(),{}:.])
+  | (?P<name>[A-Za-z_][A-Za-z0-9_]*)
+""", re.VERBOSE)
+
+KEYWORDS = {'IF', 'THEN', 'ELSEIF', 'ELSE', 'END', 'CASE', 'WHEN', 'AND', 'OR', 'NOT', 'FIXED',
+            'TRUE', 'FALSE', 'NULL'}
+
+AGGREGATES = {
+    'SUM': 'sum',
+    'AVG': 'mean',
+    'MIN': 'min',
+    'MAX': 'max',
+    'MEDIAN': 'median',
+    'COUNT': 'count',
+    'COUNTD': 'nunique',
+    # The single value of a group, or NULL when the group has several
+    'ATTR': lambda values: values.iloc[0] if values.nunique(dropna=False) == 1 else np.nan,
+}
+
+# Table calculations depend on the worksheet's partitioning, which a formula alone doesn't have
+TABLE_CALCULATIONS = {'TOTAL', 'WINDOW_SUM', 'WINDOW_AVG', 'RUNNING_SUM', 'INDEX', 'RANK', 'LOOKUP', 'SIZE'}
+
+COMPARISONS = {'=': 'eq', '==': 'eq', '<>': 'ne', '!=': 'ne', '<': 'lt', '>': 'gt', '<=': 'le', '>=': 'ge'}
+
+def strip_comments(formula):
+    """Remove // comments from a formula, leaving strings and field names alone"""
+    return COMMENT_RE.sub(lambda match: match.group(1) or "", formula)
+
+def tokenize(formula):
+    """Split a Tableau formula into (kind, text) tokens, dropping comments"""
+    formula = strip_comments(formula)
+    tokens = []
+    position = 0
+    while position < len(formula):
+        match = TOKEN_RE.match(formula, position)
+        if match is None:
+            raise UnsupportedFormula(f"Unexpected character {formula[position]!r} at {position}")
+        position = match.end()
+        kind = match.lastgroup
+        text = match.group()
+        if kind == 'space':
+            continue
+        if kind == 'name' and text.upper() in KEYWORDS:
+            kind, text = 'keyword', text.upper()
+        tokens.append((kind, text))
+    return tokens
+
+class Parser:
+    """
+    Recursive-descent parser for the subset of the Tableau calculation language the templates use.
+
+    Nodes are tuples: ('lit', value), ('field', name), ('param', name), ('call', NAME, args),
+    ('op', op, left, right), ('not', node), ('neg', node), ('if', [(cond, value), ...], else)
+    and ('fixed', [dimension names], body).
+    """
+
+    def __init__(self, formula):
+        self.tokens = tokenize(formula)
+        self.position = 0
+
+    def peek(self, offset=0):
+        index = self.position + offset
+        return self.tokens[index] if index < len(self.tokens) else (None, None)
+
+    def take(self, text=None):
+        kind, value = self.peek()
+        if kind is None or (text is not None and value != text):
+            raise UnsupportedFormula(f"Expected {text or 'a token'} but found {value!r}")
+        self.position += 1
+        return kind, value
+
+    def accept(self, text):
+        if self.peek()[1] == text:
+            self.position += 1
+            return True
+        return False
+
+    def parse(self):
+        node = self.expression()
+        if self.peek()[0] is not None:
+            raise UnsupportedFormula(f"Unexpected {self.peek()[1]!r} after end of expression")
+        return node
+
+    def expression(self):
+        node = self.conjunction()
+        while self.accept('OR'):
+            node = ('op', 'OR', node, self.conjunction())
+        return node
+
+    def conjunction(self):
+        node = self.negation()
+        while self.accept('AND'):
+            node = ('op', 'AND', node, self.negation())
+        return node
+
+    def negation(self):
+        if self.accept('NOT'):
+            return ('not', self.negation())
+        return self.comparison()
+
+    def comparison(self):
+        node = self.additive()
+        while self.peek()[1] in COMPARISONS:
+            op = self.take()[1]
+            node = ('op', COMPARISONS[op], node, self.additive())
+        return node
+
+    def additive(self):
+        node = self.multiplicative()
+        while self.peek()[1] in ('+', '-'):
+            op = self.take()[1]
+            node = ('op', op, node, self.multiplicative())
+        return node
+
+    def multiplicative(self):
+        node = self.unary()
+        while self.peek()[1] in ('*', '/', '%'):
+            op = self.take()[1]
+            node = ('op', op, node, self.unary())
+        return node
+
+    def unary(self):
+        if self.accept('-'):
+            return ('neg', self.unary())
+        return self.primary()
+
+    def primary(self):
+        kind, text = self.take()
+        if kind == 'number':
+            return ('lit', float(text) if any(c in text for c in '.eE') else int(text))
+        if kind == 'string':
+            return ('lit', text[1:-1].replace(text[0] * 2, text[0]))
+        if kind == 'field':
+            name = text[1:-1].replace(']]', ']')
+            if self.peek()[1] == '.' and self.peek(1)[0] == 'field':
+                self.take('.')
+                member = self.take()[1][1:-1].replace(']]', ']')
+                if name == 'Parameters':
+                    return ('param', member)
+                return ('field', member)
+            return ('field', name)
+        if text == '(':
+            node = self.expression()
+            self.take(')')
+            return node
+        if text == '{':
+            return self.level_of_detail()
+        if kind == 'keyword':
+            if text == 'IF':
+                return self.conditional()
+            if text == 'CASE':
+                return self.case()
+            if text in ('TRUE', 'FALSE'):
+                return ('lit', text == 'TRUE')
+            if text == 'NULL':
+                return ('lit', None)
+        if kind == 'name' and self.accept('('):
+            args = []
+            if not self.accept(')'):
+                args.append(self.expression())
+                while self.accept(','):
+                    args.append(self.expression())
+                self.take(')')
+            return ('call', text.upper(), args)
+        raise UnsupportedFormula(f"Unexpected {text!r}")
+
+    def conditional(self):
+        branches = [(self.expression(), None)]
+        self.take('THEN')
+        branches[0] = (branches[0][0], self.expression())
+        otherwise = ('lit', None)
+        while True:
+            if self.accept('ELSEIF'):
+                condition = self.expression()
+                self.take('THEN')
+                branches.append((condition, self.expression()))
+            elif self.accept('ELSE'):
+                otherwise = self.expression()
+            else:
+                self.take('END')
+                return ('if', branches, otherwise)
+
+    def case(self):
+        """CASE x WHEN a THEN ... ELSE ... END, as the equivalent IF/ELSEIF chain"""
+        subject = self.expression()
+        branches = []
+        otherwise = ('lit', None)
+        while True:
+            if self.accept('WHEN'):
+                match = self.expression()
+                self.take('THEN')
+                branches.append((('op', 'eq', subject, match), self.expression()))
+            elif self.accept('ELSE'):
+                otherwise = self.expression()
+            else:
+                self.take('END')
+                if not branches:
+                    raise UnsupportedFormula("CASE without WHEN")
+                return ('if', branches, otherwise)
+
+    def level_of_detail(self):
+        keyword = self.take()[1]
+        if keyword != 'FIXED':
+            raise UnsupportedFormula(f"Only FIXED level of detail expressions are supported, not {keyword}")
+        dimensions = []
+        while self.peek()[0] == 'field':
+            dimensions.append(self.primary()[1])
+            self.accept(',')
+        self.take(':')
+        body = self.expression()
+        self.take('}')
+        return ('fixed', dimensions, body)
+
+def parse_formula(formula):
+    """Parse a Tableau formula into a node tree"""
+    return Parser(formula).parse()
+
+def walk(node):
+    """Yield a node and every node below it"""
+    yield node
+    kind = node[0]
+    if kind == 'call':
+        for arg in node[2]:
+            yield from walk(arg)
+    elif kind == 'op':
+        yield from walk(node[2])
+        yield from walk(node[3])
+    elif kind in ('not', 'neg'):
+        yield from walk(node[1])
+    elif kind == 'if':
+        for condition, value in node[1]:
+            yield from walk(condition)
+            yield from walk(value)
+        yield from walk(node[2])
+    elif kind == 'fixed':
+        yield from walk(node[2])
+
+def children(node):
+    kind = node[0]
+    if kind == 'call':
+        return node[2]
+    if kind == 'op':
+        return [node[2], node[3]]
+    if kind in ('not', 'neg'):
+        return [node[1]]
+    if kind == 'if':
+        return [part for branch in node[1] for part in branch] + [node[2]]
+    return []
+
+class Calculation:
+    """
+    One calculated field from a .twb datasource.
+
+    Text left on its own lines after a complete expression (a note typed into the
+    calculation editor without //, e.g. "Drag to") is ignored like a comment, and kept
+    in `note`.
+    """
+
+    def __init__(self, name, caption, formula):
+        self.name = name
+        self.caption = caption or name
+        self.formula = formula
+        self.note = None
+        # Parse errors surface when the field is evaluated, so one odd formula doesn't stop the rest
+        try:
+            self.node = parse_formula(formula) if formula.strip() else ('lit', None)
+            self.error = None
+        except UnsupportedFormula as e:
+            self.node = ('lit', None)
+            self.error = f"Cannot parse formula: {e}"
+            lines = formula.splitlines()
+            for end in range(len(lines) - 1, 0, -1):
+                try:
+                    self.node = parse_formula("\n".join(lines[:end]))
+                except UnsupportedFormula:
+                    continue
+                self.error = None
+                self.note = f"ignored trailing text {' '.join(lines[end:]).strip()!r}"
+                break
+
+class WorkbookCalculations:
+    """
+    The calculated fields, parameters and field-to-sheet map of a workbook's main datasource.
+
+    Worksheets repeat datasource columns in their dependency blocks, so the same formula
+    appears many times in a .twb; only the datasource definition is kept.
+    """
+
+    def __init__(self, workbook_path):
+        root = ET.parse(workbook_path).getroot()
+        self.occurrences = sum(1 for _ in root.iter('calculation'))
+        self.calculations = {}
+        self.parameters = {}
+        self.fields = {}
+        self.relationships = []
+
+        for datasource in root.find('datasources').findall('datasource'):
+            for column in datasource.findall('column'):
+                calculation = column.find('calculation')
+                if calculation is None:
+                    continue
+                name = column.get('name')[1:-1]
+                formula = calculation.get('formula') or ''
+                if datasource.get('name') == 'Parameters':
+                    self.parameters[name] = {
+                        'caption': column.get('caption') or name,
+                        'value': parse_formula(formula)[1] if formula else None,
+                    }
+                else:
+                    self.calculations[name] = Calculation(name, column.get('caption'), formula)
+
+            for field_map in datasource.findall('.//cols/map'):
+                table, column_name = re.fullmatch(r"\[(.*)\]\.\[(.*)\]", field_map.get('value')).groups()
+                self.fields[field_map.get('key')[1:-1]] = (table, column_name)
+
+            for relationship in datasource.iter('relationship'):
+                operands = [expression.get('op')[1:-1] for expression in relationship.iter('expression')
+                            if expression.get('op') != '=']
+                if len(operands) == 2:
+                    self.relationships.append(tuple(operands))
+
+        self.sheets = {}
+        for relation in root.iter('relation'):
+            if relation.get('type') == 'table':
+                self.sheets[relation.get('name')] = relation.get('table').strip("[]'").rstrip('$')
+
+    def find(self, name_or_caption):
+        """Return a calculation by field name or caption"""
+        if name_or_caption in self.calculations:
+            return self.calculations[name_or_caption]
+        for calculation in self.calculations.values():
+            if calculation.caption == name_or_caption:
+                return calculation
+        raise KeyError(name_or_caption)
+
+class Evaluator:
+    """
+    Evaluates a workbook's calculated fields over its Excel data with pandas.
+
+    A parameter compared with a field (`[Areas PAC] = [Parameters].[Parameter 1]`) is not
+    fixed to its current value: the field becomes a group key instead, so one grouped pass
+    returns the result for every PAC/region/quarter the parameters could be set to.
+    Results are Series indexed by those keys (plus any FIXED dimensions), or row-level
+    Series for calculations without aggregates.
+
+    FIXED results are kept at their own level of detail, the way Tableau's relationship
+    model aggregates them, so an enclosing aggregate sees one value per dimension member.
+    """
+
+    def __init__(self, workbook, sheets):
+        self.workbook = workbook
+        self.sheets = sheets
+        self.frames = {}
+        self.results = {}
+
+    # Data
+
+    def tables_for(self, node):
+        """Return the sheet-backed tables a formula reads, following calculated fields"""
+        tables = set()
+        for child in walk(node):
+            if child[0] == 'field':
+                if child[1] in self.workbook.calculations:
+                    tables |= self.tables_for(self.workbook.calculations[child[1]].node)
+                elif child[1] in self.workbook.fields:
+                    tables.add(self.workbook.fields[child[1]][0])
+            elif child[0] == 'fixed':
+                for dimension in child[1]:
+                    if dimension in self.workbook.fields:
+                        tables.add(self.workbook.fields[dimension][0])
+        return tables
+
+    def table_frame(self, table):
+        """Return a sheet with its columns renamed to the workbook's field names"""
+        sheet = self.sheets[self.workbook.sheets.get(table, table)]
+        headers = list(sheet.columns)
+        # Tableau truncates long headers in the .twb, so match them to the sheet's full names
+        renames = {resolve_column(headers, column): key for key, (owner, column) in self.workbook.fields.items()
+                   if owner == table}
+        renames.pop(None, None)
+        return sheet.rename(columns=renames)
+
+    def frame_for(self, node):
+        """Return the row frame a formula evaluates over, joining related sheets on their relationship"""
+        tables = self.tables_for(node)
+        roots = {self.workbook.fields[left][0] for left, right in self.workbook.relationships}
+        root_table = next(iter(roots)) if roots else next(iter(tables), None)
+        related = sorted(tables - {root_table})
+        if len(related) > 1:
+            raise UnsupportedFormula(f"Formula reads more than one related table: {related}")
+        key = tuple(related) or (root_table,)
+        if key not in self.frames:
+            frame = self.table_frame(root_table)
+            if related:
+                left, right = next((left, right) for left, right in self.workbook.relationships
+                                   if self.workbook.fields[right][0] == related[0])
+                frame = self.table_frame(related[0]).merge(frame, how='left', left_on=right, right_on=left)
+            self.frames[key] = frame
+        return self.frames[key]
+
+    # Parameters
+
+    def parameter_bindings(self, node, bindings=None):
+        """Map each parameter to the field it is compared with; raise if it is used any other way"""
+        bindings = {} if bindings is None else bindings
+        for child in walk(node):
+            if child[0] == 'op' and child[1] == 'eq':
+                left, right = child[2], child[3]
+                if right[0] == 'param' and left[0] == 'field':
+                    left, right = right, left
+                if left[0] == 'param' and right[0] == 'field':
+                    bound = bindings.setdefault(left[1], right[1])
+                    if bound != right[1]:
+                        raise UnsupportedFormula(f"Parameter {left[1]} is compared with both {bound} and {right[1]}")
+            elif child[0] == 'op' and child[1] == 'OR' or child[0] == 'not':
+                if any(grandchild[0] == 'param' for grandchild in walk(child)):
+                    raise UnsupportedFormula("Parameters under OR/NOT cannot be turned into group keys")
+            elif child[0] == 'field' and child[1] in self.workbook.calculations:
+                self.parameter_bindings(self.workbook.calculations[child[1]].node, bindings)
+        for child in walk(node):
+            if child[0] == 'param' and child[1] not in bindings:
+                raise UnsupportedFormula(f"Parameter {child[1]} is not compared with a field")
+        return bindings
+
+    def is_aggregate(self, node):
+        """Return True if a node's value is per group (an aggregate or FIXED result) rather than per row"""
+        kind = node[0]
+        if kind == 'fixed' or (kind == 'call' and node[1] in AGGREGATES):
+            return True
+        if kind == 'field' and node[1] in self.workbook.calculations:
+            return self.is_aggregate(self.workbook.calculations[node[1]].node)
+        return any(self.is_aggregate(child) for child in children(node))
+
+    def natural_levels(self, node, bindings):
+        """Group keys a formula's result is indexed by: bound fields plus any FIXED dimensions it returns"""
+        levels = list(bindings.values())
+
+        def visit(child):
+            if child[0] == 'fixed':
+                levels.extend(child[1] + list(self.parameter_bindings(child).values()))
+            elif child[0] == 'field' and child[1] in self.workbook.calculations:
+                visit(self.workbook.calculations[child[1]].node)
+            elif not (child[0] == 'call' and child[1] in AGGREGATES):
+                for grandchild in children(child):
+                    visit(grandchild)
+
+        visit(node)
+        return list(dict.fromkeys(levels))
+
+    def is_bound_test(self, node):
+        """Return True for a `[Field] = [Parameters].[P]` comparison that became a group key"""
+        return node[0] == 'op' and node[1] == 'eq' and {node[2][0], node[3][0]} == {'param', 'field'}
+
+    # Evaluation
+
+    def column(self, frame, name):
+        """Return a field as a row Series, materialising row-level calculated fields as columns"""
+        if name not in frame.columns:
+            calculation = self.workbook.calculations.get(name)
+            if calculation is None:
+                raise UnsupportedFormula(f"Unknown field [{name}]")
+            if self.is_aggregate(calculation.node):
+                raise UnsupportedFormula(f"[{name}] is an aggregate and cannot be used per row")
+            frame[name] = self.row(calculation.node, frame, {})
+        return frame[name]
+
+    def group_index(self, frame, levels):
+        """Distinct key combinations present in the frame"""
+        keys = frame[list(levels)].drop_duplicates()
+        if len(levels) == 1:
+            return pd.Index(keys[levels[0]], name=levels[0])
+        return pd.MultiIndex.from_frame(keys)
+
+    def row(self, node, frame, bindings):
+        """Evaluate a row-level node to a Series aligned with the frame (or a scalar)"""
+        kind = node[0]
+        if kind == 'lit':
+            return node[1]
+        if kind == 'field':
+            return self.column(frame, node[1])
+        if kind == 'fixed':
+            result = self.fixed(node, frame)
+            levels = list(result.index.names)
+            lookup = pd.MultiIndex.from_frame(frame[levels]) if len(levels) > 1 else pd.Index(frame[levels[0]])
+            return pd.Series(result.reindex(lookup).to_numpy(), index=frame.index)
+        if kind == 'call' and node[1] in AGGREGATES:
+            raise UnsupportedFormula(f"{node[1]} used where a row-level value is needed")
+        if kind == 'op' and self.is_bound_test(node):
+            # Rows of the other parameter values fall in other groups
+            return True
+        return self.combine(node, lambda child: self.row(child, frame, bindings), frame.index)
+
+    def aggregate(self, node, frame, levels, bindings):
+        """Evaluate an aggregate node to a Series indexed by the group levels"""
+        kind = node[0]
+        if kind == 'lit':
+            return node[1]
+        if kind == 'call' and node[1] in AGGREGATES:
+            function = AGGREGATES[node[1]]
+            argument = node[2][0]
+            if argument[0] == 'fixed':
+                return self.rollup(argument, frame, levels, bindings, function)
+            values = self.row(argument, frame, bindings)
+            if not isinstance(values, pd.Series):
+                values = pd.Series(values, index=frame.index)
+            if not levels:
+                return apply_aggregate(values, function)
+            grouped = values.groupby([frame[level] for level in levels],
+                                     dropna=False, sort=False, observed=True)
+            return apply_aggregate(grouped, function)
+        if kind == 'field':
+            if node[1] in levels:
+                return pd.Series(self.group_index(frame, levels).get_level_values(node[1]),
+                                 index=self.group_index(frame, levels))
+            calculation = self.workbook.calculations.get(node[1])
+            if calculation is not None and self.is_aggregate(calculation.node):
+                return self.aggregate(calculation.node, frame, levels, bindings)
+            raise UnsupportedFormula(f"[{node[1]}] must be aggregated")
+        if kind == 'fixed':
+            return self.rollup(node, frame, levels, bindings, 'sum')
+        index = self.group_index(frame, levels) if levels else None
+        return self.combine(node, lambda child: self.aggregate(child, frame, levels, bindings), index)
+
+    def fixed(self, node, frame):
+        """Evaluate {FIXED dims: body} to a Series indexed by the dims plus its parameter keys"""
+        bindings = self.parameter_bindings(node)
+        levels = list(dict.fromkeys(node[1] + list(bindings.values())))
+        for level in levels:
+            self.column(frame, level)
+        return self.aggregate(node[2], frame, levels, bindings)
+
+    def rollup(self, node, frame, levels, bindings, function):
+        """Aggregate a FIXED result to coarser or equal levels, one value per FIXED member"""
+        result = self.fixed(node, frame)
+        fixed_levels = list(result.index.names)
+        combined = list(dict.fromkeys(list(levels) + fixed_levels))
+        members = frame[combined].drop_duplicates()
+        lookup = pd.MultiIndex.from_frame(members[fixed_levels]) if len(fixed_levels) > 1 \
+            else pd.Index(members[fixed_levels[0]])
+        members = members.assign(_value=result.reindex(lookup).to_numpy())
+        if not levels:
+            return apply_aggregate(members['_value'], function)
+        grouped = members.groupby(list(levels), dropna=False, sort=False, observed=True)['_value']
+        return apply_aggregate(grouped, function)
+
+    def combine(self, node, evaluate, index):
+        """Apply a non-aggregate operator or function to already evaluated children"""
+        kind = node[0]
+        if kind == 'not':
+            return ~as_bool(evaluate(node[1]), index)
+        if kind == 'neg':
+            return -evaluate(node[1])
+        if kind == 'op':
+            op, left, right = node[1], evaluate(node[2]), evaluate(node[3])
+            if op == 'AND':
+                return as_bool(left, index) & as_bool(right, index)
+            if op == 'OR':
+                return as_bool(left, index) | as_bool(right, index)
+            if op in ('eq', 'ne', 'lt', 'gt', 'le', 'ge'):
+                return getattr(operator, op)(left, right)
+            if op == '+':
+                if is_text(left) or is_text(right):
+                    return as_text(left) + as_text(right)
+                return left + right
+            if op == '-':
+                return left - right
+            if op == '*':
+                return left * right
+            if op == '/':
+                # Tableau returns NULL rather than infinity for division by zero
+                if not isinstance(left, pd.Series) and not isinstance(right, pd.Series):
+                    return np.nan if not right or pd.isna(right) else left / right
+                return as_series(left, index).astype(float) / as_series(right, index).replace(0, np.nan)
+            if op == '%':
+                return left % right
+        if kind == 'if':
+            if index is None:
+                # Whole-table aggregates are scalars; pick the first true branch
+                for condition, value in node[1]:
+                    if as_bool(evaluate(condition), None):
+                        return evaluate(value)
+                return evaluate(node[2])
+            otherwise = evaluate(node[2])
+            result = as_series(np.nan if otherwise is None else otherwise, index)
+            for condition, value in reversed(node[1]):
+                value = evaluate(value)
+                result = result.mask(as_bool(evaluate(condition), index), np.nan if value is None else value)
+            return result
+        if kind == 'call':
+            return self.function(node[1], [evaluate(arg) for arg in node[2]], index)
+        raise UnsupportedFormula(f"Cannot evaluate {kind}")
+
+    def table_calculations(self, node):
+        """Names of the table calculations a formula uses, following calculated fields"""
+        names = set()
+        for child in walk(node):
+            if child[0] == 'call' and child[1] in TABLE_CALCULATIONS:
+                names.add(child[1])
+            elif child[0] == 'field' and child[1] in self.workbook.calculations:
+                names |= self.table_calculations(self.workbook.calculations[child[1]].node)
+        return names
+
+    def function(self, name, args, index):
+        if name in TABLE_CALCULATIONS:
+            raise TableCalculation(f"{name} is a table calculation and depends on the worksheet layout")
+        if name == 'RIGHT':
+            return as_text(args[0]).str[-int(args[1]):]
+        if name == 'LEFT':
+            return as_text(args[0]).str[:int(args[1])]
+        if name == 'STR':
+            return as_text(args[0])
+        if name in ('INT', 'FLOAT'):
+            return as_series(args[0], index).astype(float if name == 'FLOAT' else 'Int64')
+        if name == 'ZN':
+            return as_series(args[0], index).fillna(0)
+        if name == 'IFNULL':
+            return as_series(args[0], index).fillna(args[1])
+        if name == 'ISNULL':
+            return as_series(args[0], index).isna()
+        if name == 'ABS':
+            return abs(args[0])
+        if name == 'ROUND':
+            return as_series(args[0], index).round(int(args[1]) if len(args) > 1 else 0)
+        if name == 'CONTAINS':
+            return as_text(args[0]).str.contains(args[1], regex=False)
+        if name in ('UPPER', 'LOWER'):
+            return getattr(as_text(args[0]).str, name.lower())()
+        raise UnsupportedFormula(f"Function {name} is not supported")
+
+    def evaluate(self, name_or_caption):
+        """Evaluate a calculated field for every parameter setting in one grouped pass"""
+        calculation = self.workbook.find(name_or_caption)
+        if calculation.error:
+            raise UnsupportedFormula(calculation.error)
+        if calculation.name not in self.results:
+            node = calculation.node
+            table_calculations = self.table_calculations(node)
+            if table_calculations:
+                raise TableCalculation(f"uses {', '.join(sorted(table_calculations))}, a table calculation "
+                                       "that depends on the worksheet layout")
+            bindings = self.parameter_bindings(node)
+            frame = self.frame_for(node)
+            if self.is_aggregate(node):
+                levels = self.natural_levels(node, bindings)
+                for level in levels:
+                    self.column(frame, level)
+                result = self.aggregate(node, frame, levels, bindings)
+            else:
+                result = self.row(node, frame, bindings)
+            self.results[calculation.name] = result
+        return self.results[calculation.name]
+
+    def at_parameters(self, name_or_caption, parameters=None):
+        """Select the result for one parameter setting (the workbook's current values by default)"""
+        calculation = self.workbook.find(name_or_caption)
+        result = self.evaluate(calculation.name)
+        bindings = self.parameter_bindings(calculation.node)
+        if not bindings or not isinstance(result, pd.Series):
+            return result
+        values = {parameter: details['value'] for parameter, details in self.workbook.parameters.items()}
+        values.update(parameters or {})
+        for parameter, field in bindings.items():
+            level = list(result.index.names).index(field)
+            result = result.xs(values[parameter], level=level) if isinstance(result.index, pd.MultiIndex) \
+                else result.get(values[parameter], np.nan)
+            if not isinstance(result, pd.Series):
+                break
+        return result
+
+def apply_aggregate(values, function):
+    """Aggregate a Series or SeriesGroupBy by method name or function"""
+    if isinstance(function, str):
+        return getattr(values, function)()
+    return values.agg(function)
+
+def as_series(value, index):
+    if isinstance(value, pd.Series) or index is None:
+        return value
+    return pd.Series(value, index=index)
+
+def as_bool(value, index):
+    if isinstance(value, pd.Series):
+        return value.fillna(False).astype(bool)
+    value = False if value is None or pd.isna(value) else bool(value)
+    return value if index is None else pd.Series(value, index=index)
+
+def is_text(value):
+    if isinstance(value, pd.Series):
+        return value.dtype == object or pd.api.types.is_string_dtype(value)
+    return isinstance(value, str)
+
+def as_text(value):
+    """Tableau-style string conversion; whole floats print without a trailing .0"""
+    if not isinstance(value, pd.Series):
+        return str(value)
+    if pd.api.types.is_float_dtype(value) and value.dropna().mod(1).eq(0).all():
+        value = value.astype('Int64')
+    return value.astype(str)
+
+def load_evaluator(workbook_path, data_path=None):
+    """Read a workbook's calculations and its Excel data source"""
+    workbook = WorkbookCalculations(workbook_path)
+    data_path = data_path or SERVICE_DATA_PATHS[get_service_type(workbook_path)]
+    sheets = read_sheets(data_path)
+    return Evaluator(workbook, sheets)
+
+def evaluate_all(evaluator):
+    """Evaluate every calculation, returning {caption: result}, {caption: error} and {caption: table calc note}"""
+    results = {}
+    errors = {}
+    table_calculations = {}
+    for calculation in evaluator.workbook.calculations.values():
+        try:
+            results[calculation.caption] = evaluator.evaluate(calculation.name)
+        except TableCalculation as e:
+            table_calculations[calculation.caption] = str(e)
+        except UnsupportedFormula as e:
+            errors[calculation.caption] = str(e)
+    return results, errors, table_calculations
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Evaluate a workbook's calculated fields without Tableau")
+    parser.add_argument("workbook", help="Template .twb to read the calculations from")
+    parser.add_argument("--data", help="Excel data source (default: the service's output_*.xlsx)")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    evaluator = load_evaluator(args.workbook, args.data)
+    loaded = time.perf_counter()
+    results, errors, table_calculations = evaluate_all(evaluator)
+    elapsed = time.perf_counter() - loaded
+
+    workbook = evaluator.workbook
+    print(f"{workbook.occurrences} <calculation> elements, {len(workbook.calculations)} distinct calculated fields")
+    for caption, result in results.items():
+        groups = len(result) if isinstance(result, pd.Series) else 1
+        current = evaluator.at_parameters(caption)
+        if isinstance(current, pd.Series):
+            current = current.round(3).to_dict() if len(current) <= 6 else f"{len(current)} values"
+        elif isinstance(current, float):
+            current = round(current, 3)
+        print(f"  {caption}: {groups} value(s); at current parameters: {current}")
+    for calculation in workbook.calculations.values():
+        if calculation.note:
+            print(f"⚠️  {calculation.caption}: {calculation.note}")
+    for caption, note in table_calculations.items():
+        print(f"⏭️ {caption}: not supported, {note}")
+    for caption, error in errors.items():
+        print(f"❌ {caption}: {error}")
+    total = len(results) + len(errors) + len(table_calculations)
+    print(f"Evaluated {len(results)}/{total} calculations in {elapsed:.2f}s (data loaded in {loaded - start:.1f}s); "
+          f"{len(table_calculations)} table calculation(s) unsupported, {len(errors)} error(s)")
@@ -0,0 +1,171 @@
+import argparse
+import json
+import re
+import xml.etree.ElementTree as ET
+from collections import defaultdict
+from pathlib import Path
+
+# Field references in a formula: [Field], with ]] as an escaped bracket
+FIELD_RE = re.compile(r"\[((?:[^\]]|\]\])*)\]")
+
+def formula_fields(formula):
+    """Return the local field names a formula references, skipping [Parameters].[...] and strings"""
+    # Drop string literals and comments so a "[...]" inside them isn't read as a field
+    formula = re.sub(r'"(?:[^"]|"")*"|\'(?:[^\']|\'\')*\'|//[^\n]*', '', formula)
+    fields = []
+    skip_next = False
+    for match in FIELD_RE.finditer(formula):
+        name = match.group(1).replace(']]', ']')
+        if skip_next:
+            skip_next = False
+            continue
+        # [Parameters].[Parameter 1] or [datasource].[field]: the qualifier isn't a field
+        if formula[match.end():match.end() + 2] == '.[':
+            skip_next = name == 'Parameters'
+            continue
+        fields.append(name)
+    return fields
+
+class ColumnGraph:
+    """
+    Dependency graph of a workbook: dashboards -> zones -> worksheets -> column-instances
+    -> calculations -> source columns.
+
+    Nodes are (kind, name) tuples; required_columns() walks it from the dashboards to the
+    minimal set of (table, column) pairs the printed reports read.
+    """
+
+    def __init__(self, workbook_path=None, data=None):
+        self.workbook_path = Path(workbook_path) if workbook_path else None
+        root = ET.fromstring(data) if data is not None else ET.parse(self.workbook_path).getroot()
+        self.edges = defaultdict(set)
+        # Local field name -> (table, column) for physical columns
+        self.fields = {}
+        self.calculations = {}
+        self.relationships = []
+        self.datasources = set()
+
+        for datasource in root.find('datasources').findall('datasource'):
+            if datasource.get('name') == 'Parameters':
+                continue
+            self.datasources.add(datasource.get('name'))
+            for field_map in datasource.findall('.//cols/map'):
+                table, column_name = re.fullmatch(r"\[(.*)\]\.\[(.*)\]", field_map.get('value')).groups()
+                self.fields[field_map.get('key')[1:-1]] = (table, column_name)
+            for column in datasource.findall('column'):
+                calculation = column.find('calculation')
+                if calculation is not None and calculation.get('class') == 'tableau':
+                    self.calculations[column.get('name')[1:-1]] = calculation.get('formula') or ''
+            for relationship in datasource.iter('relationship'):
+                operands = [expression.get('op')[1:-1] for expression in relationship.iter('expression')
+                            if expression.get('op') != '=']
+                if len(operands) == 2:
+                    self.relationships.append(tuple(operands))
+
+        worksheets = root.find('worksheets')
+        # Ad-hoc calculations typed on a shelf only live in a worksheet's dependencies
+        for column in [] if worksheets is None else worksheets.iter('column'):
+            calculation = column.find('calculation')
+            name = column.get('name', '')[1:-1]
+            if calculation is not None and name not in self.calculations and name not in self.fields:
+                self.calculations[name] = calculation.get('formula') or ''
+
+        for name, formula in self.calculations.items():
+            for field in formula_fields(formula):
+                self.edges[('calculation', name)].add(self.field_node(field))
+
+        self.worksheets = [] if worksheets is None else [ws.get('name') for ws in worksheets.findall('worksheet')]
+        for worksheet in [] if worksheets is None else worksheets.findall('worksheet'):
+            node = ('worksheet', worksheet.get('name'))
+            for dependencies in worksheet.iter('datasource-dependencies'):
+                if dependencies.get('datasource') not in self.datasources:
+                    continue
+                for instance in dependencies.findall('column-instance'):
+                    instance_node = ('column-instance', instance.get('name'))
+                    self.edges[node].add(instance_node)
+                    self.edges[instance_node].add(self.field_node(instance.get('column')[1:-1]))
+                for column in dependencies.findall('column'):
+                    self.edges[node].add(self.field_node(column.get('name')[1:-1]))
+
+        dashboards = root.find('dashboards')
+        self.dashboards = [] if dashboards is None else [db.get('name') for db in dashboards.findall('dashboard')]
+        worksheet_names = set(self.worksheets)
+        for dashboard in [] if dashboards is None else dashboards.findall('dashboard'):
+            node = ('dashboard', dashboard.get('name'))
+            for zone in dashboard.iter('zone'):
+                if zone.get('name') in worksheet_names:
+                    zone_node = ('zone', f"{dashboard.get('name')}/{zone.get('id')}")
+                    self.edges[node].add(zone_node)
+                    self.edges[zone_node].add(('worksheet', zone.get('name')))
+
+    def field_node(self, name):
+        """Return the node a local field name resolves to: a calculation, a source column or unresolved"""
+        if name in self.calculations:
+            return ('calculation', name)
+        if name in self.fields:
+            return ('column', self.fields[name])
+        return ('unresolved', name)
+
+    def reachable(self, dashboards=None):
+        """Return every node reachable from the given dashboards (all of them by default)"""
+        stack = [('dashboard', name) for name in (self.dashboards if dashboards is None else dashboards)]
+        seen = set(stack)
+        while stack:
+            for child in self.edges.get(stack.pop(), ()):
+                if child not in seen:
+                    seen.add(child)
+                    stack.append(child)
+        return seen
+
+    def required_columns(self, dashboards=None):
+        """Return {table: sorted columns} the dashboards need, including relationship join keys"""
+        required = defaultdict(set)
+        for kind, value in self.reachable(dashboards):
+            if kind == 'column':
+                required[value[0]].add(value[1])
+        # A related table is only reachable through its join key, so keep both sides of it
+        for left, right in self.relationships:
+            left_column, right_column = self.fields.get(left), self.fields.get(right)
+            if left_column and right_column and right_column[0] in required:
+                required[left_column[0]].add(left_column[1])
+                required[right_column[0]].add(right_column[1])
+        return {table: sorted(columns) for table, columns in sorted(required.items())}
+
+    def unresolved(self, dashboards=None):
+        """Return field names the dashboards reference that are neither calculations nor mapped columns"""
+        return sorted(name for kind, name in self.reachable(dashboards) if kind == 'unresolved')
+
+    def report(self, dashboards=None):
+        """Per-dashboard required columns plus their union, as a plain dict"""
+        names = self.dashboards if dashboards is None else dashboards
+        return {
+            'workbook': str(self.workbook_path),
+            'dashboards': {name: self.required_columns([name]) for name in names},
+            'required': self.required_columns(names),
+            'unresolved': self.unresolved(names),
+            'available': {table: sorted(column for t, column in self.fields.values() if t == table)
+                          for table in sorted({table for table, _ in self.fields.values()})},
+        }
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Report the data source columns each dashboard of a workbook needs")
+    parser.add_argument("workbook", help="path to the .twb")
+    parser.add_argument("--dashboard", action="append",
+                        help="only analyse this dashboard (repeatable, default: all)")
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    args = parser.parse_args()
+
+    report = ColumnGraph(args.workbook).report(args.dashboard)
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        for dashboard, tables in report['dashboards'].items():
+            print(f"📊 {dashboard}: {sum(len(columns) for columns in tables.values())} column(s)")
+        print()
+        for table, columns in report['required'].items():
+            available = len(report['available'].get(table, []))
+            print(f"📋 {table}: {len(columns)}/{available} column(s) needed")
+            for column in columns:
+                print(f"   - {column}")
+        if report['unresolved']:
+            print(f"\nWarning: Unresolved field references: {report['unresolved']}")
@@ -0,0 +1,163 @@
+import json
+import os
+import shutil
+from pathlib import Path
+
+import pandas as pd
+from openpyxl import load_workbook
+
+from build_cache import file_stamp, hash_bytes, hash_file
+
+# Parquet copies of the Excel data sources, one file per sheet
+CACHE_DIR = Path(".data_cache")
+
+# Bump when the conversion changes for the same workbook
+CACHE_VERSION = 1
+
+# Repeated labels stored as categoricals: one small code per row instead of a string
+CATEGORICAL_PREFIXES = ('Areas PAC', 'Areas Region', 'Region', 'Attribute', 'Quarter', 'Year-Quarter')
+
+# Sheets already loaded in this process: (cache dir, sheet file) -> (stamp, frame)
+_FRAMES = {}
+
+def cache_dir_for(xlsx_path, cache_root=CACHE_DIR):
+    """Return the cache directory for a workbook: its name plus a hash of its full resolved path"""
+    path = Path(xlsx_path).resolve()
+    path_hash = hash_bytes(str(path).encode('utf-8'))[:12]
+    return Path(cache_root) / f"{path.stem.replace(' ', '_')}_{path_hash}"
+
+def evict_stale(cache_root=CACHE_DIR):
+    """
+    Remove cache directories whose source workbook is gone or that no longer match its path.
+
+    Temporary filter workbooks leave a cache behind each run, and caches from the old
+    naming scheme are orphaned, so both are cleared. Directories without a manifest may
+    be mid-build in another process and are left alone. Returns the number removed.
+    """
+    removed = 0
+    for directory in Path(cache_root).glob("*/"):
+        try:
+            manifest = json.loads((directory / "manifest.json").read_text(encoding='utf-8'))
+        except (json.JSONDecodeError, OSError):
+            continue
+        source = manifest.get('source')
+        if source and Path(source).exists() and cache_dir_for(source, cache_root) == directory:
+            continue
+        shutil.rmtree(directory, ignore_errors=True)
+        removed += 1
+    return removed
+
+def unique_headers(row):
+    """Column names as pandas would read them: blanks become "Unnamed: N", repeats get .1, .2..."""
+    headers = []
+    seen = {}
+    for index, value in enumerate(row):
+        name = f"Unnamed: {index}" if value is None else str(value)
+        if name in seen:
+            seen[name] += 1
+            name = f"{name}.{seen[name]}"
+        else:
+            seen[name] = 0
+        headers.append(name)
+    return headers
+
+def sheet_frame(rows):
+    """Build a DataFrame from a streamed sheet (header row first), dropping trailing blank rows"""
+    rows = iter(rows)
+    header = next(rows, None)
+    if header is None:
+        return pd.DataFrame()
+    data = [row for row in rows if any(value is not None for value in row)]
+    frame = pd.DataFrame(data, columns=unique_headers(header))
+
+    for column in frame.columns:
+        if frame[column].dtype != object:
+            continue
+        types = {type(value) for value in frame[column].dropna()}
+        if column.startswith(CATEGORICAL_PREFIXES) and types <= {str}:
+            frame[column] = frame[column].astype('category')
+        elif len(types) > 1:
+            # Parquet needs one type per column; keep mixed cells as text
+            print(f"Warning: Column '{column}' mixes {sorted(t.__name__ for t in types)}, caching it as text")
+            frame[column] = frame[column].map(lambda value: value if value is None else str(value))
+    return frame
+
+def sheet_file(name):
+    return "".join(c if c.isalnum() or c in "-_" else "_" for c in name) + ".parquet"
+
+def build_cache(xlsx_path, directory, source_hash):
+    """Stream every sheet of the workbook once (read-only) into Parquet files"""
+    workbook = load_workbook(xlsx_path, read_only=True, data_only=True)
+    sheets = {}
+    try:
+        for worksheet in workbook.worksheets:
+            frame = sheet_frame(worksheet.iter_rows(values_only=True))
+            frame.to_parquet(directory / sheet_file(worksheet.title), index=False)
+            sheets[worksheet.title] = sheet_file(worksheet.title)
+    finally:
+        workbook.close()
+    return {
+        'version': CACHE_VERSION,
+        'source': str(Path(xlsx_path).resolve()),
+        'stamp': file_stamp(xlsx_path),
+        'sha256': source_hash,
+        'sheets': sheets,
+    }
+
+def ensure_cache(xlsx_path, cache_root=CACHE_DIR):
+    """Return the cache manifest for a workbook, rebuilding the Parquet files if the source changed"""
+    directory = cache_dir_for(xlsx_path, cache_root)
+    manifest_path = directory / "manifest.json"
+    manifest = None
+    if manifest_path.exists():
+        try:
+            manifest = json.loads(manifest_path.read_text(encoding='utf-8'))
+        except (json.JSONDecodeError, OSError) as e:
+            print(f"Warning: Ignoring unreadable data cache manifest {manifest_path}: {e}")
+
+    stamp = file_stamp(xlsx_path)
+    if stamp is None:
+        raise FileNotFoundError(xlsx_path)
+    if manifest and manifest.get('version') == CACHE_VERSION and manifest.get('stamp') == stamp:
+        return directory, manifest
+
+    # The stamp moved: only rebuild if the content actually changed (e.g. not just a copy or touch)
+    source_hash = hash_file(xlsx_path)
+    if manifest and manifest.get('version') == CACHE_VERSION and manifest.get('sha256') == source_hash:
+        manifest['stamp'] = stamp
+    else:
+        print(f"Caching {xlsx_path} as Parquet in {directory}")
+        evict_stale(cache_root)
+        directory.mkdir(parents=True, exist_ok=True)
+        manifest = build_cache(xlsx_path, directory, source_hash)
+
+    temp_path = manifest_path.with_suffix('.tmp')
+    temp_path.write_text(json.dumps(manifest, indent=2), encoding='utf-8')
+    os.replace(temp_path, manifest_path)
+    return directory, manifest
+
+def read_sheets(xlsx_path, sheet_names=None, cache_root=CACHE_DIR):
+    """
+    Drop-in for pd.read_excel(path, sheet_name=None): {sheet name: DataFrame}, read from the cache.
+
+    Frames are shared within the process, so callers must copy before mutating in place.
+    """
+    directory, manifest = ensure_cache(xlsx_path, cache_root)
+    frames = {}
+    for name, file_name in manifest['sheets'].items():
+        if sheet_names is not None and name not in sheet_names:
+            continue
+        key = (str(directory), file_name)
+        cached = _FRAMES.get(key)
+        if cached is None or cached[0] != manifest['sha256']:
+            cached = (manifest['sha256'], pd.read_parquet(directory / file_name))
+            _FRAMES[key] = cached
+        frames[name] = cached[1]
+    return frames
+
+def read_sheet(xlsx_path, sheet_name=0, cache_root=CACHE_DIR):
+    """Drop-in for pd.read_excel(path, sheet_name=...): one sheet by name or position"""
+    directory, manifest = ensure_cache(xlsx_path, cache_root)
+    names = list(manifest['sheets'])
+    name = names[sheet_name] if isinstance(sheet_name, int) else sheet_name
+    return read_sheets(xlsx_path, [name], cache_root)[name]
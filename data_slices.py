@@ -0,0 +1,100 @@
+import json
+import os
+import shutil
+from pathlib import Path
+
+import pandas as pd
+
+from build_cache import hash_bytes
+from data_cache import ensure_cache, read_sheets
+
+# Slices sit in a folder next to the PAC workbooks and are referenced by a relative path
+SLICE_DIR = "data"
+
+# Bump when the slicing changes output for the same source data
+SLICE_VERSION = 3
+
+# Columns the Areas/quarter filters read, kept in every projected sheet
+FILTER_COLUMNS = ['Areas Region', 'Areas PAC', 'Year', 'Quarter', 'Year-Quarter']
+
+def slice_name(region, service):
+    """File name of a region's data slice"""
+    return f"{region} - {service}.xlsx"
+
+def slice_key(source_hash, columns=None):
+    """Build manifest key for a slice: the source data and any projection"""
+    payload = json.dumps([SLICE_VERSION, source_hash, columns], sort_keys=True)
+    return hash_bytes(payload.encode('utf-8'))
+
+def resolve_column(headers, name):
+    """
+    Return the sheet header a workbook column name refers to, or None.
+
+    Tableau truncates long Excel headers in the .twb (remote-name included), so a name
+    with no exact match resolves to the one header it is a prefix of.
+    """
+    if name in headers:
+        return name
+    matches = [header for header in headers if str(header).startswith(name)]
+    return matches[0] if len(matches) == 1 else None
+
+def project_frame(frame, columns, sheet=None):
+    """
+    Keep the given columns (plus the ones slicing relies on), in the sheet's own order.
+
+    A sheet with a required column that can't be found is kept whole, with a warning,
+    rather than losing a column a dashboard reads.
+    """
+    headers = list(frame.columns)
+    resolved = {name: resolve_column(headers, name) for name in columns}
+    missing = sorted(name for name, header in resolved.items() if header is None)
+    if missing:
+        print(f"Warning: Not projecting sheet '{sheet}': required column(s) not found: {missing}")
+        return frame
+    keep = set(resolved.values()) | set(FILTER_COLUMNS)
+    return frame[[column for column in headers if column in keep]]
+
+def slice_frames(frames, columns=None):
+    """
+    Return the sheets a slice holds: every row, so the NSW comparison calcs see the full data.
+
+    Rows are not cut down to a region, because the workbooks compute their NSW figures
+    from every response on several sheets. With columns ({sheet: [column, ...]}, see
+    column_graph.py) only those sheets and columns are written.
+    """
+    if columns is None:
+        return dict(frames)
+    return {name: project_frame(frame, columns[name], name) for name, frame in frames.items() if name in columns}
+
+def write_slice(frames, output_path):
+    """Write sheets to an .xlsx atomically, so Tableau never opens a half-written slice"""
+    output_path = Path(output_path)
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    temp_path = output_path.with_name(output_path.stem + ".tmp.xlsx")
+    with pd.ExcelWriter(temp_path, engine='openpyxl') as writer:
+        for name, frame in frames.items():
+            frame.to_excel(writer, sheet_name=name, index=False)
+    os.replace(temp_path, output_path)
+
+def write_slices(source_path, paths, manifest, force=False, columns=None):
+    """
+    Write the slices for one data source to each of the given paths.
+
+    Every slice of a source holds the same data, so it is built once and copied. Slices
+    whose source data and projection are unchanged are left untouched. Returns the
+    number of slices written.
+    """
+    _, cache_manifest = ensure_cache(source_path)
+    key = slice_key(cache_manifest['sha256'], columns)
+    pending = [path for path in paths if force or not manifest.is_fresh(path, key, 'data slice')]
+    if not pending:
+        return 0
+
+    write_slice(slice_frames(read_sheets(source_path), columns), pending[0])
+    for path in pending[1:]:
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        shutil.copy2(pending[0], path)
+    for path in pending:
+        manifest.record(path, key)
+        print(f"Created data slice: {path}")
+    return len(pending)
@@ -0,0 +1,549 @@
+import os
+import subprocess
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+import tracing
+from twb_engine import find_categorical_groupfilters
+from xml_backend import get_backend
+
+# Default limits, in seconds, for each phase of an export
+DEFAULT_TIMEOUTS = {
+    'load': 60,           # Tableau window appears after launch
+    'load_fallback': 15,  # assumed load time when the window can't be detected (no window listing)
+    'settle': 3,          # extra time for the dashboards to render once the window is up
+    'pdf': 120,           # PDF file complete on disk after pressing Save
+    'stable': 1.0,        # PDF size must stop changing for this long
+    'close': 30,          # Tableau process exits after Alt+F4
+}
+
+class ExportTimeout(TimeoutError):
+    """Raised when an export phase does not finish within its timeout"""
+
+class PhaseTimer:
+    """Records how long each named phase of an export takes"""
+
+    def __init__(self):
+        self.phases = {}
+
+    @contextmanager
+    def phase(self, name):
+        start = time.perf_counter()
+        try:
+            with tracing.span(name):
+                yield
+        finally:
+            self.phases[name] = self.phases.get(name, 0.0) + time.perf_counter() - start
+
+    @property
+    def total(self):
+        return sum(self.phases.values())
+
+    def summary(self):
+        """Return the phase timings as a one-line string"""
+        return format_phases(self.phases)
+
+def format_phases(phases):
+    """Format a phase -> seconds dict as a one-line string"""
+    return ", ".join(f"{name} {seconds:.1f}s" for name, seconds in phases.items())
+
+# Service label written at the end of each PDF name, per service type (see pdf_qa.py)
+SERVICE_SUFFIXES = {"Walk-in": "Walkin", "Telephone": "Telephone"}
+
+def pdf_filename(area, region, service="Walkin"):
+    """Return the file name used for a PAC report"""
+    return f"{area} - {region} - {service}.pdf"
+
+def is_complete_pdf(path):
+    """Return True if a file starts with a PDF header and ends with an %%EOF trailer"""
+    try:
+        with open(path, 'rb') as f:
+            if f.read(5) != b'%PDF-':
+                return False
+            f.seek(0, os.SEEK_END)
+            f.seek(max(0, f.tell() - 1024))
+            return b'%%EOF' in f.read()
+    except OSError:
+        return False
+
+def wait_for_pdf(path, timeout=DEFAULT_TIMEOUTS['pdf'], stable_for=DEFAULT_TIMEOUTS['stable'], poll=0.2):
+    """
+    Wait until a PDF exists, its size has stopped changing for `stable_for` seconds
+    and it ends with a valid trailer. Returns the final size in bytes.
+    """
+    deadline = time.monotonic() + timeout
+    last_size = None
+    stable_since = None
+    while time.monotonic() < deadline:
+        try:
+            size = os.path.getsize(path)
+        except OSError:
+            size = None
+
+        if size is not None and size == last_size:
+            if stable_since is None:
+                stable_since = time.monotonic()
+            if time.monotonic() - stable_since >= stable_for and is_complete_pdf(path):
+                return size
+        else:
+            stable_since = None
+        last_size = size
+        time.sleep(poll)
+    raise ExportTimeout(f"PDF not complete after {timeout}s: {path}")
+
+class Exporter:
+    """
+    Base class for anything that turns a workbook into a PAC report PDF.
+
+    Subclasses implement start_export() to kick off the export; export() handles the
+    output path, waits for the file to be complete and records per-phase timings.
+    """
+
+    # Warm exporters keep the workbook open and switch parameters between exports
+    warm = False
+
+    def __init__(self, timeouts=None):
+        self.timeouts = dict(DEFAULT_TIMEOUTS, **(timeouts or {}))
+
+    def start_export(self, workbook_path, output_file, area, region, timer):
+        raise NotImplementedError
+
+    def finish_export(self, timer):
+        """Clean up after the PDF is on disk (e.g. close the application)"""
+
+    def close(self):
+        """Release anything kept open between exports"""
+
+    def export(self, workbook_path, output_dir, area, region, service=None):
+        """Export one report and return a result dict with the path, size and phase timings"""
+        output_path = Path(output_dir)
+        output_path.mkdir(parents=True, exist_ok=True)
+        output_file = output_path / pdf_filename(area, region, SERVICE_SUFFIXES[service or "Walk-in"])
+
+        timer = PhaseTimer()
+        # Remove a stale copy so completion is detected on the new file only
+        if output_file.exists():
+            output_file.unlink()
+
+        self.start_export(workbook_path, output_file, area, region, timer)
+        with timer.phase('pdf'):
+            size = wait_for_pdf(output_file, self.timeouts['pdf'], self.timeouts['stable'])
+        self.finish_export(timer)
+
+        return {'path': output_file, 'size': size, 'phases': dict(timer.phases), 'seconds': timer.total}
+
+def wait_for_tableau_window(process, workbook_path, timeout, fallback=DEFAULT_TIMEOUTS['load_fallback']):
+    """
+    Wait for the Tableau window for this workbook.
+
+    Where pyautogui can't list windows, wait `fallback` seconds instead (the old fixed
+    load delay), still failing early if the process exits.
+    """
+    import pyautogui
+
+    get_windows = getattr(pyautogui, 'getWindowsWithTitle', None)
+    title = Path(workbook_path).stem
+    deadline = time.monotonic() + (timeout if get_windows is not None else min(fallback, timeout))
+    while time.monotonic() < deadline:
+        if get_windows is not None and get_windows(title):
+            return
+        if process.poll() is not None:
+            raise RuntimeError(f"Tableau exited during load (code {process.returncode})")
+        time.sleep(0.5)
+    if get_windows is not None:
+        raise ExportTimeout(f"Tableau window for {title} did not appear after {timeout}s")
+
+def print_selected_pages():
+    """Select the Page 1-4 tabs and confirm Tableau's Print to PDF dialog"""
+    import pyautogui
+
+    # Select all 4 pages (Page 1 to Page 4) using Shift+Click FIRST
+    print("Selecting all 4 pages...")
+    pyautogui.click(2211, 1403)  # Click Page 1 tab
+    time.sleep(0.5)
+    pyautogui.keyDown('shift')  # Hold Shift
+    pyautogui.click(2418, 1403)  # Click Page 4 tab while holding Shift
+    pyautogui.keyUp('shift')  # Release Shift
+    time.sleep(2)
+
+    pyautogui.click(19, 29)
+    time.sleep(1)
+
+    # Click on "View PDF after printing" checkbox
+    pyautogui.click(54, 432)
+    time.sleep(1)
+
+    # Select "Selected sheets" radio button
+    pyautogui.click(1158, 718)
+    time.sleep(1)
+
+    # Click OK button
+    pyautogui.click(1300, 811)
+    time.sleep(3)
+
+def save_print_output(output_file):
+    """Type the full PDF path into the save dialog so we know where to watch for it"""
+    import pyautogui
+
+    pyautogui.write(str(Path(output_file).resolve()))
+    pyautogui.press('enter')
+
+class TableauGuiExporter(Exporter):
+    """Drives the Tableau Desktop GUI with pyautogui to print the four Page dashboards to PDF"""
+
+    def __init__(self, tableau_exe_path, timeouts=None):
+        super().__init__(timeouts)
+        self.tableau_exe_path = tableau_exe_path
+        self.process = None
+
+    def start_export(self, workbook_path, output_file, area, region, timer):
+        import pyautogui
+
+        print(f"Opening workbook: {workbook_path}")
+        with timer.phase('launch'):
+            self.process = subprocess.Popen([self.tableau_exe_path, str(workbook_path)])
+
+        with timer.phase('load'):
+            wait_for_tableau_window(self.process, workbook_path, self.timeouts['load'],
+                                    self.timeouts['load_fallback'])
+            time.sleep(self.timeouts['settle'])
+
+        with timer.phase('print'):
+            # Click to ensure Tableau window is active
+            pyautogui.click(500, 300)
+            time.sleep(2)
+
+            # Configure pyautogui
+            pyautogui.PAUSE = 1
+            pyautogui.FAILSAFE = True
+
+            # Maximize window before selecting pages
+            pyautogui.hotkey('alt', 'space')  # Open window menu
+            time.sleep(0.5)
+            pyautogui.press('x')  # Maximize
+            time.sleep(1)
+
+            print_selected_pages()
+
+        with timer.phase('save'):
+            save_print_output(output_file)
+
+    def finish_export(self, timer):
+        import pyautogui
+
+        # Close Tableau and wait for the process to exit
+        with timer.phase('close'):
+            pyautogui.hotkey('alt', 'f4')
+            try:
+                self.process.wait(timeout=self.timeouts['close'])
+            except subprocess.TimeoutExpired:
+                print("⚠️ Tableau did not exit after Alt+F4, terminating it")
+                self.process.terminate()
+
+    def close(self):
+        """Terminate a Tableau still running, e.g. one the scheduler abandoned after a timeout"""
+        if self.process is not None and self.process.poll() is None:
+            self.process.terminate()
+            try:
+                self.process.wait(timeout=self.timeouts['close'])
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+                self.process.wait()
+
+def minimal_pdf(lines, pages=1):
+    """Return a small valid PDF with the given text lines on each page"""
+    objects = [b"<< /Type /Catalog /Pages 2 0 R >>", None,
+               b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    page_ids = []
+    for page in range(pages):
+        text = [f"Page {page + 1}"] + list(lines)
+        stream = "BT /F1 12 Tf 72 720 Td 14 TL " + " ".join(
+            "(" + line.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)") + ") '" for line in text
+        ) + " ET"
+        stream_bytes = stream.encode('latin-1', 'replace')
+        objects.append(b"<< /Length %d >>\nstream\n" % len(stream_bytes) + stream_bytes + b"\nendstream")
+        objects.append(b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+                       b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % len(objects))
+        page_ids.append(len(objects))
+    objects[1] = b"<< /Type /Pages /Kids [" + b" ".join(b"%d 0 R" % i for i in page_ids) + b"] /Count %d >>" % pages
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n" % number + body + b"\nendobj\n"
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    out += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    return bytes(out)
+
+def write_pdf_slowly(output_file, data, delay, write_time, chunks=5):
+    """Write PDF bytes from a background thread, after a delay and in chunks, like a real printer"""
+
+    def write():
+        time.sleep(delay)
+        step = max(1, len(data) // chunks)
+        with open(output_file, 'wb') as f:
+            for offset in range(0, len(data), step):
+                f.write(data[offset:offset + step])
+                f.flush()
+                time.sleep(write_time / chunks)
+
+    thread = threading.Thread(target=write, daemon=True)
+    thread.start()
+    return thread
+
+class FakeExporter(Exporter):
+    """
+    Stand-in exporter for testing on machines without Tableau.
+
+    Writes a multi-page PDF in a background thread after `delay` seconds, in chunks
+    spread over `write_time` seconds, so the completion logic sees a growing file.
+    """
+
+    def __init__(self, delay=0.5, write_time=0.5, pages=4, timeouts=None):
+        super().__init__(timeouts)
+        self.delay = delay
+        self.write_time = write_time
+        self.pages = pages
+
+    def start_export(self, workbook_path, output_file, area, region, timer):
+        data = minimal_pdf([f"{area}", f"{region}", f"Workbook: {Path(workbook_path).name}"], self.pages)
+        with timer.phase('launch'):
+            write_pdf_slowly(output_file, data, self.delay, self.write_time)
+
+# Environment variable a command-line Tableau stand-in reads the PDF path from (its "save dialog")
+OUTPUT_ENV = "FAKE_TABLEAU_PDF"
+
+class CommandLineExporter(Exporter):
+    """
+    Launches a tableau.exe stand-in (see fake_tableau.py) exactly as the GUI exporter
+    launches Tableau, passing the PDF path in OUTPUT_ENV instead of typing it into the
+    save dialog, and waits for the process to exit.
+    """
+
+    def __init__(self, tableau_exe_path, timeouts=None):
+        super().__init__(timeouts)
+        self.tableau_exe_path = tableau_exe_path
+        self.process = None
+
+    def start_export(self, workbook_path, output_file, area, region, timer):
+        with timer.phase('launch'):
+            process = self.process = subprocess.Popen([self.tableau_exe_path, str(workbook_path)],
+                                                      env=dict(os.environ, **{OUTPUT_ENV: str(output_file)}))
+        with timer.phase('print'):
+            try:
+                returncode = process.wait(timeout=self.timeouts['load'] + self.timeouts['pdf'])
+            except subprocess.TimeoutExpired:
+                process.kill()
+                raise ExportTimeout(f"{self.tableau_exe_path} did not finish {output_file.name}")
+        if returncode != 0:
+            raise RuntimeError(f"{Path(self.tableau_exe_path).name} exited with code {returncode}")
+
+    def close(self):
+        """Kill an export still running, e.g. one the scheduler abandoned after a timeout"""
+        if self.process is not None and self.process.poll() is None:
+            self.process.kill()
+            self.process.wait()
+
+# Screen positions of the parameter controls on the Page dashboards - UPDATE THESE
+# for your display, the same way as the tab and dialog coordinates above
+DEFAULT_PARAMETER_CONTROLS = {
+    'Selected PAC': (2250, 180),
+    'Selected Region': (2250, 240),
+}
+
+class TableauBackend:
+    """The operations a warm session needs from a running Tableau instance"""
+
+    # True if set_filter() can repoint the worksheets' Areas PAC/Region filters in place;
+    # otherwise the rewritten workbook has to be reopened for every report
+    sets_filters = False
+
+    def open(self, workbook_path):
+        raise NotImplementedError
+
+    def is_open(self, workbook_path):
+        raise NotImplementedError
+
+    def set_parameter(self, caption, alias):
+        raise NotImplementedError
+
+    def set_filter(self, field, member):
+        """Keep only `member` (e.g. '"PAC - Auburn"') in every worksheet's categorical filter on `field`"""
+        raise NotImplementedError
+
+    def print_pdf(self, output_file):
+        raise NotImplementedError
+
+    def close(self):
+        raise NotImplementedError
+
+class GuiTableauBackend(TableauBackend):
+    """
+    Keeps Tableau Desktop open and drives its parameter controls with pyautogui.
+
+    The worksheets' Areas PAC/Region filters have no on-screen control to drive, so
+    the workbook is reopened for each report (see WarmSessionExporter).
+    """
+
+    def __init__(self, tableau_exe_path, parameter_controls=None, timeouts=None):
+        self.tableau_exe_path = tableau_exe_path
+        self.parameter_controls = parameter_controls or DEFAULT_PARAMETER_CONTROLS
+        self.timeouts = dict(DEFAULT_TIMEOUTS, **(timeouts or {}))
+        self.process = None
+        self.workbook_path = None
+
+    def open(self, workbook_path):
+        import pyautogui
+
+        self.close()
+        print(f"Opening workbook: {workbook_path}")
+        self.process = subprocess.Popen([self.tableau_exe_path, str(workbook_path)])
+        self.workbook_path = str(workbook_path)
+        wait_for_tableau_window(self.process, workbook_path, self.timeouts['load'], self.timeouts['load_fallback'])
+        time.sleep(self.timeouts['settle'])
+
+        # Click to ensure Tableau window is active, then maximize it
+        pyautogui.PAUSE = 1
+        pyautogui.FAILSAFE = True
+        pyautogui.click(500, 300)
+        pyautogui.hotkey('alt', 'space')
+        time.sleep(0.5)
+        pyautogui.press('x')
+        time.sleep(1)
+
+    def is_open(self, workbook_path):
+        return (self.process is not None and self.process.poll() is None
+                and self.workbook_path == str(workbook_path))
+
+    def set_parameter(self, caption, alias):
+        import pyautogui
+
+        # Open the parameter dropdown, type the display value and confirm it
+        x, y = self.parameter_controls[caption]
+        pyautogui.click(x, y)
+        time.sleep(0.5)
+        pyautogui.write(alias)
+        pyautogui.press('enter')
+        time.sleep(self.timeouts['settle'])
+
+    def print_pdf(self, output_file):
+        print_selected_pages()
+        save_print_output(output_file)
+
+    def close(self):
+        import pyautogui
+
+        if self.process is None or self.process.poll() is not None:
+            self.process = None
+            return
+        pyautogui.hotkey('alt', 'f4')
+        try:
+            self.process.wait(timeout=self.timeouts['close'])
+        except subprocess.TimeoutExpired:
+            print("⚠️ Tableau did not exit after Alt+F4, terminating it")
+            self.process.terminate()
+        self.process = None
+
+def workbook_filters(workbook_path, fields=('Areas PAC', 'Areas Region')):
+    """{field: set of members} the workbook's categorical filters on each field keep"""
+    backend = get_backend()
+    root = backend.parse(workbook_path)
+    return {field: {groupfilter.get('member') for groupfilter in find_categorical_groupfilters(root, field, backend)}
+            for field in fields}
+
+class ScriptedBackend(TableauBackend):
+    """
+    Local stand-in for a running Tableau, for exercising warm sessions without Tableau.
+
+    Opening costs `load_delay` seconds and loads the workbook's worksheet filters;
+    printing writes a PDF showing the current parameter and filter values after
+    `print_delay` seconds. `opens` and `calls` record usage.
+    """
+
+    sets_filters = True
+
+    def __init__(self, load_delay=1.0, print_delay=0.2, write_time=0.2, pages=4):
+        self.load_delay = load_delay
+        self.print_delay = print_delay
+        self.write_time = write_time
+        self.pages = pages
+        self.workbook_path = None
+        self.parameters = {}
+        self.filters = {}
+        self.opens = 0
+        self.calls = []
+
+    def open(self, workbook_path):
+        self.calls.append(('open', str(workbook_path)))
+        time.sleep(self.load_delay)
+        self.workbook_path = str(workbook_path)
+        self.parameters = {}
+        self.filters = workbook_filters(workbook_path)
+        self.opens += 1
+
+    def is_open(self, workbook_path):
+        return self.workbook_path == str(workbook_path)
+
+    def set_parameter(self, caption, alias):
+        self.calls.append(('set_parameter', caption, alias))
+        self.parameters[caption] = alias
+
+    def set_filter(self, field, member):
+        self.calls.append(('set_filter', field, member))
+        self.filters[field] = {member}
+
+    def print_pdf(self, output_file):
+        self.calls.append(('print_pdf', str(output_file)))
+        lines = [f"{caption}: {alias}" for caption, alias in sorted(self.parameters.items())]
+        lines += [f"{field}: {', '.join(sorted(members))}" for field, members in sorted(self.filters.items())]
+        write_pdf_slowly(output_file, minimal_pdf(lines, self.pages), self.print_delay, self.write_time)
+
+    def close(self):
+        if self.workbook_path is not None:
+            self.calls.append(('close', self.workbook_path))
+        self.workbook_path = None
+
+class WarmSessionExporter(Exporter):
+    """
+    Exports every report from one open workbook by switching the Selected PAC and
+    Selected Region parameters, and the worksheets' Areas PAC/Region filters, between
+    prints instead of reopening Tableau.
+
+    A backend that can't set the filters reopens the workbook for every report, so
+    callers must write the rewritten workbook out each time (warm is False then).
+    """
+
+    def __init__(self, backend, region_aliases=None, timeouts=None, area_value=None):
+        super().__init__(timeouts)
+        self.backend = backend
+        self.region_aliases = region_aliases or {}
+        # Filter member for an area, e.g. GeographyIndex.area_value ('"PD - X"' for PDs)
+        self.area_value = area_value or (lambda area: f'"PAC - {area}"')
+
+    @property
+    def warm(self):
+        return self.backend.sets_filters
+
+    def start_export(self, workbook_path, output_file, area, region, timer):
+        # Only pay for launch and data-source connection when the session is cold
+        if not (self.warm and self.backend.is_open(workbook_path)):
+            with timer.phase('launch'):
+                self.backend.open(workbook_path)
+
+        with timer.phase('parameters'):
+            self.backend.set_parameter('Selected PAC', area)
+            self.backend.set_parameter('Selected Region', self.region_aliases.get(region, region))
+            if self.warm:
+                self.backend.set_filter('Areas PAC', self.area_value(area))
+                self.backend.set_filter('Areas Region', f'"{region}"')
+
+        with timer.phase('print'):
+            self.backend.print_pdf(output_file)
+
+    def close(self):
+        self.backend.close()
@@ -0,0 +1,110 @@
+import argparse
+import hashlib
+import os
+import sys
+import time
+import xml.etree.ElementTree as ET
+from pathlib import Path
+
+from exporters import OUTPUT_ENV, minimal_pdf
+
+# Stand-in for tableau.exe: python fake_tableau.py <workbook.twb> [options], or the shim install_shim() writes
+
+# Seconds to "open" the workbook and to "print" the dashboards, unless overridden
+LOAD_DELAY = 2.0
+PRINT_DELAY = 1.0
+WRITE_TIME = 0.2
+
+def read_parameters(workbook_path):
+    """Return the current {'Selected PAC': alias, 'Selected Region': region} of a .twb, in one streaming pass"""
+    parameters = {}
+    for event, elem in ET.iterparse(workbook_path, events=('end',)):
+        if elem.tag == 'column' and elem.get('caption') in ('Selected PAC', 'Selected Region'):
+            caption = elem.get('caption')
+            if caption not in parameters:
+                parameters[caption] = (elem.get('alias') if caption == 'Selected PAC'
+                                       else elem.get('value', '').strip('"'))
+            if len(parameters) == 2:
+                break
+        elem.clear()
+    return parameters
+
+def report_pdf(workbook_path, pages=None):
+    """Deterministic report PDF for the workbook's current parameters: same workbook, same bytes"""
+    parameters = read_parameters(workbook_path)
+    service = "Telephone" if "Telephone" in Path(workbook_path).name else "Walk-in"
+    pages = pages or (3 if service == "Telephone" else 4)
+    pac = parameters.get('Selected PAC', 'Unknown PAC')
+    lines = [f"{pac} - {service} Service Assessment", parameters.get('Selected Region', 'Unknown Region')]
+    return minimal_pdf(lines, pages)
+
+def should_fail(workbook_path, fail_rate, state_dir):
+    """
+    Fail the first launch for a deterministic share of PACs, so retries can be measured.
+
+    The PAC is hashed into [0, 1); launches are remembered in state_dir, so a retry succeeds.
+    """
+    if fail_rate <= 0:
+        return False
+    pac = read_parameters(workbook_path).get('Selected PAC', '')
+    digest = hashlib.sha256(pac.encode('utf-8')).digest()
+    if int.from_bytes(digest[:4], 'big') / 2 ** 32 >= fail_rate:
+        return False
+    marker = Path(state_dir) / f"{digest.hex()[:16]}.failed"
+    if marker.exists():
+        return False
+    marker.parent.mkdir(parents=True, exist_ok=True)
+    marker.touch()
+    return True
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Stand-in for tableau.exe that prints a workbook to PDF")
+    parser.add_argument("workbook", help="the .twb Tableau was asked to open")
+    parser.add_argument("--load-delay", type=float, default=LOAD_DELAY, help="seconds to open the workbook")
+    parser.add_argument("--print-delay", type=float, default=PRINT_DELAY, help="seconds to print the dashboards")
+    parser.add_argument("--write-time", type=float, default=WRITE_TIME, help="seconds spent writing the PDF")
+    parser.add_argument("--pages", type=int, help="pages to print (default: 4 walk-in, 3 telephone)")
+    parser.add_argument("--fail-rate", type=float, default=0.0, help="share of PACs whose first launch fails")
+    parser.add_argument("--state-dir", default=".fake_tableau", help="where first-launch failures are remembered")
+    args = parser.parse_args(argv)
+
+    workbook_path = Path(args.workbook)
+    output_file = Path(os.environ.get(OUTPUT_ENV) or workbook_path.with_suffix(".pdf"))
+    time.sleep(args.load_delay)
+    if should_fail(workbook_path, args.fail_rate, args.state_dir):
+        print(f"fake tableau: simulated crash opening {workbook_path.name}", file=sys.stderr)
+        return 1
+    data = report_pdf(workbook_path, args.pages)
+    time.sleep(args.print_delay)
+
+    # Written in chunks like a real print driver, so completion detection sees a growing file
+    chunks = 5
+    step = max(1, len(data) // chunks)
+    with open(output_file, 'wb') as f:
+        for offset in range(0, len(data), step):
+            f.write(data[offset:offset + step])
+            f.flush()
+            time.sleep(args.write_time / chunks)
+    return 0
+
+def install_shim(directory, load_delay=LOAD_DELAY, print_delay=PRINT_DELAY, write_time=WRITE_TIME,
+                 fail_rate=0.0, state_dir=None):
+    """Write an executable 'tableau.exe' that runs this stand-in with the given options; returns its path"""
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    state_dir = Path(state_dir or directory / ".fake_tableau").resolve()
+    options = [f"--load-delay={load_delay}", f"--print-delay={print_delay}", f"--write-time={write_time}",
+               f"--fail-rate={fail_rate}", f"--state-dir={state_dir}"]
+    shim = directory / "tableau.exe"
+    shim.write_text(
+        f"#!{sys.executable}\n"
+        "import sys\n"
+        f"sys.path.insert(0, {str(Path(__file__).resolve().parent)!r})\n"
+        "from fake_tableau import main\n"
+        f"sys.exit(main(sys.argv[1:] + {options!r}))\n",
+        encoding='utf-8')
+    shim.chmod(0o755)
+    return shim
+
+if __name__ == "__main__":
+    sys.exit(main())
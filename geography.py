@@ -0,0 +1,94 @@
+import xml.etree.ElementTree as ET
+from pathlib import Path
+
+from template_all import PAC_TO_REGION
+
+VALID_REGIONS = ['Central Metropolitan', 'North West Metropolitan', 'Northern',
+                 'South West Metropolitan', 'Southern', 'Western']
+
+def is_area_value(value):
+    """Return True if a member value is a quoted PAC or PD name"""
+    return value.startswith('"PAC - ') or value.startswith('"PD - ')
+
+class GeographyIndex:
+    """
+    PAC/PD and region lookups for a workbook, built in one streaming pass over the .twb.
+
+    alias -> member value, alias -> region and the valid region set are plain dicts
+    and sets, so validating or rewriting a row is O(1) instead of a tree scan.
+    """
+
+    def __init__(self, workbook_path, pac_to_region=PAC_TO_REGION):
+        self.workbook_path = Path(workbook_path)
+        # First member value seen for each alias, in document order
+        self.member_values = {}
+        # Alias -> quoted PAC/PD value, for members that are areas
+        self.area_values = {}
+        self.valid_regions = set()
+        # Distinct (kind, key, value) triples used to explain validation failures
+        self.entries = set()
+
+        for event, elem in ET.iterparse(self.workbook_path, events=('end',)):
+            if elem.tag == 'member':
+                alias = elem.get('alias')
+                value = elem.get('value', '')
+                self.entries.add(('member', alias, value))
+                if alias is not None:
+                    self.member_values.setdefault(alias, value)
+                    if is_area_value(value):
+                        self.area_values.setdefault(alias, value)
+                if value and not is_area_value(value) and value.strip('"') in VALID_REGIONS:
+                    self.valid_regions.add(value.strip('"'))
+            elif elem.tag == 'alias':
+                self.entries.add(('alias', elem.get('key'), elem.get('value')))
+            # Free finished subtrees so memory stays flat
+            elem.clear()
+
+        self.entries = sorted(self.entries, key=lambda entry: (entry[0], str(entry[1]), str(entry[2])))
+        self.area_regions = {
+            alias: pac_to_region[alias] for alias in self.area_values if alias in pac_to_region
+        }
+
+    @property
+    def valid_areas(self):
+        """Aliases of every PAC and PD in the workbook"""
+        return set(self.area_values)
+
+    def area_type(self, alias):
+        """Return "PD" if the first member with this alias is a PD, else "PAC" """
+        return "PD" if self.member_values.get(alias, '').startswith('"PD - ') else "PAC"
+
+    def area_value(self, alias):
+        """Return the quoted "PAC - X"/"PD - X" value for an alias"""
+        return f'"{self.area_type(alias)} - {alias}"'
+
+    def region_for(self, alias):
+        """Return the region a PAC/PD belongs to, or None if unknown"""
+        return self.area_regions.get(alias)
+
+    def find_similar(self, text, limit=3):
+        """Return up to `limit` descriptions of members/aliases mentioning the text"""
+        needle = text.lower()
+        found = []
+        for kind, key, value in self.entries:
+            if needle in str(key).lower() or needle in str(value).lower():
+                if kind == 'member':
+                    found.append(f"alias='{key}' value='{value}'")
+                else:
+                    found.append(f"alias key='{key}' value='{value}'")
+                if len(found) >= limit:
+                    break
+        return found
+
+# Indexes already built in this process: path -> (mtime, index)
+_INDEXES = {}
+
+def load_geography_index(workbook_path):
+    """Return a cached GeographyIndex for a workbook, rebuilding it if the file changed"""
+    path = Path(workbook_path).resolve()
+    mtime = path.stat().st_mtime_ns
+    cached = _INDEXES.get(path)
+    if cached is None or cached[0] != mtime:
+        cached = (mtime, GeographyIndex(path))
+        _INDEXES[path] = cached
+    return cached[1]
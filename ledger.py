@@ -0,0 +1,101 @@
+import json
+import os
+import threading
+import time
+from pathlib import Path
+
+LEDGER_NAME = "export_ledger.jsonl"
+
+class JobLedger:
+    """
+    Append-only JSONL record of export jobs, so a crashed batch can resume.
+
+    Each line is one state change (started, completed or failed) for a job keyed by
+    (area, region, service, workbook hash). The latest line per key wins.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.states = {}
+        self.needs_newline = False
+        # Scheduler slots record jobs from several threads
+        self.lock = threading.Lock()
+        if self.path.exists():
+            with open(self.path, 'rb') as f:
+                f.seek(0, os.SEEK_END)
+                if f.tell() > 0:
+                    f.seek(-1, os.SEEK_END)
+                    self.needs_newline = f.read(1) != b"\n"
+            with open(self.path, encoding='utf-8') as f:
+                for line_number, line in enumerate(f, start=1):
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        # A crash mid-write can leave a partial last line
+                        print(f"Warning: Skipping unreadable ledger line {line_number} in {self.path}")
+                        continue
+                    self.states[tuple(entry['key'])] = entry
+
+    @staticmethod
+    def key(area, region, service, workbook_hash):
+        return (area, region, service, workbook_hash)
+
+    def append(self, key, state, **fields):
+        """Record a state change and flush it to disk immediately"""
+        entry = dict(key=list(key), state=state, time=time.time(), **fields)
+        with self.lock:
+            self.states[key] = entry
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.path, 'a', encoding='utf-8') as f:
+                if self.needs_newline:
+                    f.write("\n")
+                    self.needs_newline = False
+                f.write(json.dumps(entry) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+
+    def mark_started(self, key):
+        self.append(key, 'started')
+
+    def mark_completed(self, key, output_path, size, seconds=None):
+        self.append(key, 'completed', output=str(output_path), size=size, seconds=seconds)
+
+    def mark_failed(self, key, error):
+        self.append(key, 'failed', error=str(error))
+
+    def durations(self, service):
+        """
+        {(area, region): seconds} of each job's latest completed export for a service.
+
+        Entries from any workbook hash count, so an edited template still gets
+        estimates from the previous run.
+        """
+        latest = {}
+        for (area, region, entry_service, _), entry in self.states.items():
+            if entry_service != service or entry['state'] != 'completed' or entry.get('seconds') is None:
+                continue
+            if (area, region) not in latest or latest[(area, region)]['time'] < entry['time']:
+                latest[(area, region)] = entry
+        return {key: entry['seconds'] for key, entry in latest.items()}
+
+    def state(self, key):
+        """Return 'completed', 'failed', 'started' or None for a job"""
+        entry = self.states.get(key)
+        return entry['state'] if entry else None
+
+    def is_completed(self, key):
+        """Return True if the job completed and its PDF is still on disk at the recorded size"""
+        entry = self.states.get(key)
+        if entry is None or entry['state'] != 'completed':
+            return False
+        try:
+            return os.path.getsize(entry['output']) == entry['size']
+        except OSError:
+            return False
+
+    def should_run(self, key, retry_failed_only=False):
+        """Decide whether a job needs to run on this pass"""
+        if retry_failed_only:
+            # A job left 'started' was interrupted by a crash or kill, so it is rerun too
+            return self.state(key) in ('failed', 'started')
+        return not self.is_completed(key)
@@ -0,0 +1,152 @@
+import argparse
+import hashlib
+import os
+import re
+import time
+from collections import defaultdict
+from pathlib import Path
+
+import pymupdf
+
+# Object references inside a PDF object's dictionary
+REF_RE = re.compile(rb"\b(\d+) 0 R\b")
+
+# Objects that must stay distinct even when their text matches (each page is its own node)
+UNIQUE_TYPES = (b"/Type /Page", b"/Type /Pages", b"/Type /Catalog", b"/Type /Outlines")
+
+def parse_report_name(path):
+    """Split '<area> - <region> - <service>.pdf' into (area, region, service), or None"""
+    parts = Path(path).stem.rsplit(" - ", 2)
+    return tuple(parts) if len(parts) == 3 else None
+
+class BookWriter:
+    """
+    Appends PDFs to one book, storing identical objects only once as it goes.
+
+    Each source is opened, copied and closed before the next one, and every object
+    it brings in (images, soft masks, fonts, resource dictionaries) is hashed; a copy
+    of something already in the book is re-pointed to the earlier object and emptied
+    straight away. Memory therefore grows with the book's unique content, not with
+    the number of reports, and the final save drops the emptied copies.
+    """
+
+    def __init__(self):
+        self.doc = pymupdf.open()
+        self.seen = {}       # object key -> xref already in the book
+        self.toc = []
+        self.duplicates = 0
+        self.saved_bytes = 0
+
+    def object_key(self, xref, mapping):
+        """Hash an object's dictionary (with duplicate references resolved) and its raw stream"""
+        text = self.doc.xref_object(xref, compressed=True).encode('utf-8')
+        if any(kind in text for kind in UNIQUE_TYPES):
+            return None
+        text = REF_RE.sub(lambda m: b"%d 0 R" % mapping.get(int(m.group(1)), int(m.group(1))), text)
+        digest = hashlib.sha256(text)
+        if self.doc.xref_is_stream(xref):
+            digest.update(self.doc.xref_stream_raw(xref))
+        return digest.hexdigest()
+
+    def dedupe(self, first_xref):
+        """Fold the objects added from first_xref onwards into identical ones already in the book"""
+        new_xrefs = range(first_xref, self.doc.xref_length())
+        mapping = {}
+        # Objects can only match once what they reference has been matched, so repeat until stable
+        changed = True
+        while changed:
+            changed = False
+            for xref in new_xrefs:
+                if xref in mapping:
+                    continue
+                key = self.object_key(xref, mapping)
+                if key is None:
+                    continue
+                canonical = self.seen.get(key)
+                if canonical is None or canonical == xref:
+                    continue
+                mapping[xref] = canonical
+                changed = True
+
+        for xref in new_xrefs:
+            if xref in mapping:
+                continue
+            text = self.doc.xref_object(xref, compressed=True)
+            rewritten = REF_RE.sub(lambda m: b"%d 0 R" % mapping.get(int(m.group(1)), int(m.group(1))),
+                                   text.encode('utf-8')).decode('utf-8')
+            if rewritten != text:
+                self.doc.update_object(xref, rewritten)
+            key = self.object_key(xref, mapping)
+            if key is not None:
+                self.seen.setdefault(key, xref)
+
+        for xref in mapping:
+            if self.doc.xref_is_stream(xref):
+                self.saved_bytes += len(self.doc.xref_stream_raw(xref))
+                self.doc.update_stream(xref, b"")
+        self.duplicates += len(mapping)
+
+    def append(self, pdf_path, title):
+        """Copy every page of a PDF into the book under one bookmark"""
+        first_xref = self.doc.xref_length()
+        first_page = self.doc.page_count + 1
+        with pymupdf.open(pdf_path) as source:
+            self.doc.insert_pdf(source)
+        self.dedupe(first_xref)
+        self.toc.append([1, title, first_page])
+
+    def save(self, output_path):
+        """Write the book atomically, dropping the emptied duplicates"""
+        output_path = Path(output_path)
+        output_path.parent.mkdir(parents=True, exist_ok=True)
+        self.doc.set_toc(self.toc)
+        temp_path = output_path.with_name(output_path.stem + ".tmp.pdf")
+        self.doc.save(temp_path, garbage=3, deflate=True)
+        self.doc.close()
+        os.replace(temp_path, output_path)
+        return output_path
+
+def group_reports(pdf_paths):
+    """Group report PDFs into {(region, service): [(area, path), ...]} sorted by area"""
+    books = defaultdict(list)
+    for path in pdf_paths:
+        parsed = parse_report_name(path)
+        if parsed is None:
+            print(f"Warning: Skipping {path}: name isn't '<area> - <region> - <service>.pdf'")
+            continue
+        area, region, service = parsed
+        books[(region, service)].append((area, Path(path)))
+    return {key: sorted(reports) for key, reports in sorted(books.items())}
+
+def merge_region_books(pdf_paths, books_dir):
+    """Write one bookmarked book per region and service; returns a list of result dicts"""
+    results = []
+    for (region, service), reports in group_reports(pdf_paths).items():
+        start = time.perf_counter()
+        writer = BookWriter()
+        for area, path in reports:
+            writer.append(path, area.replace("_", "/"))
+        book_path = writer.save(Path(books_dir) / f"{region} - {service}.pdf")
+        input_bytes = sum(path.stat().st_size for _, path in reports)
+        results.append({
+            'path': book_path,
+            'reports': len(reports),
+            'input_bytes': input_bytes,
+            'size': book_path.stat().st_size,
+            'duplicates': writer.duplicates,
+            'seconds': time.perf_counter() - start,
+        })
+        print(f"📚 {book_path.name}: {len(reports)} report(s), {input_bytes / 1e6:.2f} MB -> "
+              f"{results[-1]['size'] / 1e6:.2f} MB ({writer.duplicates} duplicate object(s) shared)")
+    return results
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Merge per-PAC report PDFs into one bookmarked book per region")
+    parser.add_argument("input", help="folder searched recursively for '<area> - <region> - <service>.pdf' files")
+    parser.add_argument("--output", default="Export/Books", help="folder for the region books")
+    args = parser.parse_args()
+
+    books_dir = Path(args.output).resolve()
+    pdfs = [path for path in sorted(Path(args.input).rglob("*.pdf")) if books_dir not in path.resolve().parents]
+    results = merge_region_books(pdfs, args.output)
+    print(f"Merged {sum(r['reports'] for r in results)} report(s) into {len(results)} book(s)")
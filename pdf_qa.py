@@ -0,0 +1,157 @@
+import argparse
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import pandas as pd
+import pymupdf
+
+from ledger import LEDGER_NAME, JobLedger
+from pdf_books import parse_report_name
+from report_catalog import SERVICE_LABELS
+
+# Dashboards printed per report (Page 1-4 for walk-in, Page 1-3 for telephone)
+EXPECTED_PAGES = {"Walk-in": 4, "Telephone": 3}
+
+# The PAC and region names must appear in this top fraction of every page
+HEADER_FRACTION = 0.2
+
+# Pages with fewer non-white pixels than this (as a fraction) are reported as near-empty
+MIN_INK = 0.002
+INK_LEVEL = 230      # grey level below which a pixel counts as ink
+INK_DPI = 36         # low resolution is plenty to tell a blank page from a report
+
+QA_REPORT_NAME = "qa_report.json"
+RETRY_FILTER_NAME = "qa_retry.xlsx"
+
+def service_for_label(label):
+    """Map a file name's service suffix ('Walkin', 'Telephone', ...) to its service type"""
+    for service, labels in SERVICE_LABELS.items():
+        if label in labels:
+            return service
+    return None
+
+def name_forms(name):
+    """Spellings the header may use for a name taken from a file name"""
+    forms = {name, name.replace("_", "/"), name.replace("_", " ")}
+    for form in list(forms):
+        if "Metropolitan" not in form:
+            forms.add(form.replace("Metro", "Metropolitan"))
+    return forms
+
+def ink_fraction(page):
+    """Fraction of a page's pixels darker than INK_LEVEL when rendered in grey"""
+    samples = page.get_pixmap(dpi=INK_DPI, colorspace=pymupdf.csGRAY).samples
+    return sum(samples.count(level) for level in range(INK_LEVEL)) / max(1, len(samples))
+
+def check_pdf(path, min_ink=MIN_INK):
+    """Check one exported report; returns a result dict with a list of problems (empty when it passes)"""
+    path = Path(path)
+    result = {'path': str(path), 'area': None, 'region': None, 'service': None,
+              'pages': None, 'expected_pages': None, 'problems': []}
+    problems = result['problems']
+    parsed = parse_report_name(path)
+    if parsed is None:
+        problems.append("name isn't '<area> - <region> - <service>.pdf'")
+    else:
+        area, region, label = parsed
+        result.update(area=area, region=region, service=service_for_label(label))
+        if result['service'] is None:
+            problems.append(f"unknown service '{label}'")
+
+    try:
+        doc = pymupdf.open(path)
+    except Exception as e:
+        problems.append(f"can't open: {e}")
+        return result
+
+    with doc:
+        result['pages'] = doc.page_count
+        expected = EXPECTED_PAGES.get(result['service'])
+        result['expected_pages'] = expected
+        if expected is not None and doc.page_count != expected:
+            problems.append(f"{doc.page_count} page(s), expected {expected}")
+
+        for number, page in enumerate(doc, start=1):
+            if result['area'] is not None:
+                header = page.get_text(clip=pymupdf.Rect(0, 0, page.rect.width, page.rect.height * HEADER_FRACTION))
+                for kind in ('area', 'region'):
+                    if not any(form in header for form in name_forms(result[kind])):
+                        problems.append(f"page {number}: {kind} '{result[kind]}' not in the header")
+            ink = ink_fraction(page)
+            if ink < min_ink:
+                problems.append(f"page {number}: near-empty ({ink:.2%} ink)")
+    return result
+
+def check_pdfs(pdf_paths, workers=None, min_ink=MIN_INK):
+    """Check PDFs in a process pool (rendering and text extraction are CPU-bound); returns result dicts"""
+    pdf_paths = [str(path) for path in pdf_paths]
+    if not pdf_paths:
+        return []
+    workers = min(workers or os.cpu_count() or 1, len(pdf_paths))
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(check_pdf, pdf_paths, [min_ink] * len(pdf_paths)))
+
+def write_qa_report(results, report_path):
+    """Write the pass/fail report as JSON and return it"""
+    failed = [result for result in results if result['problems']]
+    report = {'checked': len(results), 'passed': len(results) - len(failed), 'failed': len(failed),
+              'results': results}
+    Path(report_path).parent.mkdir(parents=True, exist_ok=True)
+    Path(report_path).write_text(json.dumps(report, indent=2), encoding='utf-8')
+    return report
+
+def requeue_failures(results, ledger_path):
+    """Mark the ledger jobs behind failed PDFs as failed, so a --retry-failed run redoes them"""
+    ledger = JobLedger(ledger_path)
+    problems = {os.path.normcase(os.path.abspath(result['path'])): "; ".join(result['problems'])
+                for result in results if result['problems']}
+    requeued = 0
+    for key, entry in list(ledger.states.items()):
+        if entry['state'] != 'completed':
+            continue
+        problem = problems.get(os.path.normcase(os.path.abspath(entry['output'])))
+        if problem is not None:
+            ledger.mark_failed(key, f"qa: {problem}")
+            requeued += 1
+    return requeued
+
+def write_retry_filter(results, filter_path):
+    """Write the failed reports as a filter.xlsx (Area, Region) for process_filter_file; returns the row count"""
+    rows = [{'Area': result['area'].replace("_", "/"), 'Region': result['region']}
+            for result in results if result['problems'] and result['area'] is not None]
+    if rows:
+        pd.DataFrame(rows, columns=['Area', 'Region']).to_excel(filter_path, index=False)
+    return len(rows)
+
+def run_qa(pdf_paths, output_dir, workers=None, ledger_path=None, min_ink=MIN_INK):
+    """Check the PDFs, write the report next to them and feed failures back for a rerun"""
+    output_dir = Path(output_dir)
+    results = check_pdfs(pdf_paths, workers, min_ink)
+    report = write_qa_report(results, output_dir / QA_REPORT_NAME)
+    ledger_path = Path(ledger_path or output_dir / LEDGER_NAME)
+    report['requeued'] = requeue_failures(results, ledger_path) if ledger_path.exists() else 0
+    report['retry_rows'] = write_retry_filter(results, output_dir / RETRY_FILTER_NAME)
+
+    for result in results:
+        if result['problems']:
+            print(f"❌ {Path(result['path']).name}: {'; '.join(result['problems'])}")
+    print(f"🔍 QA: {report['passed']}/{report['checked']} passed, report in {output_dir / QA_REPORT_NAME}")
+    if report['failed']:
+        print(f"🔁 {report['retry_rows']} failed report(s) written to {output_dir / RETRY_FILTER_NAME}"
+              f" ({report['requeued']} marked failed in the ledger)")
+    return report
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Check exported report PDFs: pages, header names and blank pages")
+    parser.add_argument("input", help="folder searched recursively for report PDFs")
+    parser.add_argument("--output", help="folder for the QA report and retry filter (default: the input folder)")
+    parser.add_argument("--workers", type=int, help="checker processes (default: one per CPU)")
+    parser.add_argument("--ledger", help=f"job ledger to mark failures in (default: <output>/{LEDGER_NAME})")
+    parser.add_argument("--min-ink", type=float, default=MIN_INK, help="non-white pixel fraction below which a page is near-empty")
+    args = parser.parse_args()
+
+    pdfs = sorted(Path(args.input).rglob("*.pdf"))
+    report = run_qa(pdfs, args.output or args.input, args.workers, args.ledger, args.min_ink)
+    raise SystemExit(1 if report['failed'] else 0)
@@ -0,0 +1,271 @@
+import argparse
+import queue
+import threading
+import time
+from pathlib import Path
+
+import tracing
+from data_cache import read_sheet
+from exporters import FakeExporter, TableauGuiExporter, is_complete_pdf
+from geography import load_geography_index
+from ledger import LEDGER_NAME, JobLedger
+from pdf_books import merge_region_books
+from pdf_qa import run_qa
+from template_all import get_service_type
+from workbook_session import WorkbookSession
+
+# Jobs allowed to wait between two stages; generation runs at most this far ahead of the export
+QUEUE_SIZE = 2
+
+# Marks the end of the job stream on a queue
+DONE = object()
+
+class Stage:
+    """A pipeline stage: `workers` threads applying func(job) -> job (or None to drop it)"""
+
+    def __init__(self, name, func, workers=1):
+        self.name = name
+        self.func = func
+        self.workers = max(1, workers)
+        self.busy = 0.0      # seconds spent in func
+        self.blocked = 0.0   # seconds waiting for room in the next stage's queue
+        self.processed = 0
+        self.dropped = 0
+        self.failed = 0
+        self.lock = threading.Lock()
+
+class Pipeline:
+    """
+    Runs jobs through a chain of stages connected by bounded queues.
+
+    Every stage has its own threads, so while the export stage waits on Tableau for
+    row N, validation and generation are already working on rows N+1 and N+2. The
+    bounded queues apply back-pressure, so a fast stage can't run far ahead of a slow one.
+    A job that raises is recorded as failed (and passed to on_failure) and goes no further.
+    """
+
+    def __init__(self, stages, queue_size=QUEUE_SIZE, on_failure=None):
+        self.stages = stages
+        self.queues = [queue.Queue(maxsize=max(1, queue_size)) for _ in stages]
+        self.on_failure = on_failure
+        self.remaining = [stage.workers for stage in stages]
+        self.remaining_lock = threading.Lock()
+        self.completed = []
+        self.failures = []
+
+    def hand_on(self, index, job):
+        """Put a job on the queue after stage `index` (or collect it after the last stage)"""
+        if index + 1 == len(self.stages):
+            self.completed.append(job)
+            return
+        stage = self.stages[index]
+        start = time.perf_counter()
+        self.queues[index + 1].put(job)
+        with stage.lock:
+            stage.blocked += time.perf_counter() - start
+
+    def worker(self, index):
+        """Take jobs for one stage until its queue is drained"""
+        stage = self.stages[index]
+        inbox = self.queues[index]
+        while True:
+            job = inbox.get()
+            if job is DONE:
+                break
+            start = time.perf_counter()
+            try:
+                with tracing.job(f"{job.get('area', job.get('Area'))} - {job.get('region', job.get('Region'))}"):
+                    with tracing.span(stage.name):
+                        result = stage.func(job)
+                error = None
+            except Exception as e:
+                result, error = None, f"{type(e).__name__}: {e}"
+            seconds = time.perf_counter() - start
+            with stage.lock:
+                stage.busy += seconds
+                if error is not None:
+                    stage.failed += 1
+                elif result is None:
+                    stage.dropped += 1
+                else:
+                    stage.processed += 1
+
+            if error is not None:
+                print(f"❌ [{stage.name}] {job.get('area')} - {job.get('region')}: {error}")
+                self.failures.append({'stage': stage.name, 'job': job, 'error': error})
+                if self.on_failure is not None:
+                    self.on_failure(job, stage.name, error)
+            elif result is not None:
+                self.hand_on(index, result)
+
+        # The last worker of a stage tells every worker of the next stage to stop
+        with self.remaining_lock:
+            self.remaining[index] -= 1
+            last = self.remaining[index] == 0
+        if last and index + 1 < len(self.stages):
+            for _ in range(self.stages[index + 1].workers):
+                self.queues[index + 1].put(DONE)
+
+    def run(self, jobs):
+        """Feed the jobs through every stage and return a report dict"""
+        start = time.perf_counter()
+        threads = [threading.Thread(target=self.worker, args=(index,), daemon=True)
+                   for index, stage in enumerate(self.stages) for _ in range(stage.workers)]
+        for thread in threads:
+            thread.start()
+        for job in jobs:
+            self.queues[0].put(job)
+        for _ in range(self.stages[0].workers):
+            self.queues[0].put(DONE)
+        for thread in threads:
+            thread.join()
+        wall = time.perf_counter() - start
+
+        return {
+            'jobs': len(self.completed) + len(self.failures),
+            'completed': len(self.completed),
+            'failed': self.failures,
+            'wall_seconds': wall,
+            'stages': [{
+                'name': stage.name,
+                'workers': stage.workers,
+                'processed': stage.processed,
+                'dropped': stage.dropped,
+                'failed': stage.failed,
+                'busy_seconds': stage.busy,
+                'blocked_seconds': stage.blocked,
+                'utilisation': stage.busy / (wall * stage.workers) if wall > 0 else 0.0,
+            } for stage in self.stages],
+            'results': self.completed,
+        }
+
+def print_pipeline_report(report):
+    """Print per-stage utilisation and any failures"""
+    print("=" * 50)
+    print(f"📊 {report['completed']}/{report['jobs']} reports in {report['wall_seconds']:.1f}s")
+    for stage in report['stages']:
+        print(f"   {stage['name']:<10} {stage['utilisation']:>4.0%} busy  "
+              f"({stage['busy_seconds']:.1f}s working, {stage['blocked_seconds']:.1f}s blocked, "
+              f"{stage['processed']} passed, {stage['dropped']} skipped, {stage['failed']} failed)")
+    if report['failed']:
+        print(f"❌ {len(report['failed'])} failed:")
+        for failure in report['failed']:
+            print(f"   {failure['job'].get('area')} - {failure['job'].get('region')} "
+                  f"at {failure['stage']}: {failure['error']}")
+    print("=" * 50)
+
+def run_filter_pipeline(filter_file_path, workbook_path, output_dir, exporter, queue_size=QUEUE_SIZE,
+                        retry_failed_only=False, ledger_path=None, keep_workbooks=False, books_dir=None,
+                        qa=False):
+    """
+    Export every filter.xlsx row as a pipeline: ingest -> validate -> generate -> export -> verify.
+
+    Each row gets its own workbook file in <output_dir>/workbooks, so the next row can be
+    generated while Tableau still has the previous one open. With qa, the verified PDFs are
+    checked in a process pool (see pdf_qa.py) and failures are marked for --retry-failed; with
+    books_dir, the PDFs that passed are merged into one bookmarked book per region.
+    """
+    workbook_path = Path(workbook_path)
+    output_dir = Path(output_dir)
+    workbook_dir = output_dir / "workbooks"
+    workbook_dir.mkdir(parents=True, exist_ok=True)
+
+    geography = load_geography_index(workbook_path)
+    session = WorkbookSession(workbook_path, geography)
+    service = get_service_type(workbook_path)
+    ledger = JobLedger(ledger_path or output_dir / LEDGER_NAME)
+    workbook_hash = session.workbook_hash
+
+    def ledger_key(job):
+        return JobLedger.key(job['area'], job['region'], service, workbook_hash)
+
+    def ingest(job):
+        job = {'area': str(job['Area']).strip(), 'region': str(job['Region']).strip()}
+        if job['region'] == 'NSW':
+            return None
+        if not ledger.should_run(ledger_key(job), retry_failed_only):
+            return None
+        return job
+
+    def validate(job):
+        if job['area'] not in geography.valid_areas:
+            raise ValueError(f"Area '{job['area']}' has no PAC or PD member in the workbook")
+        if job['region'] not in geography.valid_regions:
+            raise ValueError(f"Region '{job['region']}' is not in the workbook")
+        return job
+
+    def generate(job):
+        if session.select(job['area'], job['region']) == 0:
+            raise ValueError("Selected PAC parameter not found")
+        safe_area = job['area'].replace("/", "_")
+        job['workbook'] = session.materialise(workbook_dir / f"{safe_area} - {service}.twb")
+        return job
+
+    def export(job):
+        ledger.mark_started(ledger_key(job))
+        job['result'] = exporter.export(job['workbook'], output_dir, job['area'], job['region'], service)
+        return job
+
+    def verify(job):
+        result = job['result']
+        if not is_complete_pdf(result['path']):
+            raise ValueError(f"{result['path']} is not a complete PDF")
+        if result['path'].stat().st_size != result['size']:
+            raise ValueError(f"{result['path']} changed size after the export finished")
+        ledger.mark_completed(ledger_key(job), result['path'], result['size'], result['seconds'])
+        if not keep_workbooks:
+            Path(job['workbook']).unlink(missing_ok=True)
+        print(f"✅ {job['area']} - {job['region']}: {result['path'].name} ({result['size']} bytes)")
+        return job
+
+    def on_failure(job, stage, error):
+        if 'area' in job:
+            ledger.mark_failed(ledger_key(job), f"{stage}: {error}")
+
+    stages = [
+        Stage('ingest', ingest),
+        Stage('validate', validate),
+        Stage('generate', generate),
+        Stage('export', export),
+        Stage('verify', verify),
+    ]
+    with tracing.span('read filter'):
+        rows = read_sheet(filter_file_path).to_dict('records')
+    print(f"Pipelining {len(rows)} row(s) from {filter_file_path}")
+    try:
+        report = Pipeline(stages, queue_size, on_failure).run(rows)
+    finally:
+        exporter.close()
+    print_pipeline_report(report)
+    pdfs = [job['result']['path'] for job in report['results']]
+    if qa and pdfs:
+        report['qa'] = run_qa(pdfs, output_dir, ledger_path=ledger.path)
+        pdfs = [Path(result['path']) for result in report['qa']['results'] if not result['problems']]
+    if books_dir is not None and pdfs:
+        report['books'] = merge_region_books(pdfs, books_dir)
+    return report
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export the filter.xlsx rows with overlapping pipeline stages")
+    parser.add_argument("filter_file", help="filter.xlsx with Area and Region columns")
+    parser.add_argument("workbook", help="the PAC workbook (.twb)")
+    parser.add_argument("--output", default="output", help="folder for the PDFs")
+    parser.add_argument("--tableau", default=r"C:\Program Files\Tableau\Tableau 2024.3\bin\tableau.exe",
+                        help="path to tableau.exe")
+    parser.add_argument("--fake", action="store_true", help="use the fake exporter instead of Tableau")
+    parser.add_argument("--queue-size", type=int, default=QUEUE_SIZE, help="jobs allowed between two stages")
+    parser.add_argument("--retry-failed", action="store_true", help="only rerun rows that failed or were interrupted last time")
+    parser.add_argument("--keep-workbooks", action="store_true", help="keep the per-row workbook files")
+    parser.add_argument("--qa", action="store_true", help="check the PDFs afterwards and mark failures for a retry")
+    parser.add_argument("--trace", help="write a per-phase trace (JSONL and Chrome trace-event JSON) to this folder")
+    parser.add_argument("--trace-memory", action="store_true", help="also record tracemalloc peaks per phase")
+    parser.add_argument("--books", help="also merge the PDFs into one book per region in this folder")
+    args = parser.parse_args()
+
+    exporter = FakeExporter() if args.fake else TableauGuiExporter(args.tableau)
+    if args.trace:
+        tracing.start(args.trace_memory)
+    run_filter_pipeline(args.filter_file, args.workbook, args.output, exporter, args.queue_size,
+                        args.retry_failed, keep_workbooks=args.keep_workbooks, books_dir=args.books, qa=args.qa)
+    if args.trace:
+        tracing.finish(args.trace)
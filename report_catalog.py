@@ -0,0 +1,268 @@
+import os
+import sqlite3
+import xml.etree.ElementTree as ET
+from pathlib import Path
+
+from build_cache import hash_file
+from data_cache import read_sheet
+
+# Catalog database, kept next to the scripts like the build manifest
+CATALOG_PATH = Path(".report_catalog.sqlite")
+
+# Exported PDFs: Export/<service folder>/<region>.pdf and Export/<service folder>/<region dir>/<area>.pdf
+EXPORT_ROOT = Path("Export")
+SERVICE_FOLDERS = {"Walk-in": "Walk In", "Telephone": "Telephone"}
+
+# Service suffixes a PDF name may end with, per service type
+SERVICE_LABELS = {"Walk-in": ("Walk In", "Walkin", "Walk-in"), "Telephone": ("Telephone",)}
+
+AREA_PREFIXES = ("PAC - ", "PD - ")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS areas (
+    area TEXT NOT NULL,
+    service TEXT NOT NULL,
+    region TEXT,
+    member TEXT,
+    source TEXT NOT NULL,
+    PRIMARY KEY (area, service)
+);
+CREATE TABLE IF NOT EXISTS sources (
+    path TEXT PRIMARY KEY,
+    service TEXT,
+    kind TEXT,
+    size INTEGER,
+    mtime_ns INTEGER
+);
+CREATE TABLE IF NOT EXISTS files (
+    path TEXT PRIMARY KEY,
+    service TEXT,
+    kind TEXT,
+    area TEXT,
+    region TEXT,
+    size INTEGER,
+    mtime_ns INTEGER,
+    sha256 TEXT,
+    status TEXT,
+    note TEXT
+);
+"""
+
+def area_alias(member):
+    """Strip the quotes and PAC/PD prefix from a member value: '"PAC - Auburn"' -> 'Auburn'"""
+    member = member.strip('"')
+    for prefix in AREA_PREFIXES:
+        if member.startswith(prefix):
+            return member[len(prefix):]
+    return member
+
+def file_name_forms(name):
+    """Spellings an area or region can take in a file name ('/' is not allowed there)"""
+    forms = {name, name.replace("/", " and "), name.replace("/", ""), name.replace("/", "_")}
+    if name.endswith(" City"):
+        forms.add(name[:-len(" City")])
+    return forms
+
+def walk_pdfs(directory):
+    """Yield os.DirEntry objects for every PDF under a directory, using scandir"""
+    try:
+        entries = list(os.scandir(directory))
+    except FileNotFoundError:
+        return
+    for entry in entries:
+        if entry.is_dir(follow_symlinks=False):
+            yield from walk_pdfs(entry.path)
+        elif entry.name.lower().endswith(".pdf"):
+            yield entry
+
+class ReportCatalog:
+    """
+    SQLite catalog of areas and exported reports.
+
+    Areas (PAC/PD, region, service) are seeded from the workbook's parameter members
+    and the data source; exported PDFs are indexed incrementally, re-hashing only files
+    whose size or mtime changed. Discovery is a query, and files whose name doesn't
+    match a known area, or that are older than their data, are reported rather than
+    guessed at.
+    """
+
+    def __init__(self, path=CATALOG_PATH, export_root=EXPORT_ROOT):
+        self.path = Path(path)
+        self.export_root = Path(export_root)
+        self.db = sqlite3.connect(self.path)
+        self.db.executescript(SCHEMA)
+
+    def close(self):
+        self.db.close()
+
+    def source_changed(self, path, service, kind):
+        """Return True (and remember the new stamp) if a seed source changed since it was last read"""
+        stat = os.stat(path)
+        row = self.db.execute("SELECT size, mtime_ns FROM sources WHERE path = ?", (str(path),)).fetchone()
+        if row == (stat.st_size, stat.st_mtime_ns):
+            return False
+        self.db.execute("INSERT OR REPLACE INTO sources VALUES (?, ?, ?, ?, ?)",
+                        (str(path), service, kind, stat.st_size, stat.st_mtime_ns))
+        return True
+
+    def seed_from_workbook(self, service, workbook_path):
+        """
+        Replace the PAC/PD members a workbook contributed (regions come from the data source).
+
+        Rows from the workbook's previous version are dropped in the same transaction, so
+        members removed from its parameters don't linger; the regions the data source
+        filled in are carried over to the members that remain.
+        """
+        with self.db:
+            if not self.source_changed(workbook_path, service, 'workbook'):
+                return 0
+            regions = dict(self.db.execute("SELECT area, region FROM areas WHERE source = ?",
+                                           (str(workbook_path),)))
+            self.db.execute("DELETE FROM areas WHERE source = ?", (str(workbook_path),))
+            added = 0
+            for event, elem in ET.iterparse(workbook_path, events=('end',)):
+                if elem.tag == 'member':
+                    value = elem.get('value', '')
+                    if value.strip('"').startswith(AREA_PREFIXES):
+                        area = elem.get('alias') or area_alias(value)
+                        added += self.db.execute(
+                            "INSERT OR IGNORE INTO areas (area, service, region, member, source) "
+                            "VALUES (?, ?, ?, ?, ?)",
+                            (area, service, regions.get(area), value, str(workbook_path))).rowcount
+                elem.clear()
+        return added
+
+    def seed_from_data(self, service, data_path):
+        """
+        Replace the (PAC/PD, region) pairs a data source contributed, filling in regions for workbook members.
+
+        Rows and regions from the source's previous version are cleared in the same
+        transaction, so areas dropped from the data (or moved region) don't linger.
+        """
+        with self.db:
+            if not self.source_changed(data_path, service, 'data'):
+                return 0
+            self.db.execute("DELETE FROM areas WHERE source = ?", (str(data_path),))
+            self.db.execute("UPDATE areas SET region = NULL WHERE service = ? AND source IN "
+                            "(SELECT path FROM sources WHERE kind = 'workbook')", (service,))
+            frame = read_sheet(data_path, 'Single Response')
+            pairs = frame[['Areas PAC', 'Areas Region']].dropna().drop_duplicates()
+            for member, region in pairs.itertuples(index=False):
+                self.db.execute(
+                    "INSERT INTO areas (area, service, region, member, source) VALUES (?, ?, ?, ?, ?) "
+                    "ON CONFLICT (area, service) DO UPDATE SET region = excluded.region",
+                    (area_alias(member), service, region, f'"{member}"', str(data_path)))
+        return len(pairs)
+
+    def data_mtime_ns(self, service):
+        """Newest mtime of the data sources seeded for a service, or None"""
+        row = self.db.execute("SELECT MAX(mtime_ns) FROM sources WHERE service = ? AND kind = 'data'",
+                              (service,)).fetchone()
+        return row[0]
+
+    def name_lookup(self, service):
+        """{file name spelling: (area, region)} for a service, plus {spelling: region} for regions"""
+        areas, regions = {}, {}
+        for area, region in self.db.execute("SELECT area, region FROM areas WHERE service = ?", (service,)):
+            for form in file_name_forms(area):
+                areas[form] = (area, region)
+            if region:
+                regions[region] = region
+        # Region PDFs and folders may use the short names (Central Metro) or folder names (Central_Metro)
+        for region in list(regions):
+            short = region.replace("Metropolitan", "Metro")
+            for form in (short, short.replace(" ", "_")):
+                regions[form] = region
+        return areas, regions
+
+    def classify(self, service, relative_parts, stem, lookups):
+        """Return (kind, area, region, status, note) for an exported PDF"""
+        areas, regions = lookups
+        label = next((label for label in SERVICE_LABELS[service] if stem.endswith(f" - {label}")), None)
+        if label is None:
+            return 'unknown', None, None, 'misnamed', f"name doesn't end in ' - {SERVICE_LABELS[service][0]}'"
+        name = stem[:-len(f" - {label}")]
+
+        if len(relative_parts) == 1:
+            if name in regions:
+                return 'region', None, regions[name], 'ok', None
+            return 'region', None, None, 'misnamed', f"unknown region '{name}'"
+
+        folder_region = regions.get(relative_parts[0])
+        # Newer exports also carry the region: "<area> - <region> - <service>"
+        area_name, _, region_name = name.partition(" - ")
+        if region_name and area_name in areas:
+            name = area_name
+        if name not in areas:
+            return 'pac', None, folder_region, 'misnamed', f"unknown area '{name}'"
+        area, region = areas[name]
+        if folder_region is not None and region is not None and folder_region != region:
+            return 'pac', area, region, 'misnamed', f"in the {relative_parts[0]} folder but {area} is in {region}"
+        return 'pac', area, region, 'ok', None
+
+    def refresh(self):
+        """Index new and changed PDFs under the export root and forget deleted ones; returns counts"""
+        counts = {'scanned': 0, 'indexed': 0, 'removed': 0}
+        known = {path: (size, mtime_ns) for path, size, mtime_ns
+                 in self.db.execute("SELECT path, size, mtime_ns FROM files")}
+        seen = set()
+        for service, folder in SERVICE_FOLDERS.items():
+            service_dir = self.export_root / folder
+            lookups = self.name_lookup(service)
+            data_mtime = self.data_mtime_ns(service)
+            for entry in walk_pdfs(service_dir):
+                counts['scanned'] += 1
+                seen.add(entry.path)
+                stat = entry.stat()
+                if known.get(entry.path) == (stat.st_size, stat.st_mtime_ns):
+                    continue
+                relative_parts = Path(entry.path).relative_to(service_dir).parts
+                kind, area, region, status, note = self.classify(
+                    service, relative_parts, Path(entry.name).stem, lookups)
+                self.db.execute("INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                                (entry.path, service, kind, area, region, stat.st_size, stat.st_mtime_ns,
+                                 hash_file(entry.path), status, note))
+                counts['indexed'] += 1
+            if data_mtime is not None:
+                # Exports indexed before the data last changed are stale now too
+                self.db.execute("UPDATE files SET status = 'stale', note = 'older than the data source' "
+                                "WHERE service = ? AND status = 'ok' AND mtime_ns < ?", (service, data_mtime))
+        for path in set(known) - seen:
+            self.db.execute("DELETE FROM files WHERE path = ?", (path,))
+            counts['removed'] += 1
+        self.db.commit()
+        return counts
+
+    def pac_to_region(self, service=None):
+        """{area: region} for every seeded area with a known region"""
+        query = "SELECT area, region FROM areas WHERE region IS NOT NULL"
+        params = ()
+        if service is not None:
+            query += " AND service = ?"
+            params = (service,)
+        return dict(sorted(self.db.execute(query, params).fetchall()))
+
+    def pac_names(self, service=None):
+        return sorted(self.pac_to_region(service))
+
+    def region_names(self, service=None):
+        return sorted(set(self.pac_to_region(service).values()))
+
+    def problems(self):
+        """Return (path, status, note) for every misnamed or stale PDF"""
+        return self.db.execute("SELECT path, status, note FROM files WHERE status != 'ok' "
+                               "ORDER BY status, path").fetchall()
+
+    def exported(self, service, kind='pac'):
+        """Return {area or region: path} of the up-to-date exports of a service"""
+        column = 'area' if kind == 'pac' else 'region'
+        return dict(self.db.execute(f"SELECT {column}, path FROM files WHERE service = ? AND kind = ? "
+                                    "AND status = 'ok' ORDER BY path", (service, kind)).fetchall())
+
+def print_problems(catalog):
+    """Print the misnamed and stale exports"""
+    problems = catalog.problems()
+    for path, status, note in problems:
+        print(f"⚠️  {status}: {path} ({note})")
+    if not problems:
+        print("✅ No misnamed or stale exports")
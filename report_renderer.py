@@ -0,0 +1,403 @@
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import pandas as pd
+from reportlab.lib.colors import HexColor
+from reportlab.lib.utils import ImageReader, simpleSplit
+from reportlab.pdfgen import canvas
+
+from data_cache import read_sheets
+from exporters import pdf_filename
+from template_all import REGION_ALIASES, REGION_DIR_MAPPING, SERVICE_DATA_PATHS
+
+# Tableau dashboards are 1169 x 827; keep the same page so the backgrounds line up
+PAGE_SIZE = (1169, 827)
+FORMATTING_DIR = Path("formatting")
+
+NAVY = HexColor("#173d63")
+LIGHT_BLUE = HexColor("#9dbfe0")
+GREY = HexColor("#5a6470")
+WHITE = HexColor("#ffffff")
+
+# Panel boxes as (left, top, right, bottom) fractions of the page, measured from the backgrounds
+HEADER_BOX = (0.013, 0.018, 0.497, 0.082)
+LEFT_PANEL = (0.013, 0.098, 0.495, 0.982)
+RIGHT_PANEL = (0.505, 0.098, 0.987, 0.982)
+
+# Page layouts mirror the Page N dashboards in the templates. A summary page has
+# category rows next to the background's icons (vertical fractions); a detail page
+# has a (title, score category, questions) tuple per panel.
+SERVICES = {
+    "Walk-in": {
+        'data': SERVICE_DATA_PATHS["Walk-in"],
+        'suffix': "Walkin",
+        'categories': ['Waiting', 'Greeting', 'Manner', 'Resolution', 'Communication'],
+        'category_rows': [0.407, 0.533, 0.662, 0.792, 0.919],
+        'multi_select': ['Q2', 'Q9', 'Q10', 'Q12'],
+        'pages': [
+            ("Walk In Page 1 v2.png", None),
+            ("Walk In Page 2 v3.png", [("Facility", None, ['Q1', 'Q2']),
+                                       ("Waiting", 'Waiting', ['Q3', 'Q4'])]),
+            ("Walk In Page 3 v2.png", [("Greeting", 'Greeting', ['Q7', 'Q9', 'Q10']),
+                                       ("Manner", 'Manner', ['Q11', 'Q12', 'Q13'])]),
+            ("Walk In Page 4 v2.png", [("Resolution", 'Resolution', ['Q16', 'Q17', 'Q18', 'Q19']),
+                                       ("Communication", 'Communication', ['Q20', 'Q21', 'Q22', 'Q23'])]),
+        ],
+    },
+    "Telephone": {
+        'data': SERVICE_DATA_PATHS["Telephone"],
+        'suffix': "Telephone",
+        'categories': ['Greeting', 'Manner', 'Resolution', 'Communication'],
+        'category_rows': [0.426, 0.580, 0.734, 0.888],
+        'multi_select': ['Q4', 'Q6', 'Q10'],
+        'pages': [
+            ("Telephone Page 1 v4.png", None),
+            ("Telephone Page 2 v4.png", [("Greeting", 'Greeting', ['Q1', 'Q2', 'Q3', 'Q4', 'Q6', 'Q7']),
+                                         ("Manner", 'Manner', ['Q8', 'Q9', 'Q10'])]),
+            ("Telephone Page 3 v2.png", [("Resolution", 'Resolution', ['Q13', 'Q14', 'Q15', 'Q16']),
+                                         ("Communication", 'Communication', ['Q17', 'Q18', 'Q19'])]),
+        ],
+    },
+}
+
+def area_alias(area_value):
+    """Return the alias for a "PAC - X"/"PD - X" data value"""
+    for prefix in ("PAC - ", "PD - "):
+        if area_value.startswith(prefix):
+            return area_value[len(prefix):]
+    return area_value
+
+def shares(series):
+    """Return {answer: share of responses} for a column, ignoring blanks and N/A"""
+    counts = series[series != "N/A"].dropna().value_counts(normalize=True)
+    # Numeric answers read as floats when a column has blanks; show 5 rather than 5.0
+    return {(f"{answer:.0f}" if isinstance(answer, float) and answer.is_integer() else str(answer)): float(share)
+            for answer, share in counts.items()}
+
+class ReportData:
+    """
+    One service's survey rows, loaded once, with every PAC's metrics computed in grouped passes.
+
+    report_for() returns plain dicts, so reports can be rendered in worker processes
+    without reloading or regrouping the data.
+    """
+
+    def __init__(self, service, data_path=None):
+        self.service = service
+        self.layout = SERVICES[service]
+        sheets = read_sheets(data_path or self.layout['data'])
+        responses = sheets['Single Response']
+
+        # Reports cover the latest quarter; earlier quarters feed the score trend lines
+        quarters = sorted(responses[['Year', 'Quarter']].drop_duplicates().itertuples(index=False, name=None))
+        self.quarters = [f"{quarter} {year}" for year, quarter in quarters]
+        year, quarter = quarters[-1]
+        current = responses[(responses['Year'] == year) & (responses['Quarter'] == quarter)]
+        self.quarter = self.quarters[-1]
+
+        score_columns = [f"{category} Total" for category in self.layout['categories']] + ['Total']
+        self.pac_scores = current.groupby('Areas PAC', observed=True)[score_columns].mean()
+        self.region_scores = current.groupby('Areas Region', observed=True)[score_columns].mean()
+        self.nsw_scores = current[score_columns].mean()
+        trend = responses.groupby(['Areas PAC', 'Year', 'Quarter'], observed=True)[score_columns].mean()
+        self.trend = {pac: group.droplevel(0) for pac, group in trend.groupby(level=0, observed=True)}
+
+        self.counts = current.groupby('Areas PAC', observed=True).size()
+        first_rows = current.groupby('Areas PAC', observed=True).first()
+        self.regions = first_rows['Areas Region']
+        comment_columns = [column for column in responses.columns if column.startswith('Areas Comment')]
+        self.comments = first_rows[comment_columns]
+
+        # Single-choice questions: answer shares per PAC and per region
+        self.questions = {}
+        for column in responses.columns:
+            number = column.split('.', 1)[0]
+            if number.startswith('Q') and number[1:].isdigit():
+                self.questions[number] = {
+                    'title': column,
+                    'pac': {pac: shares(group)
+                            for pac, group in current.groupby('Areas PAC', observed=True)[column]},
+                    'region': {region: shares(group)
+                               for region, group in current.groupby('Areas Region', observed=True)[column]},
+                }
+
+        # Multi-select questions are long sheets of (survey, attribute, 0/1)
+        current_ids = set(current['Survey ID'])
+        for sheet_name in self.layout['multi_select']:
+            sheet = sheets[sheet_name]
+            sheet = sheet[sheet['Survey ID'].isin(current_ids)]
+            pac_means = sheet.groupby(['Areas PAC', 'Attribute'], observed=True)['Value'].mean()
+            region_means = sheet.groupby(['Areas Region', 'Attribute'], observed=True)['Value'].mean()
+            self.questions[sheet_name] = {
+                'title': f"{sheet_name}. Select all that apply",
+                'pac': {pac: group.droplevel(0).to_dict()
+                        for pac, group in pac_means.groupby(level=0, observed=True)},
+                'region': {region: group.droplevel(0).to_dict()
+                           for region, group in region_means.groupby(level=0, observed=True)},
+            }
+
+    @property
+    def areas(self):
+        """Data values ("PAC - X"/"PD - X") of every area with responses this quarter"""
+        return list(self.pac_scores.index)
+
+    def report_for(self, area):
+        """Return everything one PAC report draws, as plain values"""
+        region = self.regions[area]
+        scores = {}
+        for category in self.layout['categories'] + ['Total']:
+            column = 'Total' if category == 'Total' else f"{category} Total"
+            scores[category] = (float(self.pac_scores.at[area, column]),
+                                float(self.region_scores.at[region, column]),
+                                float(self.nsw_scores[column]))
+
+        trend = self.trend[area]
+        questions = {}
+        for number, question in self.questions.items():
+            pac_shares = question['pac'].get(area, {})
+            region_shares = question['region'].get(region, {})
+            answers = sorted(set(pac_shares) | set(region_shares),
+                             key=lambda answer: (-region_shares.get(answer, 0), answer))
+            questions[number] = {
+                'title': question['title'],
+                'rows': [(answer, pac_shares.get(answer, 0.0), region_shares.get(answer, 0.0))
+                         for answer in answers],
+            }
+
+        return {
+            'area': area_alias(area),
+            'region': region,
+            'quarter': self.quarter,
+            'responses': int(self.counts[area]),
+            'scores': scores,
+            'trend': {category: [float(value) for value in trend[column]]
+                      for category, column in zip(self.layout['categories'] + ['Total'],
+                                                  list(trend.columns))},
+            'questions': questions,
+            'comments': [str(text) for text in self.comments.loc[area] if pd.notna(text)],
+        }
+
+# Decoded backgrounds, per process
+_IMAGES = {}
+
+def load_image(name):
+    """Return a cached ImageReader for a file in the formatting directory"""
+    image = _IMAGES.get(name)
+    if image is None:
+        image = ImageReader(str(FORMATTING_DIR / name))
+        _IMAGES[name] = image
+    return image
+
+def to_page(box):
+    """Convert a (left, top, right, bottom) fraction box to (x, y, width, height) in points"""
+    width, height = PAGE_SIZE
+    left, top, right, bottom = box
+    return left * width, (1 - bottom) * height, (right - left) * width, (bottom - top) * height
+
+def percent(value):
+    return f"{value:.0%}"
+
+def draw_header(pdf, report, service):
+    """Title in the navy bar and logos in the top right corner"""
+    x, y, width, height = to_page(HEADER_BOX)
+    pdf.setFillColor(WHITE)
+    pdf.setFont("Helvetica-Bold", 20)
+    pdf.drawString(x + 16, y + height / 2 - 7,
+                   f"{report['area']} - {service} Service Assessment - {report['quarter']}")
+    page_width, page_height = PAGE_SIZE
+    pdf.drawImage(load_image("NSWG-NSWPF-COL-RGB.png"), page_width - 130, page_height - 65,
+                  width=112, height=49, mask='auto')
+    pdf.drawImage(load_image("Picture1.png"), page_width - 290, page_height - 52,
+                  width=150, height=22, mask='auto')
+    pdf.setFillColor(GREY)
+    pdf.setFont("Helvetica", 10)
+    pdf.drawRightString(page_width - 150, page_height - 68,
+                        f"{report['region']} - n = {report['responses']}")
+
+def draw_trend(pdf, values, x, y, width, height):
+    """Small line of a score over the quarters"""
+    if len(values) < 2:
+        return
+    step = width / (len(values) - 1)
+    points = [(x + index * step, y + value * height) for index, value in enumerate(values)]
+    pdf.setStrokeColor(NAVY)
+    pdf.setLineWidth(1.5)
+    pdf.lines([(x0, y0, x1, y1) for (x0, y0), (x1, y1) in zip(points, points[1:])])
+    pdf.setFillColor(NAVY)
+    for point_x, point_y in points:
+        pdf.circle(point_x, point_y, 2, stroke=0, fill=1)
+
+def draw_summary_page(pdf, report, layout):
+    """Page 1: overall and category scores against region and NSW, plus the ranking comments"""
+    x, y, width, height = to_page(LEFT_PANEL)
+    top = y + height
+    pac, region, nsw = report['scores']['Total']
+    pdf.setFillColor(NAVY)
+    pdf.setFont("Helvetica-Bold", 16)
+    pdf.drawString(x + 24, top - 40, "Overall score")
+    pdf.setFont("Helvetica-Bold", 48)
+    pdf.drawString(x + 24, top - 100, percent(pac))
+    pdf.setFont("Helvetica", 12)
+    pdf.setFillColor(GREY)
+    pdf.drawString(x + 24, top - 125, f"Region {percent(region)}    NSW {percent(nsw)}")
+    draw_trend(pdf, report['trend']['Total'], x + 220, top - 110, width - 260, 60)
+
+    page_height = PAGE_SIZE[1]
+    for category, row in zip(layout['categories'], layout['category_rows']):
+        pac, region, nsw = report['scores'][category]
+        row_y = (1 - row) * page_height
+        pdf.setFillColor(NAVY)
+        pdf.setFont("Helvetica-Bold", 14)
+        pdf.drawString(x + 80, row_y + 8, category)
+        pdf.setFont("Helvetica-Bold", 22)
+        pdf.drawString(x + 200, row_y, percent(pac))
+        pdf.setFillColor(GREY)
+        pdf.setFont("Helvetica", 10)
+        pdf.drawString(x + 80, row_y - 10, f"Region {percent(region)}  NSW {percent(nsw)}")
+        draw_trend(pdf, report['trend'][category], x + 290, row_y - 15, width - 320, 35)
+
+    x, y, width, height = to_page(RIGHT_PANEL)
+    text = pdf.beginText(x + 24, y + height - 40)
+    text.setFont("Helvetica", 12)
+    text.setLeading(16)
+    text.setFillColor(NAVY)
+    for comment in report['comments']:
+        for line in simpleSplit(comment, "Helvetica", 12, width - 48):
+            text.textLine(line)
+        text.textLine("")
+    pdf.drawText(text)
+
+def draw_question(pdf, question, x, y, width, scale):
+    """Draw one question's answer bars (PAC above region); returns the y below it"""
+    title_size = 9 * scale
+    pdf.setFillColor(NAVY)
+    pdf.setFont("Helvetica-Bold", title_size)
+    for line in simpleSplit(question['title'], "Helvetica-Bold", title_size, width):
+        pdf.drawString(x, y, line)
+        y -= title_size + 2
+    label_width = width * 0.45
+    bar_width = width - label_width - 40
+    bar_height = 5 * scale
+    for answer, pac, region in question['rows']:
+        pdf.setFillColor(GREY)
+        pdf.setFont("Helvetica", 8 * scale)
+        pdf.drawString(x, y - bar_height, simpleSplit(answer, "Helvetica", 8 * scale, label_width)[0])
+        # Bar labels fit inside the bar height so the PAC and region rows don't overlap
+        pdf.setFont("Helvetica", bar_height + 1)
+        for share, colour, offset in ((pac, NAVY, 0), (region, LIGHT_BLUE, bar_height + 1)):
+            pdf.setFillColor(colour)
+            pdf.rect(x + label_width, y - offset - bar_height, max(share, 0.005) * bar_width, bar_height,
+                     stroke=0, fill=1)
+            pdf.drawString(x + label_width + share * bar_width + 4, y - offset - bar_height, percent(share))
+        y -= 2 * bar_height + 6 * scale
+    return y - 8 * scale
+
+def question_height(question, width):
+    """Unscaled height draw_question() needs"""
+    titles = len(simpleSplit(question['title'], "Helvetica-Bold", 9, width))
+    return titles * 11 + len(question['rows']) * 16 + 8
+
+def draw_panel(pdf, report, panel, box):
+    """A detail panel: title and score, then each question scaled to fit the panel"""
+    title, category, numbers = panel
+    x, y, width, height = to_page(box)
+    top = y + height
+    pdf.setFillColor(NAVY)
+    pdf.setFont("Helvetica-Bold", 16)
+    pdf.drawString(x + width * 0.36, top - 32, title)
+    if category:
+        pac, region, nsw = report['scores'][category]
+        pdf.setFont("Helvetica", 11)
+        pdf.drawString(x + width * 0.36, top - 50,
+                       f"{report['area']} {percent(pac)}   Region {percent(region)}   NSW {percent(nsw)}")
+
+    questions = [report['questions'][number] for number in numbers if number in report['questions']]
+    inner_width = width - 48
+    needed = sum(question_height(question, inner_width) for question in questions)
+    available = height - 90
+    scale = min(1.0, available / needed) if needed else 1.0
+    question_y = top - 80
+    for question in questions:
+        question_y = draw_question(pdf, question, x + 24, question_y, inner_width, scale)
+
+def render_report(report, output_path, service):
+    """Lay out one PAC report over the service's page backgrounds and save it as a PDF"""
+    layout = SERVICES[service]
+    pdf = canvas.Canvas(str(output_path), pagesize=PAGE_SIZE)
+    pdf.setTitle(f"{report['area']} - {service}")
+    for background, panels in layout['pages']:
+        pdf.drawImage(load_image(background), 0, 0, *PAGE_SIZE, mask='auto')
+        draw_header(pdf, report, service)
+        if panels is None:
+            draw_summary_page(pdf, report, layout)
+        else:
+            for panel, box in zip(panels, (LEFT_PANEL, RIGHT_PANEL)):
+                draw_panel(pdf, report, panel, box)
+        pdf.showPage()
+    pdf.save()
+
+def report_path(output_dir, report, service):
+    """Return where a PAC report goes: output_dir/<region dir>/<pdf name>"""
+    region_dir = REGION_DIR_MAPPING.get(report['region'], report['region'].replace(" ", "_"))
+    name = pdf_filename(report['area'].replace("/", "_"), REGION_ALIASES.get(report['region'], report['region']),
+                        SERVICES[service]['suffix'])
+    return Path(output_dir) / region_dir / name
+
+def render_job(job):
+    """Render one report and return (job, error, seconds)"""
+    report, output_path, service = job
+    start = time.perf_counter()
+    try:
+        Path(output_path).parent.mkdir(parents=True, exist_ok=True)
+        render_report(report, output_path, service)
+        return job, None, time.perf_counter() - start
+    except Exception as e:
+        return job, f"{type(e).__name__}: {e}", time.perf_counter() - start
+
+def render_all_reports(service, output_dir, workers=1, areas=None, data_path=None):
+    """Load the service's data once and render every PAC report, in-process or over a process pool"""
+    start = time.perf_counter()
+    data = ReportData(service, data_path)
+    load_seconds = time.perf_counter() - start
+    print(f"Loaded {service} data for {len(data.areas)} areas ({data.quarter}) in {load_seconds:.1f}s")
+
+    wanted = set(areas) if areas else None
+    jobs = []
+    for area in data.areas:
+        if wanted is not None and area_alias(area) not in wanted:
+            continue
+        report = data.report_for(area)
+        jobs.append((report, str(report_path(output_dir, report, service)), service))
+
+    if workers > 1 and jobs:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(render_job, jobs))
+    else:
+        results = [render_job(job) for job in jobs]
+
+    failures = 0
+    for (report, output_path, _), error, seconds in results:
+        if error:
+            failures += 1
+            print(f"❌ Failed: {report['area']} ({error})")
+        else:
+            print(f"Rendered: {output_path} ({seconds:.2f}s)")
+
+    elapsed = time.perf_counter() - start
+    print(f"Rendered {len(results) - failures}/{len(results)} reports in {elapsed:.1f}s "
+          f"with {max(workers, 1)} worker(s)")
+    return results
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Render PAC reports straight from the survey data")
+    parser.add_argument("--service", choices=sorted(SERVICES), default="Walk-in")
+    parser.add_argument("--output", default="Export/Rendered", help="Output directory for the PDFs")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                        help="Parallel render processes (default: CPU count)")
+    parser.add_argument("--area", action="append", help="Only render this PAC/PD (repeatable)")
+    args = parser.parse_args()
+
+    render_all_reports(args.service, Path(args.output) / args.service, args.workers, args.area)
@@ -0,0 +1,194 @@
+import heapq
+import itertools
+import threading
+import time
+
+import tracing
+
+def job_key(job):
+    """Return the (area, region) key identifying a job"""
+    return (job['area'], job['region'])
+
+class ExportScheduler:
+    """
+    Runs export jobs over N exporter slots (Tableau instances, VMs, fakes...).
+
+    Jobs are taken shortest-first using `estimates` (seconds per (area, region),
+    e.g. durations from a previous run). Each attempt is bounded by `timeout`;
+    failed attempts are retried up to `max_retries` times after an exponential
+    backoff. A slot whose attempt times out is closed and rebuilt from the factory,
+    its generation goes up so prepare() gives it a fresh workbook, and anything the
+    abandoned attempt still does is ignored.
+    """
+
+    def __init__(self, exporter_factory, output_dir, slots=1, prepare=None, timeout=None,
+                 max_retries=2, backoff=5.0, estimates=None, on_result=None):
+        self.exporter_factory = exporter_factory
+        self.output_dir = output_dir
+        self.slots = max(1, slots)
+        # prepare(job, slot, generation) -> workbook path the slot's exporter should open for this job.
+        # A slot's generation goes up when it is reset after a timeout: prepare must then stop using
+        # the slot's old workbook, which the abandoned attempt may still be touching.
+        self.prepare = prepare or (lambda job, slot, generation: job['workbook'])
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.estimates = estimates or {}
+        # on_result(result) is called as each job finishes for good, so callers can record it right away
+        self.on_result = on_result
+
+        self.lock = threading.Condition()
+        self.ready = []      # heap of (estimate, sequence, job)
+        self.delayed = []    # heap of (ready_at, sequence, estimate, job)
+        self.running = 0
+        self.sequence = itertools.count()
+        self.results = []
+        self.slot_busy = [0.0] * self.slots
+        self.slot_generation = [0] * self.slots
+
+    def estimate(self, job):
+        """Estimated seconds for a job; unknown jobs get the mean of the known ones"""
+        if job_key(job) in self.estimates:
+            return self.estimates[job_key(job)]
+        known = list(self.estimates.values())
+        return sum(known) / len(known) if known else 0.0
+
+    def next_job(self):
+        """Block until a job is ready or all work is done; returns None when finished"""
+        with self.lock:
+            while True:
+                now = time.monotonic()
+                while self.delayed and self.delayed[0][0] <= now:
+                    ready_at, sequence, estimate, job = heapq.heappop(self.delayed)
+                    heapq.heappush(self.ready, (estimate, sequence, job))
+                if self.ready:
+                    self.running += 1
+                    return heapq.heappop(self.ready)[2]
+                if not self.delayed and self.running == 0:
+                    return None
+                wait = self.delayed[0][0] - now if self.delayed else None
+                self.lock.wait(wait)
+
+    def finish_job(self, job, attempt, error, result, seconds):
+        """Record an attempt and requeue it with backoff if it can be retried"""
+        final = None
+        with self.lock:
+            self.running -= 1
+            if error is not None and attempt < self.max_retries:
+                delay = self.backoff * (2 ** attempt)
+                print(f"🔁 Retrying {job['area']} - {job['region']} in {delay:.1f}s "
+                      f"(attempt {attempt + 1} failed: {error})")
+                job = dict(job, attempt=attempt + 1)
+                heapq.heappush(self.delayed, (time.monotonic() + delay, next(self.sequence),
+                                              self.estimate(job), job))
+            else:
+                final = {
+                    'area': job['area'],
+                    'region': job['region'],
+                    'attempts': attempt + 1,
+                    'error': error,
+                    'result': result,
+                    'seconds': seconds,
+                }
+                self.results.append(final)
+            self.lock.notify_all()
+        if final is not None and self.on_result is not None:
+            self.on_result(final)
+
+    def run_attempt(self, exporter, job, slot):
+        """Run one attempt, bounded by the per-job timeout; returns (result, error)"""
+        outcome = {}
+        generation = self.slot_generation[slot]
+        abandoned = threading.Event()
+
+        def target():
+            try:
+                with tracing.job(f"{job['area']} - {job['region']}"):
+                    workbook_path = self.prepare(job, slot, generation)
+                    # A timed-out attempt must not start an export the slot's next job could race with
+                    if abandoned.is_set():
+                        return
+                    outcome['result'] = exporter.export(workbook_path, self.output_dir, job['area'], job['region'],
+                                                        job.get('service'))
+            except Exception as e:
+                outcome['error'] = f"{type(e).__name__}: {e}"
+
+        thread = threading.Thread(target=target, daemon=True)
+        thread.start()
+        thread.join(self.timeout)
+        if thread.is_alive():
+            # The thread can't be stopped; its outcome is never read and the slot starts afresh
+            abandoned.set()
+            self.slot_generation[slot] += 1
+            return None, f"JobTimeout: no result after {self.timeout}s"
+        return outcome.get('result'), outcome.get('error')
+
+    def slot_worker(self, slot):
+        """Pull jobs for one slot until the queue is drained"""
+        exporter = self.exporter_factory(slot)
+        try:
+            while True:
+                job = self.next_job()
+                if job is None:
+                    break
+                attempt = job.get('attempt', 0)
+                start = time.perf_counter()
+                result, error = self.run_attempt(exporter, job, slot)
+                seconds = time.perf_counter() - start
+                self.slot_busy[slot] += seconds
+
+                if error is None:
+                    print(f"✅ [slot {slot}] {job['area']} - {job['region']} in {seconds:.1f}s")
+                else:
+                    print(f"❌ [slot {slot}] {job['area']} - {job['region']}: {error}")
+                    if error.startswith('JobTimeout'):
+                        # The hung attempt may still hold the exporter; close it (ending any export
+                        # it has running) and start a fresh one
+                        try:
+                            exporter.close()
+                        except Exception as e:
+                            print(f"⚠️ [slot {slot}] Error closing timed-out exporter: {e}")
+                        exporter = self.exporter_factory(slot)
+                self.finish_job(job, attempt, error, result, seconds)
+        finally:
+            exporter.close()
+
+    def run(self, jobs):
+        """Run every job and return a report dict"""
+        for job in jobs:
+            heapq.heappush(self.ready, (self.estimate(job), next(self.sequence), dict(job)))
+
+        start = time.perf_counter()
+        threads = [threading.Thread(target=self.slot_worker, args=(slot,)) for slot in range(self.slots)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        wall = time.perf_counter() - start
+
+        completed = [r for r in self.results if r['error'] is None]
+        failed = [r for r in self.results if r['error'] is not None]
+        return {
+            'jobs': len(self.results),
+            'completed': len(completed),
+            'failed': failed,
+            'retries': sum(r['attempts'] - 1 for r in self.results),
+            'wall_seconds': wall,
+            'jobs_per_hour': len(completed) / wall * 3600 if wall > 0 else 0.0,
+            'slot_utilisation': [busy / wall if wall > 0 else 0.0 for busy in self.slot_busy],
+            'results': self.results,
+        }
+
+def print_report(report):
+    """Print a scheduler report"""
+    print("=" * 50)
+    print(f"📊 {report['completed']}/{report['jobs']} reports in {report['wall_seconds']:.1f}s "
+          f"({report['jobs_per_hour']:.1f} jobs/hour, {report['retries']} retries)")
+    for slot, utilisation in enumerate(report['slot_utilisation']):
+        print(f"   Slot {slot}: {utilisation:.0%} busy")
+    if report['failed']:
+        print(f"❌ {len(report['failed'])} failed:")
+        for failure in report['failed']:
+            print(f"   {failure['area']} - {failure['region']} after {failure['attempts']} attempt(s): "
+                  f"{failure['error']}")
+    print("=" * 50)
@@ -1,118 +1,73 @@
-import subprocess
-import time
-import pyautogui
 from pathlib import Path
-import xml.etree.ElementTree as ET
+import os
 import shutil
-import pandas as pd
+import threading
+import time
+
+import tracing
 
-def export_single_pdf(workbook_path, tableau_exe_path, output_dir, area, region):
+from data_cache import read_sheet
+from exporters import GuiTableauBackend, TableauGuiExporter, WarmSessionExporter, format_phases
+from geography import load_geography_index
+from ledger import LEDGER_NAME, JobLedger
+from pipeline import run_filter_pipeline
+from scheduler import ExportScheduler, print_report
+from template_all import REGION_ALIASES, get_service_type
+from twb_engine import StreamTemplate
+from workbook_session import WorkbookSession
+from xml_backend import get_backend
+
+def export_single_pdf(workbook_path, tableau_exe_path, output_dir, area, region, timeouts=None, exporter=None,
+                      service=None):
     """
     Export PDF for a single area/region combination
     """
-    output_path = Path(output_dir)
-    output_path.mkdir(exist_ok=True)
-    
-    print(f"Opening workbook: {workbook_path}")
-    
-    # Open Tableau with the workbook
-    cmd = f'"{tableau_exe_path}" "{workbook_path}"'
-    subprocess.Popen(cmd, shell=True)
-    
-    # Wait for Tableau to load
-    print("Waiting for Tableau to load (25 seconds)...")
-    time.sleep(15)
-
-    # Click to ensure Tableau window is active
-    pyautogui.click(500, 300)
-    time.sleep(2)
-
-    # Configure pyautogui
-    pyautogui.PAUSE = 1
-    pyautogui.FAILSAFE = True
-
-    # Maximize window before selecting pages
-    pyautogui.hotkey('alt', 'space')  # Open window menu
-    time.sleep(0.5)
-    pyautogui.press('x')  # Maximize
-    time.sleep(1)
-
-    # Select all 4 pages (Page 1 to Page 4) using Shift+Click FIRST
-    print("Selecting all 4 pages...")
-    pyautogui.click(2211, 1403)  # Click Page 1 tab
-    time.sleep(0.5)
-    pyautogui.keyDown('shift')  # Hold Shift
-    pyautogui.click(2418, 1403)  # Click Page 4 tab while holding Shift
-    pyautogui.keyUp('shift')  # Release Shift
-    time.sleep(2)
-
-    # NOW open Print to PDF dialog
-    #print("Opening Print to PDF dialog...")
-    ##pyautogui.hotkey('alt', 'f')  # Open File menu
-    #time.sleep(2)
-    #pyautogui.press('r')  # Press 'r' for "Print to PDF..."
-    #time.sleep(3)
-
-    pyautogui.click(19, 29)
-    time.sleep(1)
-
-    # Click on "View PDF after printing" checkbox  
-    pyautogui.click(54, 432)
-    time.sleep(1)
-
-    # Select "Selected sheets" radio button
-    pyautogui.click(1158, 718)
-    time.sleep(1)
-
-    # Click OK button
-    pyautogui.click(1300, 811)
-    time.sleep(3)
-
-    # Type the PDF filename
-    #pdf_filename = f"Auburn - Walkin.pdf"
-    pdf_filename = f"{area} - {region} - Walkin.pdf"
-    pyautogui.write(pdf_filename)
+    # Completion is detected from the PDF itself rather than fixed sleeps
+    if exporter is None:
+        exporter = TableauGuiExporter(tableau_exe_path, timeouts)
+    result = exporter.export(workbook_path, output_dir, area, region, service)
 
-    # Click Save button
-    #pyautogui.click(1533, 1303)
-    #time.sleep(8)  # Wait for PDF generation
+    print(f"✅ Generated: {result['path'].name} ({result['size']} bytes in {result['seconds']:.1f}s)")
+    print(f"   Phases: {format_phases(result['phases'])}")
+    return result
 
-    # enter
-    pyautogui.press('enter')
-    time.sleep(8)  # Wait for PDF generation
-
-    print(f"✅ Generated: {pdf_filename}")
-
-    # Close Tableau
-    pyautogui.hotkey('alt', 'f4')
-    time.sleep(3)
-
-def change_selected_pac(workbook_path, new_pac_value, region):
+def change_selected_pac(workbook_path, new_pac_value, region, splice=False, geography=None, stream=False):
     """Change the Selected PAC parameter to a new value"""
     
     # Make a backup copy first
     original = Path(workbook_path)
     backup = original.with_suffix('.twb.backup')
-    shutil.copy2(original, backup)
+    with tracing.span('backup'):
+        shutil.copy2(original, backup)
     print(f"Backup created: {backup}")
     
+    if splice:
+        return splice_selected_pac(workbook_path, new_pac_value, region, geography)
+    if stream:
+        return stream_selected_pac(workbook_path, new_pac_value, region, geography)
+    
     # Parse the XML
-    tree = ET.parse(workbook_path)
-    root = tree.getroot()
+    backend = get_backend()
+    with tracing.span('parse'):
+        root = backend.parse(workbook_path)
     
     changes_made = 0
+    mutate_start = time.perf_counter()
+    
+    # Check if this area is PAC or PD
+    if geography is not None:
+        area_type = geography.area_type(new_pac_value)
+    else:
+        area_type = "PAC"
+        for member in root.iter('member'):
+            if member.get('alias') == new_pac_value:
+                if member.get('value', '').startswith('"PD - '):
+                    area_type = "PD"
+                break
     
     # Find ALL Selected PAC parameters (there are multiple instances)
-    for column in root.findall(".//column"):
+    for column in backend.find_all(root, 'columns'):
         if column.get('caption') == 'Selected PAC':
-            # Check if this area is PAC or PD
-            area_type = "PAC"
-            for member in root.findall(".//member[@alias]"):
-                if member.get('alias') == new_pac_value:
-                    if member.get('value', '').startswith('"PD - '):
-                        area_type = "PD"
-                    break
-            
             # Change the alias and value attributes
             old_alias = column.get('alias')
             old_value = column.get('value')
@@ -139,7 +94,7 @@ def change_selected_pac(workbook_path, new_pac_value, region):
             changes_made += 1
 
     # Update the Areas PAC filter
-    for filter_elem in root.findall(".//filter[@class='categorical']"):
+    for filter_elem in backend.find_all(root, 'categorical_filters'):
         column_attr = filter_elem.get('column')
         if column_attr and 'Areas PAC' in column_attr:
             groupfilter = filter_elem.find('groupfilter')
@@ -150,7 +105,7 @@ def change_selected_pac(workbook_path, new_pac_value, region):
                 print(f"Updated Areas PAC filter: {old_member} → {new_member}")
                 changes_made += 1
 
-    for filter_elem in root.findall(".//filter[@class='categorical']"):
+    for filter_elem in backend.find_all(root, 'categorical_filters'):
         column_attr = filter_elem.get('column')
         if column_attr and 'Areas Region' in column_attr:
             groupfilter = filter_elem.find('groupfilter')
@@ -161,12 +116,13 @@ def change_selected_pac(workbook_path, new_pac_value, region):
                 print(f"Updated Areas Region filter: {old_member} → {new_member}")
                 changes_made += 1
     
-    for value_elem in root.findall(".//value"):
+    for value_elem in backend.find_all(root, 'values'):
         if value_elem.text == '"South West Metropolitan"':
             value_elem.text = f'"{region}"'
             changes_made += 1
 
-    print(f"Updated {sum(1 for v in root.findall('.//value') if v.text == f'\\"{region}\\"')} region tuple values")
+    region_text = f'"{region}"'
+    print(f"Updated {sum(1 for v in backend.find_all(root, 'values') if v.text == region_text)} region tuple values")
         
     # Map full region names to their aliases in TWB
     region_mapping = {
@@ -183,7 +139,7 @@ def change_selected_pac(workbook_path, new_pac_value, region):
 
     
     # Find and update Selected Region parameters
-    for column in root.findall(".//column"):
+    for column in backend.find_all(root, 'columns'):
         caption = column.get('caption')
         print(f"Found column caption: '{caption}'")
         print(f"Caption equals 'Selected Region': {caption == 'Selected Region'}")  # Add this line
@@ -211,41 +167,71 @@ def change_selected_pac(workbook_path, new_pac_value, region):
             
             changes_made += 1
     
+    tracing.record('mutate', mutate_start)
+    
     if changes_made > 0:
         # Save the modified file
-        tree.write(workbook_path, encoding='utf-8', xml_declaration=True)
+        with tracing.span('write'):
+            Path(workbook_path).write_bytes(backend.writer(root)())
+        print(f"Made {changes_made} changes and saved to: {workbook_path}")
+        return True
+    else:
+        print("Selected PAC parameter not found!")
+        return False
+
+def splice_selected_pac(workbook_path, new_pac_value, region, geography=None):
+    """Apply the change_selected_pac edits by splicing new values into the workbook bytes"""
+    session = WorkbookSession(workbook_path, geography, backup=False)
+    changes_made = session.select(new_pac_value, region)
+    print(f"Selected PAC: {session.geography.area_value(new_pac_value)} ({len(session.pac_columns)} instances), "
+          f"Selected Region: \"{region}\" ({len(session.region_columns)} instances)")
+    
+    if changes_made > 0:
+        session.materialise()
         print(f"Made {changes_made} changes and saved to: {workbook_path}")
         return True
     else:
         print("Selected PAC parameter not found!")
         return False
 
-def validate_filter_data(filter_file_path, workbook_path):
+def stream_selected_pac(workbook_path, new_pac_value, region, geography=None):
+    """Apply the change_selected_pac edits in one streaming pass, for workbooks too large to parse whole"""
+    geography = geography or load_geography_index(workbook_path)
+    template = StreamTemplate(workbook_path)
+    new_value = geography.area_value(new_pac_value)
+    template.set_parameter(template.index_columns('caption', 'Selected PAC'), new_value, new_pac_value)
+    template.set_pac_filter(new_value)
+    template.set_region_filter(region)
+    template.set_region_values(region, ['"South West Metropolitan"'])
+    template.set_parameter(template.index_columns('caption', 'Selected Region'), f'"{region}"',
+                           REGION_ALIASES.get(region, region))
+    
+    # Stream into a sibling file: the workbook is being read while the new one is written
+    temp_path = Path(workbook_path).with_suffix('.twb.tmp')
+    with tracing.span('write'):
+        with open(temp_path, 'wb') as f:
+            changes_made = template.write(f)
+    print(f"Selected PAC: {new_value}, Selected Region: \"{region}\" (streamed)")
+    
+    if changes_made > 0:
+        os.replace(temp_path, workbook_path)
+        print(f"Made {changes_made} changes and saved to: {workbook_path}")
+        return True
+    else:
+        temp_path.unlink()
+        print("Selected PAC parameter not found!")
+        return False
+
+def validate_filter_data(filter_file_path, workbook_path, geography=None):
     """Validate that Excel values exist in TWB file"""
     # Read Excel
-    df = pd.read_excel(filter_file_path)
-    
-    # Parse TWB XML
-    tree = ET.parse(workbook_path)
-    root = tree.getroot()
-    
-    # Extract valid PAC and PD values (Area column)
-    valid_areas = set()
-    for member in root.findall(".//member[@alias]"):
-        value = member.get('value', '')
-        if value.startswith('"PAC - ') or value.startswith('"PD - '):
-            valid_areas.add(member.get('alias'))
-    
-    # Extract valid Region values
-    valid_regions = set()
-    for member in root.findall(".//member"):
-        value = member.get('value', '')
-        if value and not value.startswith('"PAC - ') and not value.startswith('"PD - '):
-            # Remove quotes and extract region name
-            region = value.strip('"')
-            if region in ['Central Metropolitan', 'North West Metropolitan', 'Northern', 
-                         'South West Metropolitan', 'Southern', 'Western']:
-                valid_regions.add(region)
+    df = read_sheet(filter_file_path)
+    
+    # Valid PAC/PD aliases and regions come from a single pass over the TWB
+    if geography is None:
+        geography = load_geography_index(workbook_path)
+    valid_areas = geography.valid_areas
+    valid_regions = geography.valid_regions
     
     # Find failures
     invalid_areas = set(df['Area']) - valid_areas
@@ -263,16 +249,10 @@ def validate_filter_data(filter_file_path, workbook_path):
             
             # Show what was actually found for failed areas
             for area in invalid_areas:
-                found_entries = []
-                for member in root.findall(".//member"):
-                    if area.lower() in str(member.get('alias', '')).lower() or area.lower() in str(member.get('value', '')).lower():
-                        found_entries.append(f"alias='{member.get('alias')}' value='{member.get('value')}'")
-                for alias_elem in root.findall(".//alias"):
-                    if area.lower() in str(alias_elem.get('key', '')).lower() or area.lower() in str(alias_elem.get('value', '')).lower():
-                        found_entries.append(f"alias key='{alias_elem.get('key')}' value='{alias_elem.get('value')}'")
+                found_entries = geography.find_similar(str(area))
                 
                 if found_entries:
-                    print(f"  '{area}' found as: {found_entries[:3]}")  # Show first 3 matches
+                    print(f"  '{area}' found as: {found_entries}")  # Shows the first 3 matches
                 else:
                     print(f"  '{area}' not found anywhere in TWB")
         
@@ -285,12 +265,15 @@ def validate_filter_data(filter_file_path, workbook_path):
     print("✅ All values validated")
     return True
 
-def process_filter_file(filter_file_path, workbook_path, tableau_exe_path, output_dir):
+def process_filter_file(filter_file_path, workbook_path, tableau_exe_path, output_dir, timeouts=None, exporter=None,
+                        retry_failed_only=False, ledger_path=None):
     """
-    Read filter.xlsx and process each row
+    Read filter.xlsx and process each row.
+    Progress is recorded in a job ledger so a rerun skips reports already exported.
     """
     # Read the Excel file
-    df = pd.read_excel(filter_file_path)
+    with tracing.span('read filter'):
+        df = read_sheet(filter_file_path)
 
     for index, row in df.iterrows():
         area = row['Area']
@@ -303,7 +286,12 @@ def process_filter_file(filter_file_path, workbook_path, tableau_exe_path, outpu
         
         print(f"\n🔄 Processing {index + 1}/{len(df)}: {area} - {region}")
 
-    if validate_filter_data(filter_file_path, workbook_path) is False:
+    # Build the geography index once for validation and every parameter change
+    geography = load_geography_index(workbook_path)
+    
+    with tracing.span('validate'):
+        valid = validate_filter_data(filter_file_path, workbook_path, geography)
+    if valid is False:
         print("❌ Validation failed. Please fix the filter.xlsx file.")
         return
     
@@ -311,37 +299,147 @@ def process_filter_file(filter_file_path, workbook_path, tableau_exe_path, outpu
     print(df.to_string(index=False))
     print("="*50)
     
+    # Keep the workbook parsed for the whole batch; it is backed up once here
+    session = WorkbookSession(workbook_path, geography)
+    phase_totals = {}
+    
+    # Jobs are keyed on the workbook's content hash, so editing the template invalidates them
+    ledger = JobLedger(ledger_path or Path(output_dir) / LEDGER_NAME)
+    service = get_service_type(workbook_path)
+    workbook_hash = session.workbook_hash
+    skipped = 0
+    
     # Process each row
     for index, row in df.iterrows():
         area = row['Area']
         region = row['Region']
         
+        job = JobLedger.key(area, region, service, workbook_hash)
+        if not ledger.should_run(job, retry_failed_only):
+            skipped += 1
+            continue
+        
         print(f"\n🔄 Processing {index + 1}/{len(df)}: {area} - {region}")
         print("-" * 40)
+        ledger.mark_started(job)
         
         # Step 1: Change the parameter in the workbook
         print(f"Step 1: Changing Selected PAC parameter to {area}...")
-        success = change_selected_pac(workbook_path, area, region)
+        with tracing.job(f"{area} - {region}"):
+            changes_made = session.select(area, region)
         
-        if not success:
+        if changes_made == 0:
             print(f"❌ Failed to change parameter for {area}. Skipping...")
+            ledger.mark_failed(job, "Selected PAC parameter not found")
             continue
         
         # Step 2: Export PDF
         print(f"Step 2: Exporting PDF for {area} - {region}...")
         try:
-            export_single_pdf(workbook_path, tableau_exe_path, output_dir, area, region)
+            with tracing.job(f"{area} - {region}"):
+                # A warm exporter switches parameters and filters itself, so the file is only written once
+                if not (exporter is not None and exporter.warm and session.materialised):
+                    session.materialise()
+                result = export_single_pdf(workbook_path, tableau_exe_path, output_dir, area, region, timeouts,
+                                           exporter, service)
         except Exception as e:
             print(f"❌ Error exporting {area}: {e}")
+            ledger.mark_failed(job, e)
             continue
         
+        ledger.mark_completed(job, result['path'], result['size'], result['seconds'])
+        for phase, seconds in result['phases'].items():
+            phase_totals[phase] = phase_totals.get(phase, 0.0) + seconds
+        
         print(f"✅ Completed: {area} - {region}")
     
+    if exporter is not None:
+        exporter.close()
+    
     print("\n" + "="*50)
     print("🎉 ALL REPORTS GENERATED!")
     print(f"📁 Check your output folder: {output_dir}")
+    if skipped:
+        print(f"⏭️ Skipped {skipped} report(s) already recorded in {ledger.path}")
+    if phase_totals:
+        print(f"⏱️ Time per phase: {format_phases(phase_totals)}")
     print("="*50)
 
+def schedule_filter_file(filter_file_path, workbook_path, output_dir, exporter_factory, slots=1,
+                         timeout=None, max_retries=2, backoff=5.0, estimates=None,
+                         retry_failed_only=False, ledger_path=None):
+    """
+    Export every filter.xlsx row over several exporter slots with retries.
+    Each slot works on its own copy of the workbook. Without `estimates`, jobs are
+    ordered shortest-first by their durations recorded in the ledger by earlier runs.
+    """
+    with tracing.span('read filter'):
+        df = read_sheet(filter_file_path)
+    df = df[df['Region'] != 'NSW']
+    
+    geography = load_geography_index(workbook_path)
+    with tracing.span('validate'):
+        valid = validate_filter_data(filter_file_path, workbook_path, geography)
+    if valid is False:
+        print("❌ Validation failed. Please fix the filter.xlsx file.")
+        return None
+    
+    # One workbook copy and session per slot so slots never share a file. A slot reset after a
+    # timeout gets a new copy: the abandoned attempt may still be writing the old one.
+    original = Path(workbook_path)
+    sessions = {}
+    sessions_lock = threading.Lock()
+    
+    def slot_session(slot, generation):
+        with sessions_lock:
+            current = sessions.get(slot)
+            if current is not None and current[0] > generation:
+                raise RuntimeError(f"slot {slot} was reset after a timeout; attempt abandoned")
+            if current is None or current[0] < generation:
+                suffix = f" - slot {slot}" + (f" reset {generation}" if generation else "")
+                slot_path = original.with_name(f"{original.stem}{suffix}.twb")
+                shutil.copy2(original, slot_path)
+                current = sessions[slot] = (generation, WorkbookSession(slot_path, geography, backup=False))
+            return current[1]
+    
+    for slot in range(slots):
+        slot_session(slot, 0)
+    
+    ledger = JobLedger(ledger_path or Path(output_dir) / LEDGER_NAME)
+    service = get_service_type(workbook_path)
+    workbook_hash = sessions[0][1].workbook_hash
+    
+    def ledger_key(job):
+        return JobLedger.key(job['area'], job['region'], service, workbook_hash)
+    
+    if estimates is None:
+        estimates = ledger.durations(service)
+        print(f"Shortest-first order from {len(estimates)} duration(s) recorded in {ledger.path}")
+    
+    def prepare(job, slot, generation):
+        session = slot_session(slot, generation)
+        ledger.mark_started(ledger_key(job))
+        session.select(job['area'], job['region'])
+        return session.materialise()
+    
+    # Outcomes are written as each job finishes, so a crash mid-batch keeps the completed ones
+    def record(result):
+        if result['error'] is None:
+            ledger.mark_completed(ledger_key(result), result['result']['path'], result['result']['size'],
+                                  result['result']['seconds'])
+        else:
+            ledger.mark_failed(ledger_key(result), result['error'])
+    
+    jobs = [{'area': row['Area'], 'region': row['Region'], 'service': service} for _, row in df.iterrows()]
+    jobs = [job for job in jobs if ledger.should_run(ledger_key(job), retry_failed_only)]
+    print(f"Scheduling {len(jobs)} reports over {slots} slot(s)")
+    scheduler = ExportScheduler(exporter_factory, output_dir, slots, prepare, timeout,
+                                max_retries, backoff, estimates, on_result=record)
+    report = scheduler.run(jobs)
+    
+    print_report(report)
+    return report
+
 # Main execution
 if __name__ == "__main__":
     # Configuration - UPDATE THESE PATHS
@@ -350,6 +448,14 @@ if __name__ == "__main__":
     tableau_executable = r"C:\Program Files\Tableau\Tableau 2024.3\bin\tableau.exe"
     #output_directory = r"C:\Users\CL-11\OneDrive - Lonergan Research\Repos\tableau-automation\output"
     output_directory = r"output"
+    # Keep one Tableau open and switch parameters between prints instead of relaunching
+    warm_session = False
+    # Only rerun the reports that failed or were interrupted last time (completed ones are always skipped)
+    retry_failed_only = False
+    # Validate and generate the next rows while Tableau exports the current one
+    pipelined = False
+    # Folder for a per-phase trace (trace.jsonl, Chrome trace.json), or None to skip tracing
+    trace_dir = None
     
     
     print("BATCH TABLEAU AUTOMATION")
@@ -359,13 +465,28 @@ if __name__ == "__main__":
     print(f"Output: {output_directory}")
     print()
     
-    # Install pandas if needed: pip install pandas openpyxl
+    # Install pandas if needed: pip install pandas openpyxl pyarrow
     
+    if trace_dir is not None:
+        tracing.start()
     try:
-        process_filter_file(filter_file, workbook_file, tableau_executable, output_directory)
+        exporter = None
+        if warm_session:
+            exporter = WarmSessionExporter(GuiTableauBackend(tableau_executable), REGION_ALIASES,
+                                           area_value=load_geography_index(workbook_file).area_value)
+        if pipelined:
+            run_filter_pipeline(filter_file, workbook_file, output_directory,
+                                exporter or TableauGuiExporter(tableau_executable),
+                                retry_failed_only=retry_failed_only)
+        else:
+            process_filter_file(filter_file, workbook_file, tableau_executable, output_directory, exporter=exporter,
+                                retry_failed_only=retry_failed_only)
     except Exception as e:
         print(f"❌ Critical error: {e}")
         print("Make sure:")
         print("- filter.xlsx exists and has 'Area' and 'Region' columns")
         print("- All file paths are correct") 
-        print("- pandas and openpyxl are installed: pip install pandas openpyxl")
\ No newline at end of file
+        print("- pandas, openpyxl and pyarrow are installed: pip install pandas openpyxl pyarrow")
+    finally:
+        if trace_dir is not None:
+            tracing.finish(trace_dir)
@@ -2,7 +2,19 @@ import xml.etree.ElementTree as ET
 import shutil
 from pathlib import Path
 
-def create_region_templates(source_twb_path):
+from twb_engine import SpliceTemplate, write_variant
+
+# Display aliases for the Selected Region parameter
+region_aliases = {
+    "Central Metropolitan": "Central Metro",
+    "North West Metropolitan": "North West Metro", 
+    "South West Metropolitan": "South West Metro",
+    "Northern": "Northern",
+    "Southern": "Southern",
+    "Western": "Western"
+}
+
+def create_region_templates(source_twb_path, splice=False):
     """Create 6 template files with different regions"""
     
     regions = [
@@ -16,6 +28,11 @@ def create_region_templates(source_twb_path):
     
     source_path = Path(source_twb_path)
     
+    # Splice mode reads the source once and only rewrites the changed bytes
+    if splice:
+        template = SpliceTemplate(source_path)
+        selected_region_columns = [c for c in template.parameter_2_columns if c['caption'] == 'Selected Region']
+    
     for region in regions:
         # Create output filename
         safe_region = region.replace(" ", "_")
@@ -26,6 +43,14 @@ def create_region_templates(source_twb_path):
 
         print("Path:", output_path)
         
+        if splice:
+            template.set_region_filter(region)
+            template.set_region_values(region)
+            template.set_parameter(selected_region_columns, f'"{region}"', region_aliases.get(region, region))
+            write_variant(output_path, template.to_bytes())
+            print(f"Created: {output_path}")
+            continue
+        
         # Copy source file
         shutil.copy2(source_path, output_path)
         
@@ -47,15 +72,6 @@ def create_region_templates(source_twb_path):
                 value_elem.text = f'"{region}"'
         
         # Update Parameter 2 (Selected Region) columns
-        region_aliases = {
-            "Central Metropolitan": "Central Metro",
-            "North West Metropolitan": "North West Metro", 
-            "South West Metropolitan": "South West Metro",
-            "Northern": "Northern",
-            "Southern": "Southern",
-            "Western": "Western"
-        }
-        
         for column_elem in root.findall(".//column[@name='[Parameter 2]']"):
             if column_elem.get('caption') == 'Selected Region':
                 # Update the default value
@@ -1,117 +1,168 @@
-import xml.etree.ElementTree as ET
-import shutil
+import argparse
+import time
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 import os
 
-def extract_pac_names_from_pdfs():
-    """Extract PAC names from PDF files in Export directories"""
-    pac_names = set()
-    region_names = set()
+from build_cache import BuildManifest, hash_bytes, hash_file, variant_key
+from column_graph import ColumnGraph
+from data_slices import SLICE_DIR, slice_name, write_slices
+from report_catalog import ReportCatalog, print_problems
+from twb_engine import load_template
+from workbook_slim import SLIM_VERSION, SlimmingError, describe, slim_workbook
+
+# Map region display names to full region names
+REGION_DISPLAY_TO_FULL = {
+    "Central Metro": "Central Metropolitan",
+    "North West Metro": "North West Metropolitan",
+    "South West Metro": "South West Metropolitan",
+    "Northern": "Northern",
+    "Southern": "Southern",
+    "Western": "Western"
+}
+
+# Map full region names to their Selected Region aliases
+REGION_ALIASES = {
+    "Central Metropolitan": "Central Metro",
+    "North West Metropolitan": "North West Metro", 
+    "South West Metropolitan": "South West Metro",
+    "Northern": "Northern",
+    "Southern": "Southern",
+    "Western": "Western"
+}
+
+# Map full region names to output subdirectory names
+REGION_DIR_MAPPING = {
+    "Central Metropolitan": "Central_Metro",
+    "North West Metropolitan": "North_West_Metro",
+    "South West Metropolitan": "South_West_Metro",
+    "Northern": "Northern",
+    "Southern": "Southern",
+    "Western": "Western"
+}
+
+# Metropolitan areas use "PAC - " prefix, regional areas use "PD - " prefix
+METRO_REGIONS = ["Central Metropolitan", "North West Metropolitan", "South West Metropolitan"]
+
+# Define region mapping for PACs based on exact names from original template
+PAC_TO_REGION = {
+    # Central Metro PACs (use PAC prefix)
+    "Eastern Beaches": "Central Metropolitan",
+    "Eastern Suburbs": "Central Metropolitan", 
+    "Inner West": "Central Metropolitan",
+    "Kings Cross": "Central Metropolitan",
+    "Leichhardt": "Central Metropolitan",
+    "South Sydney": "Central Metropolitan",
+    "St George": "Central Metropolitan",
+    "Surry Hills": "Central Metropolitan",
+    "Sutherland Shire": "Central Metropolitan",
+    "Sydney City": "Central Metropolitan",
     
-    # Define base export directory
-    export_base = Path("Export")
+    # North West Metro PACs (use PAC prefix)
+    "Blacktown": "North West Metropolitan",
+    "Blue Mountains": "North West Metropolitan",
+    "Hawkesbury": "North West Metropolitan",
+    "Kuring-gai": "North West Metropolitan",
+    "Mount Druitt": "North West Metropolitan",
+    "Nepean": "North West Metropolitan",
+    "North Shore": "North West Metropolitan",
+    "Northern Beaches": "North West Metropolitan",
+    "Parramatta": "North West Metropolitan",
+    "Riverstone": "North West Metropolitan",
+    "Ryde": "North West Metropolitan",
+    "The Hills": "North West Metropolitan",
     
-    # Define known region names to avoid treating them as PACs
-    known_regions = {
-        "Central Metro", "North West Metro", "South West Metro", 
-        "Northern", "Southern", "Western"
-    }
+    # South West Metro PACs (use PAC prefix)
+    "Auburn": "South West Metropolitan",
+    "Bankstown": "South West Metropolitan",
+    "Burwood": "South West Metropolitan",
+    "Camden": "South West Metropolitan",
+    "Campbelltown City": "South West Metropolitan",
+    "Campsie": "South West Metropolitan",
+    "Cumberland": "South West Metropolitan",
+    "Fairfield City": "South West Metropolitan",
+    "Liverpool City": "South West Metropolitan",
     
-    # Check both Walk In and Telephone directories
-    for service_type in ["Walk In", "Telephone"]:
-        service_dir = export_base / service_type
-        if service_dir.exists():
-            # First check for region-level PDFs in the main service directory
-            for pdf_file in service_dir.glob("*.pdf"):
-                pdf_name = pdf_file.stem
-                
-                # These are region-level files (e.g., "Central Metro - Telephone.pdf")
-                if " - Walk In" in pdf_name or " - Walkin" in pdf_name:
-                    region_name = pdf_name.replace(" - Walk In", "").replace(" - Walkin", "").strip()
-                elif " - Telephone" in pdf_name:
-                    region_name = pdf_name.replace(" - Telephone", "").replace("- Telephone", "").strip()
-                else:
-                    region_name = pdf_name.strip()
-                
-                # Clean up region name variations
-                region_name = region_name.replace("South West Metro- Telephone", "South West Metro")
-                region_name = region_name.replace("Southern West Metro", "South West Metro")
-                
-                if region_name and region_name not in ["", " "]:
-                    region_names.add(region_name)
-            
-            # Then look in region subdirectories for PAC-level PDFs
-            for region_dir in service_dir.iterdir():
-                if region_dir.is_dir():
-                    # Extract PACs from PDF files in region directories
-                    for pdf_file in region_dir.glob("*.pdf"):
-                        # Extract PAC name (everything before " - Walk In.pdf" or " - Telephone.pdf")
-                        pdf_name = pdf_file.stem
-                        
-                        # Clean up the PAC name by removing service type suffixes and variations
-                        pac_name = pdf_name
-                        
-                        # Remove common suffixes
-                        suffixes_to_remove = [
-                            " - Walk In",
-                            " - Telephone", 
-                            " - Walkin",
-                            " -Walk In",
-                            " - Central Metropolitan - Walkin",
-                            " - Central Metropolitan",
-                            " - North West Metropolitan",
-                            " - South West Metropolitan", 
-                            " - Northern",
-                            " - Southern",
-                            " - Western",
-                            "- Telephone",
-                            " Telephone",
-                            " - old",
-                            "_WRONG"
-                        ]
-                        
-                        for suffix in suffixes_to_remove:
-                            if pac_name.endswith(suffix):
-                                pac_name = pac_name[:-len(suffix)]
-                                break
-                        
-                        # Handle specific naming inconsistencies and PDF to Tableau name mappings
-                        pac_name = pac_name.replace("Campelltown", "Campbelltown")
-                        pac_name = pac_name.replace("Nepan", "Nepean")
-                        pac_name = pac_name.replace("Parammatta", "Parramatta")
-                        pac_name = pac_name.replace("Hunter Valley- Telephone", "Hunter Valley")
-                        pac_name = pac_name.replace("Northern Beaches- Telephone", "Northern Beaches")
-                        pac_name = pac_name.replace("Riverstone Telephone", "Riverstone")
-                        
-                        # Map PDF names to exact Tableau data names
-                        if pac_name == "Liverpool":
-                            pac_name = "Liverpool City"
-                        elif pac_name == "Campbelltown":
-                            pac_name = "Campbelltown City"
-                        elif pac_name == "Fairfield":
-                            pac_name = "Fairfield City"
-                        elif pac_name == "Tweed and Byron":
-                            pac_name = "Tweed/Byron"
-                        elif pac_name == "TweedByron":
-                            pac_name = "Tweed/Byron"
-                        elif pac_name == "Port Stephens and Hunter":
-                            pac_name = "Port Stephens/Hunter"
-                        elif pac_name == "Port StephensHunter":
-                            pac_name = "Port Stephens/Hunter"
-                        elif pac_name == "CoffsClarence":
-                            pac_name = "Coffs/Clarence"
-                        
-                        # Clean up any extra formatting
-                        pac_name = pac_name.strip()
-                        
-                        # Only add if it's not empty and not a known region name
-                        if pac_name and pac_name not in ["", " "] and pac_name not in known_regions:
-                            pac_names.add(pac_name)
+    # Northern PACs (use PD prefix)
+    "Brisbane Water": "Northern",
+    "Coffs/Clarence": "Northern",
+    "Hunter Valley": "Northern",
+    "Lake Macquarie": "Northern",
+    "Manning Great Lakes": "Northern",
+    "Mid North Coast": "Northern",
+    "Newcastle City": "Northern",
+    "Port Stephens/Hunter": "Northern",
+    "Richmond": "Northern",
+    "Tuggerah Lakes": "Northern",
+    "Tweed/Byron": "Northern",
     
-    return sorted(list(pac_names)), sorted(list(region_names))
+    # Southern PACs (use PD prefix)
+    "Lake Illawarra": "Southern",
+    "Monaro": "Southern",
+    "Murray River": "Southern",
+    "Murrumbidgee": "Southern",
+    "Riverina": "Southern",
+    "South Coast": "Southern",
+    "The Hume": "Southern",
+    "Wollongong": "Southern",
+    
+    # Western PACs (use PD prefix)
+    "Barrier": "Western",
+    "Central North": "Western",
+    "Central West": "Western",
+    "Chifley": "Western",
+    "New England": "Western",
+    "Orana Mid-Western": "Western",
+    "Oxley": "Western",
+}
 
-def create_region_templates(source_twb_path, region_names):
-    """Create template files for each region (comparing region to NSW)"""
+# Excel data source behind each service type's templates
+SERVICE_DATA_PATHS = {
+    "Walk-in": Path("walkin/output_walkin.xlsx"),
+    "Telephone": Path("telephone/output_telephone.xlsx"),
+}
+
+def get_service_type(source_path):
+    """Return the service type label for a template path"""
+    return "Telephone" if "Telephone" in Path(source_path).name else "Walk-in"
+
+def discover_areas(source_twb_paths):
+    """
+    Return ({PAC: region}, region display names) from the report catalog.
+
+    The catalog is seeded from the templates' parameter members and the data sources,
+    and the Export folders are re-indexed incrementally; misnamed or stale PDFs are
+    listed rather than parsed into PAC names.
+    """
+    catalog = ReportCatalog()
+    for source_twb_path in source_twb_paths:
+        if Path(source_twb_path).exists():
+            catalog.seed_from_workbook(get_service_type(source_twb_path), source_twb_path)
+    for service_type, data_path in SERVICE_DATA_PATHS.items():
+        if data_path.exists():
+            catalog.seed_from_data(service_type, data_path)
+    counts = catalog.refresh()
+    print(f"Report catalog: {counts['scanned']} PDF(s) scanned, {counts['indexed']} (re)indexed, "
+          f"{counts['removed']} removed")
+    print_problems(catalog)
+    pac_to_region = catalog.pac_to_region()
+    catalog.close()
+    
+    if not pac_to_region:
+        print("Warning: No areas found in the data sources, falling back to PAC_TO_REGION")
+        pac_to_region = dict(PAC_TO_REGION)
+    for pac_name, region in pac_to_region.items():
+        if PAC_TO_REGION.get(pac_name, region) != region:
+            print(f"Warning: Data puts {pac_name} in {region}, PAC_TO_REGION says {PAC_TO_REGION[pac_name]}")
+    region_names = sorted({REGION_ALIASES.get(region, region) for region in pac_to_region.values()})
+    return pac_to_region, region_names
+
+def get_area_prefix(region):
+    """Return the area prefix used in member values for a region"""
+    return "PAC" if region in METRO_REGIONS else "PD"
+
+def plan_region_variants(source_twb_path, region_names):
+    """Return one region variant job per region (comparing region to NSW)"""
     
     # Use the specific region template file as the base
     source_path = Path(source_twb_path)
@@ -119,148 +170,35 @@ def create_region_templates(source_twb_path, region_names):
     
     if not region_template_path.exists():
         print(f"Warning: Region template not found at {region_template_path}")
-        return
+        return []
     
-    # Map region display names to full region names
-    region_display_to_full = {
-        "Central Metro": "Central Metropolitan",
-        "North West Metro": "North West Metropolitan",
-        "South West Metro": "South West Metropolitan",
-        "Northern": "Northern",
-        "Southern": "Southern",
-        "Western": "Western"
-    }
+    # Save to service type output directory (telephone/output or walkin/output)
+    service_type = get_service_type(source_path)
+    service_folder = "telephone" if service_type == "Telephone" else "walkin"
+    output_dir = Path(service_folder) / "output"
     
+    jobs = []
     for region_display in region_names:
         # Get the full region name
-        full_region = region_display_to_full.get(region_display, region_display)
-        
-        # Create output filename
-        safe_region_name = region_display.replace(" ", "_")
-        # Save to service type output directory (telephone/output or walkin/output)
-        service_type = "Telephone" if "Telephone" in source_path.name else "Walk-in"
-        service_folder = "telephone" if "Telephone" in source_path.name else "walkin"
-        output_dir = Path(service_folder) / "output"
-        output_dir.mkdir(parents=True, exist_ok=True)
-        output_path = output_dir / f"{region_display} - {service_type}.twb"
+        full_region = REGION_DISPLAY_TO_FULL.get(region_display, region_display)
+        jobs.append({
+            'kind': 'region',
+            'template': str(region_template_path),
+            'output': str(output_dir / f"{region_display} - {service_type}.twb"),
+            'region': full_region,
+        })
+    return jobs
 
-        print("Region Template Path:", output_path)
-        
-        # Copy the region template file (not the main template)
-        shutil.copy2(region_template_path, output_path)
-        
-        # Parse and modify
-        tree = ET.parse(output_path)
-        root = tree.getroot()
-        
-        # Update Areas Region filter to match the specific region
-        for filter_elem in root.findall(".//filter[@class='categorical']"):
-            column_attr = filter_elem.get('column')
-            if column_attr and 'Areas Region' in column_attr:
-                groupfilter = filter_elem.find('groupfilter')
-                if groupfilter is not None:
-                    groupfilter.set('member', f'"{full_region}"')
-        
-        # Save
-        tree.write(output_path, encoding='utf-8', xml_declaration=True)
-        print(f"Created region template: {output_path}")
-
-def create_pac_templates(source_twb_path):
-    """Create template files for each PAC and region"""
-    
-    # Extract PAC names and region names from PDF files
-    pac_names, region_names = extract_pac_names_from_pdfs()
-    print(f"Found {len(pac_names)} PACs: {pac_names}")
-    print(f"Found {len(region_names)} Regions: {region_names}")
-    
-    # Create region templates first
-    create_region_templates(source_twb_path, region_names)
-    
-    # Then create PAC templates
-    
-    # Define region mapping for PACs based on exact names from original template
-    pac_to_region = {
-        # Central Metro PACs (use PAC prefix)
-        "Eastern Beaches": "Central Metropolitan",
-        "Eastern Suburbs": "Central Metropolitan", 
-        "Inner West": "Central Metropolitan",
-        "Kings Cross": "Central Metropolitan",
-        "Leichhardt": "Central Metropolitan",
-        "South Sydney": "Central Metropolitan",
-        "St George": "Central Metropolitan",
-        "Surry Hills": "Central Metropolitan",
-        "Sutherland Shire": "Central Metropolitan",
-        "Sydney City": "Central Metropolitan",
-        
-        # North West Metro PACs (use PAC prefix)
-        "Blacktown": "North West Metropolitan",
-        "Blue Mountains": "North West Metropolitan",
-        "Hawkesbury": "North West Metropolitan",
-        "Kuring-gai": "North West Metropolitan",
-        "Mount Druitt": "North West Metropolitan",
-        "Nepean": "North West Metropolitan",
-        "North Shore": "North West Metropolitan",
-        "Northern Beaches": "North West Metropolitan",
-        "Parramatta": "North West Metropolitan",
-        "Riverstone": "North West Metropolitan",
-        "Ryde": "North West Metropolitan",
-        "The Hills": "North West Metropolitan",
-        
-        # South West Metro PACs (use PAC prefix)
-        "Auburn": "South West Metropolitan",
-        "Bankstown": "South West Metropolitan",
-        "Burwood": "South West Metropolitan",
-        "Camden": "South West Metropolitan",
-        "Campbelltown City": "South West Metropolitan",
-        "Campsie": "South West Metropolitan",
-        "Cumberland": "South West Metropolitan",
-        "Fairfield City": "South West Metropolitan",
-        "Liverpool City": "South West Metropolitan",
-        
-        # Northern PACs (use PD prefix)
-        "Brisbane Water": "Northern",
-        "Coffs/Clarence": "Northern",
-        "Hunter Valley": "Northern",
-        "Lake Macquarie": "Northern",
-        "Manning Great Lakes": "Northern",
-        "Mid North Coast": "Northern",
-        "Newcastle City": "Northern",
-        "Port Stephens/Hunter": "Northern",
-        "Richmond": "Northern",
-        "Tuggerah Lakes": "Northern",
-        "Tweed/Byron": "Northern",
-        
-        # Southern PACs (use PD prefix)
-        "Lake Illawarra": "Southern",
-        "Monaro": "Southern",
-        "Murray River": "Southern",
-        "Murrumbidgee": "Southern",
-        "Riverina": "Southern",
-        "South Coast": "Southern",
-        "The Hume": "Southern",
-        "Wollongong": "Southern",
-        
-        # Western PACs (use PD prefix)
-        "Barrier": "Western",
-        "Central North": "Western",
-        "Central West": "Western",
-        "Chifley": "Western",
-        "New England": "Western",
-        "Orana Mid-Western": "Western",
-        "Oxley": "Western",
-    }
-    
-    regions = [
-        "Central Metropolitan",
-        "Northern", 
-        "North West Metropolitan",
-        "Southern",
-        "South West Metropolitan", 
-        "Western"
-    ]
-    
+def plan_pac_variants(source_twb_path, pac_names, slices=False, project=False, pac_to_region=PAC_TO_REGION):
+    """Return one PAC variant job per PAC with a known region, on its region's data slice if slices is set"""
     source_path = Path(source_twb_path)
+    service_type = get_service_type(source_path)
+    output_base_dir = source_path.parent.parent / "output"
+    
+    # Only the columns the dashboards read go into the slices
+    data_columns = ColumnGraph(source_path).required_columns() if slices and project else None
     
+    jobs = []
     for pac_name in pac_names:
         # Determine which region this PAC belongs to
         region = pac_to_region.get(pac_name, "Unknown Region")
@@ -271,164 +209,221 @@ def create_pac_templates(source_twb_path):
         # Create output filename
         safe_pac_name = pac_name.replace(" ", "_").replace("&", "and").replace("/", "_")
         
-        # Determine which region directory this PAC belongs to
-        region_dir_mapping = {
-            "Central Metropolitan": "Central_Metro",
-            "North West Metropolitan": "North_West_Metro",
-            "South West Metropolitan": "South_West_Metro",
-            "Northern": "Northern",
-            "Southern": "Southern",
-            "Western": "Western"
-        }
-        
-        region_dir_name = region_dir_mapping.get(region, region.replace(" ", "_"))
-        
         # Save to output directory with region subdirectory
-        output_base_dir = source_path.parent.parent / "output"
-        output_base_dir.mkdir(exist_ok=True)
-        region_output_dir = output_base_dir / region_dir_name
-        region_output_dir.mkdir(exist_ok=True)
-        # Determine service type from source file name
-        service_type = "Telephone" if "Telephone" in source_path.name else "Walk-in"
-        output_path = region_output_dir / f"{safe_pac_name} - {service_type}.twb"
-
-        print("Path:", output_path)
-        
-        # Copy source file
-        shutil.copy2(source_path, output_path)
+        region_dir_name = REGION_DIR_MAPPING.get(region, region.replace(" ", "_"))
+        output_path = output_base_dir / region_dir_name / f"{safe_pac_name} - {service_type}.twb"
         
-        # Parse and modify
-        tree = ET.parse(output_path)
-        root = tree.getroot()
-        
-        # Update Areas Region filter to match the PAC's region
-        for filter_elem in root.findall(".//filter[@class='categorical']"):
-            column_attr = filter_elem.get('column')
-            if column_attr and 'Areas Region' in column_attr:
-                groupfilter = filter_elem.find('groupfilter')
-                if groupfilter is not None:
-                    groupfilter.set('member', f'"{region}"')
+        job = {
+            'kind': 'pac',
+            'template': str(source_path),
+            'output': str(output_path),
+            'pac': pac_name,
+            'region': region,
+            'prefix': get_area_prefix(region),
+            # All PACs for the region populate the parameter domain
+            'region_pacs': [pac for pac, reg in pac_to_region.items() if reg == region],
+        }
+        if slices:
+            # Every PAC in a region folder shares one slice next to it (the full data, see data_slices.py)
+            data_file = f"{SLICE_DIR}/{slice_name(region, service_type)}"
+            job['data_source'] = str(SERVICE_DATA_PATHS[service_type])
+            job['data_file'] = data_file
+            job['data_slice'] = str(output_path.parent / data_file)
+            if data_columns is not None:
+                job['data_columns'] = data_columns
+        jobs.append(job)
+    return jobs
+
+# Per-process template state: source bytes shared from the parent, parsed on first use
+WORKER_SOURCES = {}
+WORKER_TEMPLATES = {}
+WORKER_SPLICE = False
+WORKER_STREAM = False
+
+def init_worker(sources, splice, stream=False):
+    """Receive the template bytes once per worker process"""
+    global WORKER_SPLICE, WORKER_STREAM
+    WORKER_SOURCES.update(sources)
+    WORKER_TEMPLATES.clear()
+    WORKER_SPLICE = splice
+    WORKER_STREAM = stream
+
+def render_job(job):
+    """Generate one variant and return (job, error, seconds)"""
+    start = time.perf_counter()
+    try:
+        template = WORKER_TEMPLATES.get(job['template'])
+        if template is None:
+            template = load_template(job['template'], WORKER_SPLICE, WORKER_SOURCES.get(job['template']),
+                                     WORKER_STREAM)
+            WORKER_TEMPLATES[job['template']] = template
         
-        # Determine the correct prefix based on region
-        # Metropolitan areas use "PAC - " prefix, regional areas use "PD - " prefix
-        if region in ["Central Metropolitan", "North West Metropolitan", "South West Metropolitan"]:
-            prefix = "PAC"
+        if job['kind'] == 'region':
+            template.apply_region_variant(job['region'])
         else:
-            prefix = "PD"
+            template.apply_pac_variant(job['pac'], job['region'], job['prefix'],
+                                       job['region_pacs'], REGION_ALIASES, job.get('data_file'))
         
-        # Update Areas PAC filter to the specific PAC
-        for filter_elem in root.findall(".//filter[@class='categorical']"):
-            column_attr = filter_elem.get('column')
-            if column_attr and 'Areas PAC' in column_attr:
-                groupfilter = filter_elem.find('groupfilter')
-                if groupfilter is not None:
-                    groupfilter.set('member', f'"{prefix} - {pac_name}"')
-        
-        # Get all PACs for the region for populating the parameter domain
-        region_pacs = [pac for pac, reg in pac_to_region.items() if reg == region]
-        
-        # Determine the correct prefix based on region
-        # Metropolitan areas use "PAC - " prefix, regional areas use "PD - " prefix
-        if region in ["Central Metropolitan", "North West Metropolitan", "South West Metropolitan"]:
-            prefix = "PAC"
+        output_path = Path(job['output'])
+        output_path.parent.mkdir(parents=True, exist_ok=True)
+        template.save(output_path)
+        return job, None, time.perf_counter() - start
+    except Exception as e:
+        return job, f"{type(e).__name__}: {e}", time.perf_counter() - start
+
+def write_data_slices(jobs, manifest, force=False):
+    """Write the data slices the PAC jobs connect to, reading each data source once"""
+    slices_by_source = {}
+    columns_by_source = {}
+    for job in jobs:
+        if 'data_slice' in job:
+            slices_by_source.setdefault(job['data_source'], {})[job['data_slice']] = None
+            columns_by_source[job['data_source']] = job.get('data_columns')
+    
+    written = 0
+    for source_path, slices in slices_by_source.items():
+        if not Path(source_path).exists():
+            print(f"Warning: Data source not found at {source_path}; its PAC workbooks will point at missing slices")
+            continue
+        written += write_slices(source_path, list(slices), manifest, force, columns_by_source[source_path])
+    if slices_by_source:
+        total = sum(len(slices) for slices in slices_by_source.values())
+        print(f"Data slices: {written} written, {total - written} unchanged")
+
+def slim_sources(sources, paths):
+    """Slim the given templates in place; a template that fails verification is used as it is"""
+    for path in paths:
+        try:
+            slimmed, stats = slim_workbook(sources[path])
+        except SlimmingError as e:
+            print(f"Warning: Not slimming {path}: {e}")
+            continue
+        print(f"Slimmed {path}: {len(sources[path]) / 1e6:.2f} MB -> {len(slimmed) / 1e6:.2f} MB "
+              f"({describe(stats)})")
+        sources[path] = slimmed
+
+def generate_variants(jobs, splice=False, workers=1, force=False, slim=False, stream=False):
+    """Render variant jobs in order, in-process or over a process pool, and summarise the run"""
+    start = time.perf_counter()
+    template_paths = list(dict.fromkeys(job['template'] for job in jobs))
+    # Streamed variants read the template from disk, so it is never held in memory (unless slimmed)
+    if stream and not slim:
+        sources = {}
+        template_hashes = {path: hash_file(path) for path in template_paths}
+    else:
+        sources = {path: Path(path).read_bytes() for path in template_paths}
+        template_hashes = {path: hash_bytes(data) for path, data in sources.items()}
+    if slim:
+        template_hashes = {path: digest + f"+slim{SLIM_VERSION}" for path, digest in template_hashes.items()}
+    
+    # Skip variants whose template and parameters are unchanged since the last build
+    manifest = BuildManifest()
+    write_data_slices(jobs, manifest, force)
+    keys = [variant_key(job, template_hashes[job['template']], splice) for job in jobs]
+    pending = [(job, key) for job, key in zip(jobs, keys)
+               if force or not manifest.is_fresh(job['output'], key)]
+    pending_jobs = [job for job, key in pending]
+    if slim:
+        slim_sources(sources, dict.fromkeys(job['template'] for job in pending_jobs))
+    
+    if workers > 1 and pending_jobs:
+        with ProcessPoolExecutor(max_workers=workers, initializer=init_worker,
+                                 initargs=(sources, splice, stream)) as executor:
+            # map keeps results in job order so the log is deterministic
+            results = list(executor.map(render_job, pending_jobs,
+                                        chunksize=max(1, len(pending_jobs) // (workers * 4))))
+    else:
+        init_worker(sources, splice, stream)
+        results = [render_job(job) for job in pending_jobs]
+    
+    failures = []
+    for (job, error, seconds), (_, key) in zip(results, pending):
+        if error:
+            failures.append((job, error))
+            print(f"❌ Failed: {job['output']} ({error})")
+            continue
+        manifest.record(job['output'], key)
+        if job['kind'] == 'region':
+            print(f"Created region template: {job['output']}")
         else:
-            prefix = "PD"
-        
-        # Update Parameter 1 (Selected PAC) columns
-        for column_elem in root.findall(".//column[@name='[Parameter 1]']"):
-            # Update the default value to the current PAC
-            column_elem.set('value', f'"{prefix} - {pac_name}"')
-            
-            # Update the alias (display name) 
-            column_elem.set('alias', pac_name)
-            
-            # Update the calculation formula
-            calculation_elem = column_elem.find('calculation')
-            if calculation_elem is not None:
-                calculation_elem.set('formula', f'"{prefix} - {pac_name}"')
-            
-            # Update aliases - include all PACs in this region
-            aliases_elem = column_elem.find('aliases')
-            if aliases_elem is not None:
-                aliases_elem.clear()
-                # Add all PACs in the region to the aliases
-                for region_pac in sorted(region_pacs):
-                    alias_elem = ET.SubElement(aliases_elem, 'alias')
-                    alias_elem.set('key', f'"{prefix} - {region_pac}"')
-                    alias_elem.set('value', region_pac)
-            
-            # Update members - include all PACs in this region  
-            members_elem = column_elem.find('members')
-            if members_elem is not None:
-                members_elem.clear()
-                # Add all PACs in the region to the members
-                for region_pac in sorted(region_pacs):
-                    member_elem = ET.SubElement(members_elem, 'member')
-                    member_elem.set('alias', region_pac)
-                    member_elem.set('value', f'"{prefix} - {region_pac}"')
-        
-        # Update all region tuple values to match the PAC's region
-        for value_elem in root.findall(".//value"):
-            if value_elem.text and ("Metropolitan" in value_elem.text or value_elem.text in ['"Northern"', '"Southern"', '"Western"']):
-                value_elem.text = f'"{region}"'
-        
-        # Update Parameter 2 (Selected Region) columns to match the PAC's region
-        region_aliases = {
-            "Central Metropolitan": "Central Metro",
-            "North West Metropolitan": "North West Metro", 
-            "South West Metropolitan": "South West Metro",
-            "Northern": "Northern",
-            "Southern": "Southern",
-            "Western": "Western"
-        }
-        
-        # Get all regions for the dropdown
-        all_regions = list(region_aliases.keys())
-        
-        for column_elem in root.findall(".//column[@name='[Parameter 2]']"):
-            # Update the default value to the PAC's region
-            column_elem.set('value', f'"{region}"')
-            
-            # Update the alias (display name)
-            if region in region_aliases:
-                column_elem.set('alias', region_aliases[region])
-                display_region = region_aliases[region]
-            else:
-                column_elem.set('alias', region)
-                display_region = region
-            
-            # Update the calculation formula
-            calculation_elem = column_elem.find('calculation')
-            if calculation_elem is not None:
-                calculation_elem.set('formula', f'"{region}"')
-            
-            # Update aliases - include all regions
-            aliases_elem = column_elem.find('aliases')
-            if aliases_elem is not None:
-                aliases_elem.clear()
-                # Add all regions to the aliases
-                for reg in sorted(all_regions):
-                    alias_elem = ET.SubElement(aliases_elem, 'alias')
-                    alias_elem.set('key', f'"{reg}"')
-                    alias_elem.set('value', region_aliases.get(reg, reg))
-            
-            # Update members - include all regions
-            members_elem = column_elem.find('members')
-            if members_elem is not None:
-                members_elem.clear()
-                # Add all regions to the members
-                for reg in sorted(all_regions):
-                    member_elem = ET.SubElement(members_elem, 'member')
-                    member_elem.set('alias', region_aliases.get(reg, reg))
-                    member_elem.set('value', f'"{reg}"')
-        
-        # Save
-        tree.write(output_path, encoding='utf-8', xml_declaration=True)
-        print(f"Created: {output_path}")
+            print(f"Created: {job['output']}")
+    manifest.save()
+    
+    elapsed = time.perf_counter() - start
+    print(f"Generated {len(results) - len(failures)}/{len(results)} workbooks "
+          f"in {elapsed:.1f}s with {max(workers, 1)} worker(s)")
+    if force:
+        print(f"Build cache: bypassed (--force), {len(results)} rebuilt")
+    else:
+        print(f"{manifest.summary()} ({len(jobs) - len(pending_jobs)} unchanged workbook(s) left untouched)")
+    if failures:
+        print(f"❌ {len(failures)} variant(s) failed")
+    return results
 
-# Usage
-source_file = r"telephone\templates\NSW Police Service Assessment Telephone.twb"
-create_pac_templates(source_file)
+def create_region_templates(source_twb_path, region_names, splice=False, workers=1, force=False, slim=False,
+                            stream=False):
+    """Create template files for each region (comparing region to NSW)"""
+    return generate_variants(plan_region_variants(source_twb_path, region_names), splice, workers, force, slim,
+                             stream)
 
-source_file = r"walkin\templates\NSW Police Service Assessment Walk-in.twb"
-create_pac_templates(source_file)
\ No newline at end of file
+def create_pac_templates(source_twb_path, splice=False, workers=1, force=False, slices=False, project=False,
+                         slim=False, stream=False):
+    """Create template files for each PAC and region"""
+    
+    # PAC and region names come from the report catalog
+    pac_to_region, region_names = discover_areas([source_twb_path])
+    print(f"Found {len(pac_to_region)} PACs: {sorted(pac_to_region)}")
+    print(f"Found {len(region_names)} Regions: {region_names}")
+    
+    # Region templates first, then PAC templates
+    jobs = (plan_region_variants(source_twb_path, region_names)
+            + plan_pac_variants(source_twb_path, sorted(pac_to_region), slices, project, pac_to_region))
+    return generate_variants(jobs, splice, workers, force, slim, stream)
+
+def create_all_templates(source_twb_paths, splice=False, workers=1, force=False, slices=False, project=False,
+                         slim=False, stream=False):
+    """Create region and PAC templates for every service type as one job matrix"""
+    pac_to_region, region_names = discover_areas(source_twb_paths)
+    print(f"Found {len(pac_to_region)} PACs: {sorted(pac_to_region)}")
+    print(f"Found {len(region_names)} Regions: {region_names}")
+    
+    jobs = []
+    for source_twb_path in source_twb_paths:
+        jobs += plan_region_variants(source_twb_path, region_names)
+        jobs += plan_pac_variants(source_twb_path, sorted(pac_to_region), slices, project, pac_to_region)
+    return generate_variants(jobs, splice, workers, force, slim, stream)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate PAC and region workbooks from the templates")
+    engine = parser.add_mutually_exclusive_group()
+    engine.add_argument("--splice", action="store_true",
+                        help="splice new values into the template bytes instead of re-serialising the XML")
+    engine.add_argument("--stream", action="store_true",
+                        help="rewrite each workbook in one streaming pass, for workbooks too large to hold in memory")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="number of worker processes to generate variants with")
+    parser.add_argument("--force", action="store_true",
+                        help="regenerate every workbook even if the build cache says it is unchanged")
+    # Off by default: a slice is still a frozen copy of every row (the NSW calcs need them), so it
+    # goes stale when the data changes and Tableau loads no less data than from the live file
+    parser.add_argument("--slices", action="store_true",
+                        help="connect PAC workbooks to a snapshot of the data in their region folder "
+                             "instead of the live statewide Excel file")
+    parser.add_argument("--project-columns", action="store_true",
+                        help="with --slices, write only the data columns the dashboards use (see column_graph.py)")
+    parser.add_argument("--slim", action="store_true",
+                        help="strip worksheets, layout caches and thumbnails the printed pages don't need")
+    parser.add_argument("--catalog", action="store_true",
+                        help="only update the report catalog and list the discovered areas and problem exports")
+    args = parser.parse_args()
+
+    source_files = [
+        r"telephone\templates\NSW Police Service Assessment Telephone.twb",
+        r"walkin\templates\NSW Police Service Assessment Walk-in.twb",
+    ]
+    if args.catalog:
+        pac_to_region, region_names = discover_areas(source_files)
+        print(f"Found {len(pac_to_region)} PACs in {len(region_names)} regions: {region_names}")
+    else:
+        create_all_templates(source_files, args.splice, args.workers, args.force, args.slices,
+                             args.project_columns, args.slim, args.stream)
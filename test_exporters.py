@@ -0,0 +1,30 @@
+import importlib
+import shutil
+from pathlib import Path
+
+import pandas as pd
+
+from exporters import ScriptedBackend, WarmSessionExporter
+from geography import load_geography_index
+from template_all import REGION_ALIASES
+
+TEMPLATE = Path("walkin/templates/NSW Police Service Assessment Walk-in.twb")
+
+def test_warm_session_sets_worksheet_filters_for_every_row(tmp_path):
+    automation = importlib.import_module('tableau-automation')
+    workbook = tmp_path / TEMPLATE.name
+    shutil.copy2(TEMPLATE, workbook)
+    filter_file = tmp_path / "filter.xlsx"
+    rows = [('Blacktown', 'Central Metropolitan'), ('Auburn', 'South West Metropolitan')]
+    pd.DataFrame(rows, columns=['Area', 'Region']).to_excel(filter_file, index=False)
+
+    backend = ScriptedBackend(load_delay=0, print_delay=0, write_time=0)
+    exporter = WarmSessionExporter(backend, REGION_ALIASES, area_value=load_geography_index(workbook).area_value)
+    automation.process_filter_file(filter_file, workbook, None, tmp_path / "out", exporter=exporter,
+                                   ledger_path=tmp_path / "ledger.jsonl")
+
+    # One load for the batch; row 2's PDF is filtered to row 2's area, not row 1's
+    assert backend.opens == 1
+    assert backend.filters['Areas PAC'] == {'"PAC - Auburn"'}
+    assert backend.filters['Areas Region'] == {'"South West Metropolitan"'}
+    assert backend.parameters['Selected PAC'] == 'Auburn'
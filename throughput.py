@@ -0,0 +1,125 @@
+import argparse
+import importlib
+import itertools
+import json
+import shutil
+import tempfile
+import time
+from pathlib import Path
+
+import pandas as pd
+
+import tracing
+from exporters import CommandLineExporter
+from fake_tableau import LOAD_DELAY, PRINT_DELAY, WRITE_TIME, install_shim
+from geography import GeographyIndex
+from pipeline import run_filter_pipeline
+
+# process_filter_file and schedule_filter_file live in the hyphenated main script
+automation = importlib.import_module('tableau-automation')
+
+# Batch drivers the harness can measure
+MODES = ('sequential', 'pipeline', 'scheduled')
+
+RESULTS_PATH = Path("throughput_results.jsonl")
+
+def write_filter_file(workbook_path, filter_path, rows):
+    """Write a filter.xlsx of `rows` jobs cycling through the workbook's PACs with known regions"""
+    areas = sorted(GeographyIndex(workbook_path).area_regions.items())
+    if not areas:
+        raise ValueError(f"No PACs with a known region in {workbook_path}")
+    jobs = list(itertools.islice(itertools.cycle(areas), rows))
+    pd.DataFrame(jobs, columns=['Area', 'Region']).to_excel(filter_path, index=False)
+    return len(jobs)
+
+def count_pdfs(output_dir):
+    return sum(1 for _ in Path(output_dir).glob("*.pdf"))
+
+def run_batch(workbook_path, mode='sequential', rows=10, slots=2, load_delay=LOAD_DELAY,
+              print_delay=PRINT_DELAY, write_time=WRITE_TIME, fail_rate=0.0, max_retries=2,
+              backoff=1.0, timeouts=None, scratch_dir=None):
+    """
+    Run one batch against the fake tableau.exe and return its throughput figures.
+
+    The workbook is copied into a scratch folder with a generated filter.xlsx, so the
+    batch drivers run unchanged (backups, ledger, per-slot copies) without touching the repo.
+    """
+    with tempfile.TemporaryDirectory(dir=scratch_dir) as workdir:
+        workdir = Path(workdir)
+        workbook = workdir / Path(workbook_path).name
+        shutil.copy2(workbook_path, workbook)
+        filter_path = workdir / "filter.xlsx"
+        jobs = write_filter_file(workbook, filter_path, rows)
+        output_dir = workdir / "output"
+        tableau_exe = install_shim(workdir / "bin", load_delay, print_delay, write_time, fail_rate)
+
+        def exporter_factory(slot=0):
+            return CommandLineExporter(str(tableau_exe), timeouts)
+
+        start = time.perf_counter()
+        if mode == 'sequential':
+            automation.process_filter_file(filter_path, workbook, str(tableau_exe), output_dir,
+                                           timeouts, exporter_factory())
+        elif mode == 'pipeline':
+            run_filter_pipeline(filter_path, workbook, output_dir, exporter_factory())
+        elif mode == 'scheduled':
+            automation.schedule_filter_file(filter_path, workbook, output_dir, exporter_factory, slots,
+                                            max_retries=max_retries, backoff=backoff)
+        else:
+            raise ValueError(f"Unknown mode '{mode}', expected one of {MODES}")
+        wall = time.perf_counter() - start
+        completed = count_pdfs(output_dir)
+
+    return {
+        'mode': mode,
+        'workbook': Path(workbook_path).name,
+        'jobs': jobs,
+        'completed': completed,
+        'slots': slots if mode == 'scheduled' else 1,
+        'load_delay': load_delay,
+        'print_delay': print_delay,
+        'fail_rate': fail_rate,
+        'wall_seconds': wall,
+        'seconds_per_job': wall / max(1, completed),
+        'jobs_per_hour': completed * 3600 / wall if wall > 0 else 0.0,
+    }
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure batch throughput against a fake tableau.exe")
+    parser.add_argument("--workbook", default="walkin/templates/NSW Police Service Assessment Walk-in.twb",
+                        help="PAC workbook the batch exports from")
+    parser.add_argument("--modes", nargs="*", choices=MODES, default=list(MODES), help="batch drivers to measure")
+    parser.add_argument("--rows", type=int, default=10, help="filter.xlsx rows per batch")
+    parser.add_argument("--slots", type=int, default=2, help="exporter slots for the scheduled mode")
+    parser.add_argument("--load-delay", type=float, default=LOAD_DELAY, help="fake Tableau seconds to open a workbook")
+    parser.add_argument("--print-delay", type=float, default=PRINT_DELAY, help="fake Tableau seconds to print")
+    parser.add_argument("--write-time", type=float, default=WRITE_TIME, help="fake Tableau seconds to write the PDF")
+    parser.add_argument("--fail-rate", type=float, default=0.0, help="share of PACs whose first launch crashes")
+    parser.add_argument("--stable", type=float, help="override the PDF size-stability wait (seconds)")
+    parser.add_argument("--trace", help="write a per-phase trace for each mode to <trace>/<mode>")
+    parser.add_argument("--trace-memory", action="store_true", help="also record tracemalloc peaks per phase")
+    parser.add_argument("--output", default=str(RESULTS_PATH), help="JSONL file the results are appended to")
+    args = parser.parse_args()
+
+    timeouts = {'stable': args.stable} if args.stable is not None else None
+    results = []
+    for mode in args.modes:
+        print(f"\n🚦 {mode}: {args.rows} job(s)")
+        if args.trace:
+            tracing.start(args.trace_memory)
+        results.append(run_batch(args.workbook, mode, args.rows, args.slots, args.load_delay, args.print_delay,
+                                 args.write_time, args.fail_rate, timeouts=timeouts))
+        if args.trace:
+            tracing.finish(Path(args.trace) / mode)
+
+    with open(args.output, 'a', encoding='utf-8') as f:
+        for result in results:
+            f.write(json.dumps(dict(result, time=time.time())) + "\n")
+
+    print("\n" + "=" * 50)
+    for result in results:
+        print(f"📈 {result['mode']:<10} {result['completed']}/{result['jobs']} in {result['wall_seconds']:.1f}s "
+              f"= {result['jobs_per_hour']:.0f} jobs/hour ({result['seconds_per_job']:.1f}s per job, "
+              f"{result['slots']} slot(s))")
+    print(f"Results appended to {args.output}")
+    print("=" * 50)
@@ -0,0 +1,201 @@
+import json
+import math
+import os
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from pathlib import Path
+
+# Tracer recording spans for this process; None means tracing is off and span() is almost free
+ACTIVE_TRACER = None
+
+TRACE_JSONL_NAME = "trace.jsonl"
+TRACE_CHROME_NAME = "trace.json"    # load in chrome://tracing or https://ui.perfetto.dev
+
+# Per-thread current job label and stack of open spans
+_local = threading.local()
+
+def percentile(values, fraction):
+    """Nearest-rank percentile of a non-empty list"""
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, math.ceil(fraction * len(ordered)) - 1))]
+
+class Tracer:
+    """
+    Collects timed spans (name, job, thread, start, duration) from every thread.
+
+    With memory=True each span also records how far tracemalloc's traced memory rose
+    above its starting point while it was open. tracemalloc has one process-wide peak,
+    so figures for spans overlapping on other threads include each other's allocations.
+    """
+
+    def __init__(self, memory=False):
+        self.memory = memory
+        self.origin = time.perf_counter()
+        self.wall_origin = time.time()
+        self.spans = []
+        self.threads = {}
+        self.lock = threading.Lock()
+
+    def add(self, name, start, end, job=None, peak_bytes=None, **args):
+        """Record a finished span from perf_counter timestamps"""
+        thread = threading.current_thread()
+        entry = {'name': name, 'job': job, 'thread': thread.name,
+                 'start': start - self.origin, 'seconds': end - start}
+        if peak_bytes is not None:
+            entry['peak_mb'] = peak_bytes / 1e6
+        if args:
+            entry['args'] = args
+        with self.lock:
+            self.threads.setdefault(thread.name, len(self.threads) + 1)
+            self.spans.append(entry)
+
+    @contextmanager
+    def span(self, name, **args):
+        stack = getattr(_local, 'stack', None)
+        if stack is None:
+            stack = _local.stack = []
+        frame = {'child_peak': 0, 'base': 0}
+        if self.memory:
+            frame['base'] = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+        stack.append(frame)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            end = time.perf_counter()
+            stack.pop()
+            peak = None
+            if self.memory:
+                absolute = max(tracemalloc.get_traced_memory()[1], frame['child_peak'])
+                if stack:
+                    stack[-1]['child_peak'] = max(stack[-1]['child_peak'], absolute)
+                tracemalloc.reset_peak()
+                peak = max(0, absolute - frame['base'])
+            self.add(name, start, end, getattr(_local, 'job', None), peak, **args)
+
+    def summary(self):
+        """Return {'phases': {name: stats}, 'jobs': {job: {name: seconds}}} with p50/p95/max per phase"""
+        by_name = {}
+        jobs = {}
+        for entry in self.spans:
+            by_name.setdefault(entry['name'], []).append(entry)
+            if entry['job'] is not None:
+                phases = jobs.setdefault(entry['job'], {})
+                phases[entry['name']] = phases.get(entry['name'], 0.0) + entry['seconds']
+
+        phases = {}
+        for name, entries in by_name.items():
+            seconds = [entry['seconds'] for entry in entries]
+            stats = {'count': len(seconds), 'total': sum(seconds), 'p50': percentile(seconds, 0.5),
+                     'p95': percentile(seconds, 0.95), 'max': max(seconds)}
+            peaks = [entry['peak_mb'] for entry in entries if 'peak_mb' in entry]
+            if peaks:
+                stats['peak_mb'] = max(peaks)
+            phases[name] = stats
+
+        # Per-job phase totals get the same percentiles, so one slow job stands out
+        per_job = {}
+        for job_phases in jobs.values():
+            for name, seconds in job_phases.items():
+                per_job.setdefault(name, []).append(seconds)
+        job_stats = {name: {'jobs': len(values), 'p50': percentile(values, 0.5), 'p95': percentile(values, 0.95),
+                            'max': max(values)} for name, values in per_job.items()}
+        return {'phases': phases, 'jobs': jobs, 'per_job': job_stats}
+
+    def write_jsonl(self, path):
+        """One JSON object per span"""
+        with open(path, 'w', encoding='utf-8') as f:
+            for entry in self.spans:
+                f.write(json.dumps(entry) + "\n")
+
+    def write_chrome(self, path):
+        """Chrome trace-event JSON: one complete ('X') event per span, one track per thread"""
+        pid = os.getpid()
+        events = [{'name': 'thread_name', 'ph': 'M', 'pid': pid, 'tid': tid, 'args': {'name': name}}
+                  for name, tid in self.threads.items()]
+        for entry in self.spans:
+            args = dict(entry.get('args', {}))
+            if entry['job'] is not None:
+                args['job'] = entry['job']
+            if 'peak_mb' in entry:
+                args['peak_mb'] = round(entry['peak_mb'], 3)
+            events.append({'name': entry['name'], 'cat': 'export', 'ph': 'X', 'pid': pid,
+                           'tid': self.threads[entry['thread']],
+                           'ts': round(entry['start'] * 1e6), 'dur': round(entry['seconds'] * 1e6),
+                           'args': args})
+        Path(path).write_text(json.dumps({'traceEvents': events, 'displayTimeUnit': 'ms',
+                                          'otherData': {'started': self.wall_origin}}), encoding='utf-8')
+
+def start(memory=False):
+    """Start recording spans in this process (and tracemalloc, with memory=True)"""
+    global ACTIVE_TRACER
+    ACTIVE_TRACER = Tracer(memory)
+    if memory and not tracemalloc.is_tracing():
+        tracemalloc.start()
+    return ACTIVE_TRACER
+
+def stop():
+    """Stop recording and return the tracer (or None if tracing was off)"""
+    global ACTIVE_TRACER
+    tracer, ACTIVE_TRACER = ACTIVE_TRACER, None
+    if tracer is not None and tracer.memory and tracemalloc.is_tracing():
+        tracemalloc.stop()
+    return tracer
+
+@contextmanager
+def span(name, **args):
+    """Time a phase if tracing is on"""
+    tracer = ACTIVE_TRACER
+    if tracer is None:
+        yield
+        return
+    with tracer.span(name, **args):
+        yield
+
+def record(name, start, **args):
+    """Record a span that began at perf_counter() `start` and ends now, for code that can't use `with`"""
+    tracer = ACTIVE_TRACER
+    if tracer is not None:
+        tracer.add(name, start, time.perf_counter(), getattr(_local, 'job', None), **args)
+
+@contextmanager
+def job(label):
+    """Tag the spans opened on this thread with a job label ('<area> - <region>')"""
+    previous = getattr(_local, 'job', None)
+    _local.job = label
+    try:
+        yield
+    finally:
+        _local.job = previous
+
+def print_summary(summary):
+    """Print aggregate and per-job percentiles per phase"""
+    print("=" * 50)
+    print(f"⏱️ {'phase':<14} {'count':>5} {'total':>8} {'p50':>7} {'p95':>7} {'max':>7}  {'peak MB':>7}")
+    for name, stats in sorted(summary['phases'].items(), key=lambda item: -item[1]['total']):
+        peak = f"{stats['peak_mb']:.1f}" if 'peak_mb' in stats else "-"
+        print(f"   {name:<14} {stats['count']:>5} {stats['total']:>7.2f}s {stats['p50']:>6.2f}s "
+              f"{stats['p95']:>6.2f}s {stats['max']:>6.2f}s  {peak:>7}")
+    if summary['per_job']:
+        print(f"Per job ({len(summary['jobs'])} job(s)):")
+        for name, stats in sorted(summary['per_job'].items(), key=lambda item: -item[1]['p95']):
+            print(f"   {name:<14} p50 {stats['p50']:.2f}s  p95 {stats['p95']:.2f}s  max {stats['max']:.2f}s")
+    print("=" * 50)
+
+def finish(trace_dir):
+    """Stop tracing, write trace.jsonl and trace.json to trace_dir and print the summary"""
+    tracer = stop()
+    if tracer is None:
+        return None
+    trace_dir = Path(trace_dir)
+    trace_dir.mkdir(parents=True, exist_ok=True)
+    tracer.write_jsonl(trace_dir / TRACE_JSONL_NAME)
+    tracer.write_chrome(trace_dir / TRACE_CHROME_NAME)
+    summary = tracer.summary()
+    (trace_dir / "trace_summary.json").write_text(json.dumps(summary, indent=2), encoding='utf-8')
+    print_summary(summary)
+    print(f"📝 Trace written to {trace_dir / TRACE_JSONL_NAME} and {trace_dir / TRACE_CHROME_NAME}")
+    return summary
@@ -0,0 +1,701 @@
+import hashlib
+import io
+import os
+import re
+import shutil
+import tempfile
+import xml.etree.ElementTree as ET
+from pathlib import Path
+from xml.sax.saxutils import escape, unescape
+
+from xml_backend import NAMESPACE_PREFIXES, get_backend
+
+# Region names as they appear in the region tuple <value> nodes
+REGION_VALUE_TEXTS = ['"Northern"', '"Southern"', '"Western"']
+
+def is_region_value(text):
+    """Return True if a <value> text node holds a region tuple"""
+    return bool(text) and ("Metropolitan" in text or text in REGION_VALUE_TEXTS)
+
+def find_categorical_groupfilters(root, column_name, backend=None):
+    """Return the groupfilter nodes of categorical filters on the given column"""
+    backend = backend or get_backend()
+    groupfilters = []
+    for filter_elem in backend.find_all(root, 'categorical_filters'):
+        column_attr = filter_elem.get('column')
+        if column_attr and column_name in column_attr:
+            groupfilter = filter_elem.find('groupfilter')
+            if groupfilter is not None:
+                groupfilters.append(groupfilter)
+    return groupfilters
+
+class VariantMixin:
+    """Variant recipes shared by the DOM, splice and stream templates"""
+
+    def apply_pac_variant(self, pac_name, region, prefix, region_pacs, region_aliases, data_file=None):
+        """Patch the template for one PAC (optionally onto its own data file)"""
+        if data_file is not None:
+            self.set_connection_file(data_file)
+        self.set_region_filter(region)
+        self.set_pac_filter(f'"{prefix} - {pac_name}"')
+
+        pac_domain = [(f'"{prefix} - {pac}"', pac) for pac in sorted(region_pacs)]
+        self.set_parameter(self.parameter_1_columns, f'"{prefix} - {pac_name}"', pac_name, pac_domain)
+
+        self.set_region_values(region)
+
+        region_domain = [(f'"{reg}"', region_aliases.get(reg, reg)) for reg in sorted(region_aliases)]
+        self.set_parameter(self.parameter_2_columns, f'"{region}"',
+                           region_aliases.get(region, region), region_domain)
+
+    def apply_region_variant(self, region):
+        """Patch the region template for one region"""
+        self.set_region_filter(region)
+
+    def pac_variant(self, pac_name, region, prefix, region_pacs, region_aliases, data_file=None):
+        """Patch the template for one PAC and return the workbook bytes"""
+        self.apply_pac_variant(pac_name, region, prefix, region_pacs, region_aliases, data_file)
+        return self.to_bytes()
+
+    def region_variant(self, region):
+        """Patch the region template for one region and return the serialised workbook bytes"""
+        self.apply_region_variant(region)
+        return self.to_bytes()
+
+    def save(self, output_path):
+        """Write the current variant to disk"""
+        write_variant(output_path, self.to_bytes())
+
+class WorkbookTemplate(VariantMixin):
+    """
+    A .twb template parsed once, with every node a variant can change indexed up front.
+
+    Each call to pac_variant/region_variant patches only the indexed nodes in place
+    and serialises the tree, so generating N variants costs one parse and N writes.
+    The tree lives in the XML backend from xml_backend (lxml when installed).
+    """
+
+    def __init__(self, source_twb_path=None, data=None, backend=None):
+        self.source_path = Path(source_twb_path) if source_twb_path else None
+        self.backend = backend or get_backend()
+        if data is not None:
+            self.root = self.backend.fromstring(data)
+        else:
+            self.root = self.backend.parse(self.source_path)
+
+        # Index the mutation sites once
+        self.parameter_1_columns = self.backend.find_all(self.root, 'parameter_1_columns')
+        self.parameter_2_columns = self.backend.find_all(self.root, 'parameter_2_columns')
+        self.region_groupfilters = find_categorical_groupfilters(self.root, 'Areas Region', self.backend)
+        self.pac_groupfilters = find_categorical_groupfilters(self.root, 'Areas PAC', self.backend)
+        self.region_values = [v for v in self.backend.find_all(self.root, 'values') if is_region_value(v.text)]
+        self.excel_connections = self.backend.find_all(self.root, 'excel_connections')
+        self.write = self.backend.writer(self.root)
+
+    def set_connection_file(self, filename):
+        """Point every Excel connection at the given data file"""
+        for connection_elem in self.excel_connections:
+            connection_elem.set('filename', filename)
+
+    def set_region_filter(self, region):
+        """Point every Areas Region filter at the given region"""
+        for groupfilter in self.region_groupfilters:
+            groupfilter.set('member', f'"{region}"')
+
+    def set_pac_filter(self, member):
+        """Point every Areas PAC filter at the given quoted member"""
+        for groupfilter in self.pac_groupfilters:
+            groupfilter.set('member', member)
+
+    def set_region_values(self, region):
+        """Rewrite every region tuple value to the given region"""
+        for value_elem in self.region_values:
+            value_elem.text = f'"{region}"'
+
+    def set_parameter(self, columns, value, alias, domain=None):
+        """Set a list parameter's current value and replace its domain with (key, alias) pairs"""
+        for column_elem in columns:
+            column_elem.set('value', value)
+            column_elem.set('alias', alias)
+
+            calculation_elem = column_elem.find('calculation')
+            if calculation_elem is not None:
+                calculation_elem.set('formula', value)
+
+            if domain is None:
+                continue
+
+            aliases_elem = column_elem.find('aliases')
+            if aliases_elem is not None:
+                aliases_elem.clear()
+                for key, member_alias in domain:
+                    self.backend.sub_element(aliases_elem, 'alias', {'key': key, 'value': member_alias})
+
+            members_elem = column_elem.find('members')
+            if members_elem is not None:
+                members_elem.clear()
+                for key, member_alias in domain:
+                    self.backend.sub_element(members_elem, 'member', {'alias': member_alias, 'value': key})
+
+    def to_bytes(self):
+        """Serialise the current tree exactly as tree.write(..., xml_declaration=True) would"""
+        return self.write()
+
+# Start tags, attributes and text-only <value> nodes, allowing '>' inside quoted values
+TAG_RE = r"<{name}\b(?:[^>'\"]|'[^']*'|\"[^\"]*\")*>"
+ATTR_RE = re.compile(rb"""\s([\w:.-]+)=(?:'([^']*)'|"([^"]*)")""")
+VALUE_RE = re.compile(rb"<value(?:\s[^>]*)?>([^<]*)</value>")
+XML_ENTITIES = {'"': '&quot;', "'": '&apos;'}
+XML_UNESCAPES = {'&quot;': '"', '&apos;': "'"}
+
+def tag_regex(name):
+    """Compile a regex matching start tags of the given element name"""
+    return re.compile(TAG_RE.format(name=re.escape(name)).encode())
+
+def escape_attr(value):
+    """Escape an attribute value the way Tableau writes it"""
+    return escape(value, XML_ENTITIES).encode('utf-8')
+
+def escape_text(value):
+    """Escape a text node the way Tableau writes it"""
+    return escape(value, {'"': '&quot;'}).encode('utf-8')
+
+def read_attr(data, start, end, name):
+    """Return (value, value_start, value_end) for an attribute inside a start tag, or None"""
+    for match in ATTR_RE.finditer(data, start, end):
+        if match.group(1) == name:
+            group = 2 if match.group(2) is not None else 3
+            raw = match.group(group)
+            return unescape(raw.decode('utf-8'), XML_UNESCAPES), match.start(group), match.end(group)
+    return None
+
+class Site:
+    """A replaceable byte range in a template, with the text it originally held"""
+
+    __slots__ = ('start', 'end', 'original', 'replacement', 'prefix', 'suffix', 'indents')
+
+    def __init__(self, start, end, original, prefix=b'', suffix=b'', indents=None):
+        self.start = start
+        self.end = end
+        self.original = original
+        self.replacement = None
+        self.prefix = prefix
+        self.suffix = suffix
+        self.indents = indents
+
+    def set(self, replacement):
+        """Replace the site's bytes in subsequent writes"""
+        self.replacement = replacement
+
+class SpliceTemplate(VariantMixin):
+    """
+    A .twb template held as raw bytes with the byte offsets of every mutable node recorded once.
+
+    Variants are written by copying the unchanged byte ranges between those offsets
+    and inserting only the new values, so every other byte matches the template.
+    """
+
+    def __init__(self, source_twb_path=None, data=None):
+        self.source_path = Path(source_twb_path) if source_twb_path else None
+        self.data = data if data is not None else self.source_path.read_bytes()
+        self.sites = []
+        self.sites_by_span = {}
+        self.columns_by_attr = {}
+
+        self.parameter_1_columns = self.index_columns(b'name', '[Parameter 1]')
+        self.parameter_2_columns = self.index_columns(b'name', '[Parameter 2]')
+        self.region_groupfilters = self.index_groupfilters('Areas Region')
+        self.pac_groupfilters = self.index_groupfilters('Areas PAC')
+        self.region_values = []
+        for match in VALUE_RE.finditer(self.data):
+            text = unescape(match.group(1).decode('utf-8'), XML_UNESCAPES)
+            if is_region_value(text):
+                self.region_values.append(self.add_site(match.start(1), match.end(1), text))
+        # Indexed on first use, so layout_hash still covers the data source of unsliced workbooks
+        self.excel_connections = None
+
+    def add_site(self, start, end, original, prefix=b'', suffix=b'', indents=None):
+        """Record a replaceable byte range and return its handle, reusing an existing one"""
+        site = self.sites_by_span.get((start, end))
+        if site is None:
+            site = Site(start, end, original, prefix, suffix, indents)
+            self.sites_by_span[(start, end)] = site
+            self.sites.append(site)
+        return site
+
+    def attr_site(self, start, end, name):
+        """Record the value of an attribute in a start tag, or where it would be inserted"""
+        found = read_attr(self.data, start, end, name)
+        if found is not None:
+            return self.add_site(found[1], found[2], found[0])
+        # ElementTree appends missing attributes after the existing ones
+        insert_at = end - 2 if self.data[end - 2:end] == b'/>' else end - 1
+        while self.data[insert_at - 1:insert_at].isspace():
+            insert_at -= 1
+        return self.add_site(insert_at, insert_at, None, b' ' + name + b"='", b"'")
+
+    def block_site(self, body_start, body_end, tag):
+        """Record the children of a <tag>...</tag> block inside the given range"""
+        open_match = re.compile(b'<' + tag + b'>').search(self.data, body_start, body_end)
+        if open_match is None:
+            return None
+        close = self.data.find(b'</' + tag + b'>', open_match.end(), body_end)
+        if close == -1:
+            return None
+        inner = self.data[open_match.end():close]
+        child_indent = re.match(rb'\s*', inner).group(0)
+        closing_indent = inner[len(inner.rstrip()):]
+        return self.add_site(open_match.end(), close, None, indents=(child_indent, closing_indent))
+
+    def index_columns(self, attr_name, attr_value):
+        """Record the value/alias/formula/aliases/members sites of every column matching an attribute"""
+        key = (attr_name, attr_value)
+        if key in self.columns_by_attr:
+            return self.columns_by_attr[key]
+        columns = []
+        for match in tag_regex('column').finditer(self.data):
+            found = read_attr(self.data, match.start(), match.end(), attr_name)
+            if found is None or found[0] != attr_value:
+                continue
+            caption = read_attr(self.data, match.start(), match.end(), b'caption')
+            column = {
+                'caption': caption[0] if caption else None,
+                'value': self.attr_site(match.start(), match.end(), b'value'),
+                'alias': self.attr_site(match.start(), match.end(), b'alias'),
+                'formula': None,
+                'aliases': None,
+                'members': None,
+            }
+            if not match.group(0).endswith(b'/>'):
+                body_end = self.data.find(b'</column>', match.end())
+                calculation = tag_regex('calculation').search(self.data, match.end(), body_end)
+                if calculation is not None:
+                    column['formula'] = self.attr_site(calculation.start(), calculation.end(), b'formula')
+                column['aliases'] = self.block_site(match.end(), body_end, b'aliases')
+                column['members'] = self.block_site(match.end(), body_end, b'members')
+            columns.append(column)
+        self.columns_by_attr[key] = columns
+        return columns
+
+    def index_groupfilters(self, column_name):
+        """Record the member site of the groupfilter under each categorical filter on a column"""
+        groupfilters = []
+        for match in tag_regex('filter').finditer(self.data):
+            if match.group(0).endswith(b'/>'):
+                continue
+            filter_class = read_attr(self.data, match.start(), match.end(), b'class')
+            column_attr = read_attr(self.data, match.start(), match.end(), b'column')
+            if filter_class is None or filter_class[0] != 'categorical':
+                continue
+            if column_attr is None or column_name not in column_attr[0]:
+                continue
+            filter_end = self.data.find(b'</filter>', match.end())
+            groupfilter = tag_regex('groupfilter').search(self.data, match.end(), filter_end)
+            if groupfilter is not None:
+                groupfilters.append(self.attr_site(groupfilter.start(), groupfilter.end(), b'member'))
+        return groupfilters
+
+    def index_excel_connections(self):
+        """Record the filename site of every Excel connection"""
+        sites = []
+        for match in tag_regex('connection').finditer(self.data):
+            connection_class = read_attr(self.data, match.start(), match.end(), b'class')
+            if connection_class is not None and connection_class[0] == 'excel-direct':
+                sites.append(self.attr_site(match.start(), match.end(), b'filename'))
+        return sites
+
+    def set_connection_file(self, filename):
+        """Point every Excel connection at the given data file"""
+        if self.excel_connections is None:
+            self.excel_connections = self.index_excel_connections()
+        for site in self.excel_connections:
+            site.set(escape_attr(filename))
+
+    def set_region_filter(self, region):
+        """Point every Areas Region filter at the given region"""
+        for site in self.region_groupfilters:
+            site.set(escape_attr(f'"{region}"'))
+
+    def set_pac_filter(self, member):
+        """Point every Areas PAC filter at the given quoted member"""
+        for site in self.pac_groupfilters:
+            site.set(escape_attr(member))
+
+    def set_region_values(self, region, sites=None):
+        """Rewrite every region tuple value (or just the given sites) to the given region"""
+        for site in self.region_values if sites is None else sites:
+            site.set(escape_text(f'"{region}"'))
+
+    def set_parameter(self, columns, value, alias, domain=None):
+        """Set a list parameter's current value and replace its domain with (key, alias) pairs"""
+        for column in columns:
+            column['value'].set(escape_attr(value))
+            column['alias'].set(escape_attr(alias))
+            if column['formula'] is not None:
+                column['formula'].set(escape_attr(value))
+
+            if domain is None:
+                continue
+
+            if column['aliases'] is not None:
+                column['aliases'].set(self.render_block(column['aliases'], [
+                    b"<alias key='" + escape_attr(key) + b"' value='" + escape_attr(member_alias) + b"' />"
+                    for key, member_alias in domain
+                ]))
+            if column['members'] is not None:
+                column['members'].set(self.render_block(column['members'], [
+                    b"<member alias='" + escape_attr(member_alias) + b"' value='" + escape_attr(key) + b"' />"
+                    for key, member_alias in domain
+                ]))
+
+    def find_member_value(self, alias):
+        """Return the value of the first <member> with the given alias, or None"""
+        for match in tag_regex('member').finditer(self.data):
+            found = read_attr(self.data, match.start(), match.end(), b'alias')
+            if found is not None and found[0] == alias:
+                value = read_attr(self.data, match.start(), match.end(), b'value')
+                return value[0] if value else ''
+        return None
+
+    def render_block(self, site, children):
+        """Lay out replacement children with the template's indentation"""
+        child_indent, closing_indent = site.indents
+        return b''.join(child_indent + child for child in children) + closing_indent
+
+    def write(self, stream):
+        """Stream the current variant by copying unchanged ranges around the patched sites"""
+        view = memoryview(self.data)
+        position = 0
+        self.sites.sort(key=lambda site: site.start)
+        for site in self.sites:
+            if site.replacement is None:
+                continue
+            stream.write(view[position:site.start])
+            stream.write(site.prefix + site.replacement + site.suffix)
+            position = site.end
+        stream.write(view[position:])
+
+    def layout_hash(self):
+        """Hash the bytes outside every mutable site, so it is the same whatever values are selected"""
+        digest = hashlib.sha256()
+        view = memoryview(self.data)
+        position = 0
+        for site in sorted(self.sites, key=lambda site: site.start):
+            digest.update(view[position:site.start])
+            position = site.end
+        digest.update(view[position:])
+        return digest.hexdigest()
+
+    def to_bytes(self):
+        """Return the current variant as bytes"""
+        stream = io.BytesIO()
+        self.write(stream)
+        return stream.getvalue()
+
+# Bytes read per parser feed and copied per write when streaming
+STREAM_CHUNK_SIZE = 1 << 20
+
+# Serialised pieces buffered before they are encoded and written out
+STREAM_FLUSH_PIECES = 4096
+
+# Attribute escaping as ElementTree's serialiser does it, so streamed output matches tree.write byte for byte
+ATTRIB_ENTITIES = {'"': "&quot;", "\r": "&#13;", "\n": "&#10;", "\t": "&#09;"}
+
+def escape_attrib(text):
+    return escape(text, ATTRIB_ENTITIES)
+
+def escape_cdata(text):
+    return escape(text)
+
+class StreamRewriter:
+    """
+    Parser target that rewrites a workbook as it is parsed.
+
+    Start tags, text and end tags are written out as soon as they are seen, in the form
+    ElementTree's serialiser gives them, so no tree is built and memory only grows with
+    nesting depth. The root start tag goes out last (via header()), because ElementTree
+    declares every namespace used anywhere in the document on the root element.
+    """
+
+    def __init__(self, template, body):
+        self.template = template
+        self.body = body
+        self.pieces = []
+        self.stack = []
+        self.root_tag = None
+        self.qnames = {}
+        self.namespaces = {}
+        self.open_tag = False       # last start tag still waiting for its '>' or ' />'
+        self.skip = 0               # depth inside an <aliases>/<members> block being replaced
+        self.drop_tail = False      # ElementTree's clear() drops the tail of a replaced block
+        self.value_text = None      # text of a <value> collected until its first child or end
+        self.changes = 0
+
+    def qname(self, name):
+        """prefix:local for a {uri}local name, choosing prefixes as ElementTree does"""
+        qname = self.qnames.get(name)
+        if qname is None:
+            qname = name
+            if name[:1] == "{":
+                uri, local = name[1:].rsplit("}", 1)
+                prefix = self.namespaces.get(uri)
+                if prefix is None:
+                    prefix = NAMESPACE_PREFIXES.get(uri) or f"ns{len(self.namespaces)}"
+                    if prefix != "xml":
+                        self.namespaces[uri] = prefix
+                qname = f"{prefix}:{local}"
+            self.qnames[name] = qname
+        return qname
+
+    def write(self, text):
+        self.pieces.append(text)
+        if len(self.pieces) >= STREAM_FLUSH_PIECES:
+            self.flush()
+
+    def flush(self):
+        self.body.write("".join(self.pieces).encode('utf-8', 'xmlcharrefreplace'))
+        self.pieces.clear()
+
+    def close_start(self):
+        if self.open_tag:
+            self.write(">")
+            self.open_tag = False
+
+    def flush_value(self):
+        """Write the collected <value> text, rewritten if it is a region tuple"""
+        if self.value_text is None:
+            return
+        text = "".join(self.value_text)
+        self.value_text = None
+        if text:
+            new_text = self.template.region_value_for(text)
+            if new_text is not None:
+                text = new_text
+                self.changes += 1
+            self.close_start()
+            self.write(escape_cdata(text))
+
+    def start(self, tag, attrib):
+        self.drop_tail = False
+        if self.skip:
+            self.skip += 1
+            return
+        self.flush_value()
+        template = self.template
+        edit = None
+        parent = self.stack[-1][1] if self.stack else None
+        replacement = None
+
+        if parent is not None and tag not in parent['seen']:
+            # Only the first matching child is changed, as Element.find() would return it
+            if tag == 'calculation' and 'formula' in parent:
+                parent['seen'].add(tag)
+                attrib['formula'] = parent['formula']
+            elif tag in ('aliases', 'members') and parent.get('domain') is not None:
+                parent['seen'].add(tag)
+                replacement = tag
+            elif tag == 'groupfilter' and 'member' in parent:
+                parent['seen'].add(tag)
+                attrib['member'] = parent['member']
+                self.changes += 1
+
+        if replacement is not None:
+            self.close_start()
+            self.write(template.render_domain(replacement, parent['domain']))
+            self.skip = 1
+            return
+
+        if tag == 'column':
+            edit = template.column_edit(attrib)
+            if edit is not None:
+                self.changes += edit['matches']
+        elif tag == 'filter':
+            edit = template.filter_edit(attrib)
+        elif tag == 'connection' and template.connection_file is not None:
+            if attrib.get('class') == 'excel-direct':
+                attrib['filename'] = template.connection_file
+        elif tag == 'value' and template.region_value is not None:
+            self.value_text = []
+
+        qname = self.qname(tag)
+        attributes = "".join(f' {self.qname(key)}="{escape_attrib(value)}"' for key, value in attrib.items())
+        if self.root_tag is None:
+            self.root_tag = (qname, attributes)
+        else:
+            self.close_start()
+            self.write("<" + qname + attributes)
+        self.open_tag = True
+        self.stack.append((qname, edit))
+
+    def data(self, text):
+        if self.skip or self.drop_tail:
+            return
+        if self.value_text is not None:
+            self.value_text.append(text)
+            return
+        self.close_start()
+        self.write(escape_cdata(text))
+
+    def end(self, tag):
+        self.drop_tail = False
+        if self.skip:
+            self.skip -= 1
+            self.drop_tail = not self.skip
+            return
+        self.flush_value()
+        qname, edit = self.stack.pop()
+        if self.open_tag:
+            self.write(" />")
+            self.open_tag = False
+        else:
+            self.write(f"</{qname}>")
+
+    def close(self):
+        self.flush()
+
+    def header(self):
+        """XML declaration and root start tag, with the namespace declarations ElementTree would write"""
+        declarations = "".join(f' xmlns:{prefix}="{escape_attrib(uri)}"'
+                               for uri, prefix in sorted(self.namespaces.items(), key=lambda item: item[1]))
+        qname, attributes = self.root_tag
+        return (f"<?xml version='1.0' encoding='utf-8'?>\n<{qname}{declarations}{attributes}"
+                .encode('utf-8', 'xmlcharrefreplace'))
+
+class StreamTemplate(VariantMixin):
+    """
+    A .twb template rewritten in one forward pass each time a variant is written.
+
+    The setters only record the new values; write() then parses the source in chunks
+    and writes each node as it goes, so peak memory stays flat however large the
+    workbook is. Output is byte-identical to WorkbookTemplate with the stdlib backend.
+    """
+
+    def __init__(self, source_twb_path=None, data=None):
+        self.source_path = Path(source_twb_path) if source_twb_path else None
+        self.data = data
+        self.parameters = {}
+        self.filters = {}
+        self.region_value = None
+        self.region_originals = None
+        self.connection_file = None
+
+        # Columns are selected by an attribute value instead of indexed node handles
+        self.parameter_1_columns = self.index_columns('name', '[Parameter 1]')
+        self.parameter_2_columns = self.index_columns('name', '[Parameter 2]')
+
+    def index_columns(self, attr_name, attr_value):
+        """Return the selector for columns whose attribute has the given value"""
+        return (attr_name, attr_value)
+
+    def set_connection_file(self, filename):
+        """Point every Excel connection at the given data file"""
+        self.connection_file = filename
+
+    def set_region_filter(self, region):
+        """Point every Areas Region filter at the given region"""
+        self.filters['Areas Region'] = f'"{region}"'
+
+    def set_pac_filter(self, member):
+        """Point every Areas PAC filter at the given quoted member"""
+        self.filters['Areas PAC'] = member
+
+    def set_region_values(self, region, originals=None):
+        """Rewrite every region tuple value (or only those holding one of `originals`) to the given region"""
+        self.region_value = f'"{region}"'
+        self.region_originals = set(originals) if originals is not None else None
+
+    def set_parameter(self, columns, value, alias, domain=None):
+        """Set a list parameter's current value and replace its domain with (key, alias) pairs"""
+        previous = self.parameters.get(columns)
+        if domain is None and previous is not None:
+            # Like the DOM template, a call without a domain keeps the one already set
+            domain = previous[2]
+        self.parameters[columns] = (value, alias, domain)
+
+    def column_edit(self, attrib):
+        """Apply the parameter rules to a column's attributes; returns what its children need"""
+        edit = None
+        for (attr_name, attr_value), (value, alias, domain) in self.parameters.items():
+            if attrib.get(attr_name) != attr_value:
+                continue
+            attrib['value'] = value
+            attrib['alias'] = alias
+            edit = edit or {'seen': set(), 'matches': 0}
+            edit['matches'] += 1
+            edit['formula'] = value
+            if domain is not None:
+                edit['domain'] = domain
+        return edit
+
+    def filter_edit(self, attrib):
+        """Return the groupfilter member for a categorical filter on a rewritten column"""
+        column_attr = attrib.get('column')
+        if attrib.get('class') != 'categorical' or not column_attr:
+            return None
+        edit = None
+        for column_name, member in self.filters.items():
+            if column_name in column_attr:
+                edit = {'seen': set(), 'member': member}
+        return edit
+
+    def region_value_for(self, text):
+        """The new text for a <value> node, or None if it is left as it is"""
+        if self.region_originals is not None:
+            return self.region_value if text in self.region_originals else None
+        return self.region_value if is_region_value(text) else None
+
+    def render_domain(self, tag, domain):
+        """An <aliases> or <members> block as ElementTree writes it after clear() and SubElement()"""
+        if not domain:
+            return f"<{tag} />"
+        if tag == 'aliases':
+            children = "".join(f'<alias key="{escape_attrib(key)}" value="{escape_attrib(alias)}" />'
+                               for key, alias in domain)
+        else:
+            children = "".join(f'<member alias="{escape_attrib(alias)}" value="{escape_attrib(key)}" />'
+                               for key, alias in domain)
+        return f"<{tag}>{children}</{tag}>"
+
+    def open_source(self):
+        return io.BytesIO(self.data) if self.data is not None else open(self.source_path, 'rb')
+
+    def write(self, stream):
+        """Stream the current variant to a binary stream and return the number of nodes changed"""
+        with tempfile.TemporaryFile() as body:
+            rewriter = StreamRewriter(self, body)
+            parser = ET.XMLParser(target=rewriter)
+            with self.open_source() as source:
+                for chunk in iter(lambda: source.read(STREAM_CHUNK_SIZE), b''):
+                    parser.feed(chunk)
+            parser.close()
+            stream.write(rewriter.header())
+            body.seek(0)
+            shutil.copyfileobj(body, stream, STREAM_CHUNK_SIZE)
+        return rewriter.changes
+
+    def to_bytes(self):
+        """Return the current variant as bytes"""
+        stream = io.BytesIO()
+        self.write(stream)
+        return stream.getvalue()
+
+    def save(self, output_path):
+        """Stream the current variant to disk, replacing the file only once it is complete"""
+        output_path = Path(output_path)
+        temp_path = output_path.with_name(output_path.name + '.tmp')
+        with open(temp_path, 'wb') as f:
+            changes = self.write(f)
+        os.replace(temp_path, output_path)
+        return changes
+
+def load_template(source_twb_path, splice=False, data=None, stream=False):
+    """Load a template for variant generation, as a parsed tree, spliceable bytes or a streamed rewrite"""
+    if stream:
+        return StreamTemplate(source_twb_path, data)
+    if splice:
+        return SpliceTemplate(source_twb_path, data)
+    return WorkbookTemplate(source_twb_path, data)
+
+def write_variant(output_path, data):
+    """Write variant bytes to disk"""
+    Path(output_path).write_bytes(data)
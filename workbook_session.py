@@ -0,0 +1,65 @@
+import shutil
+from pathlib import Path
+
+import tracing
+from geography import load_geography_index
+from template_all import REGION_ALIASES
+from twb_engine import SpliceTemplate, write_variant
+
+class WorkbookSession:
+    """
+    A workbook kept in memory for a whole batch of Selected PAC/Region changes.
+
+    The workbook is read, indexed and backed up once. Each select() only swaps the
+    bytes behind precomputed handles; materialise() writes the file when an export
+    actually needs it.
+    """
+
+    def __init__(self, workbook_path, geography=None, backup=True):
+        self.workbook_path = Path(workbook_path)
+        if backup:
+            with tracing.span('backup'):
+                backup_path = self.workbook_path.with_suffix('.twb.backup')
+                shutil.copy2(self.workbook_path, backup_path)
+            print(f"Backup created: {backup_path}")
+
+        with tracing.span('parse'):
+            self.geography = geography or load_geography_index(self.workbook_path)
+            self.template = SpliceTemplate(self.workbook_path)
+
+            # Node handles for everything a row changes
+            self.pac_columns = self.template.index_columns(b'caption', 'Selected PAC')
+            self.region_columns = self.template.index_columns(b'caption', 'Selected Region')
+        self.region_values = [site for site in self.template.region_values
+                              if site.original == '"South West Metropolitan"']
+        self.selection = None
+        self.materialised = None
+
+    @property
+    def workbook_hash(self):
+        """Content hash of the workbook that ignores the Selected PAC/Region values"""
+        return self.template.layout_hash()
+
+    def select(self, area, region):
+        """Point the Selected PAC/Region parameters and filters at a new area; returns the change count"""
+        with tracing.span('mutate'):
+            new_value = self.geography.area_value(area)
+            self.template.set_parameter(self.pac_columns, new_value, area)
+            self.template.set_pac_filter(new_value)
+            self.template.set_region_filter(region)
+            self.template.set_region_values(region, self.region_values)
+            self.template.set_parameter(self.region_columns, f'"{region}"', REGION_ALIASES.get(region, region))
+        self.selection = (area, region)
+
+        return (len(self.pac_columns) + len(self.template.pac_groupfilters)
+                + len(self.template.region_groupfilters) + len(self.region_values) + len(self.region_columns))
+
+    def materialise(self, output_path=None):
+        """Write the current selection to disk (the session's workbook by default) if not already written"""
+        output_path = Path(output_path) if output_path else self.workbook_path
+        if self.materialised == (output_path, self.selection):
+            return output_path
+        with tracing.span('write'):
+            write_variant(output_path, self.template.to_bytes())
+        self.materialised = (output_path, self.selection)
+        return output_path
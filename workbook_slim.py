@@ -0,0 +1,150 @@
+import argparse
+import time
+import xml.etree.ElementTree as ET
+from pathlib import Path
+
+from column_graph import ColumnGraph
+
+# The dashboards export_single_pdf prints; everything else is only there for authoring
+PRINTED_DASHBOARDS = ('Page 1', 'Page 2', 'Page 3', 'Page 4')
+
+# Bump when slimming removes something new, so the build cache regenerates the variants
+SLIM_VERSION = 1
+
+# Keep Tableau's user: attribute prefix when the tree is serialised (rather than ns0:)
+ET.register_namespace('user', 'http://www.tableausoftware.com/xml/user')
+
+class SlimmingError(Exception):
+    """A slimmed workbook no longer references everything the printed pages need"""
+
+def zone_worksheets(dashboard, worksheet_names):
+    """Return the worksheet names placed in a dashboard's zones"""
+    return {zone.get('name') for zone in dashboard.iter('zone') if zone.get('name') in worksheet_names}
+
+def mentions_datasource(worksheet, dependencies, datasource):
+    """Return True if anything in the worksheet outside a dependency block refers to the datasource"""
+    needle = f"[{datasource}]."
+    inside = {id(elem) for elem in dependencies.iter()}
+    for elem in worksheet.iter():
+        if id(elem) in inside:
+            continue
+        if needle in (elem.text or '') or any(needle in value for value in elem.attrib.values()):
+            return True
+    return False
+
+def slim_root(root, dashboards=PRINTED_DASHBOARDS):
+    """
+    Remove everything the printed dashboards can't reach from a parsed workbook, in place.
+
+    Drops other dashboards and the worksheets only they used, their windows, every
+    zone layout cache, the thumbnails and unreferenced datasource-dependencies, and
+    hides the remaining worksheet tabs so "Entire workbook" prints just the pages.
+    Returns a dict of removal counts.
+    """
+    stats = {'dashboards': 0, 'worksheets': 0, 'windows': 0, 'layout-caches': 0,
+             'thumbnails': 0, 'datasource-dependencies': 0}
+    worksheets_elem = root.find('worksheets')
+    dashboards_elem = root.find('dashboards')
+    worksheet_names = {worksheet.get('name') for worksheet in worksheets_elem.findall('worksheet')}
+
+    printed = [dashboard for dashboard in dashboards_elem.findall('dashboard') if dashboard.get('name') in dashboards]
+    if not printed:
+        raise SlimmingError(f"None of the printed dashboards {list(dashboards)} are in the workbook")
+    keep_dashboards = {dashboard.get('name') for dashboard in printed}
+    keep_worksheets = set()
+    for dashboard in printed:
+        keep_worksheets |= zone_worksheets(dashboard, worksheet_names)
+
+    for dashboard in dashboards_elem.findall('dashboard'):
+        if dashboard.get('name') not in keep_dashboards:
+            dashboards_elem.remove(dashboard)
+            stats['dashboards'] += 1
+    for worksheet in worksheets_elem.findall('worksheet'):
+        if worksheet.get('name') not in keep_worksheets:
+            worksheets_elem.remove(worksheet)
+            stats['worksheets'] += 1
+
+    windows = root.find('windows')
+    if windows is not None:
+        for window in windows.findall('window'):
+            if window.get('class') == 'dashboard' and window.get('name') in keep_dashboards:
+                continue
+            if window.get('class') == 'worksheet' and window.get('name') in keep_worksheets:
+                window.set('hidden', 'true')
+                continue
+            windows.remove(window)
+            stats['windows'] += 1
+
+    for zone in root.iter('zone'):
+        for layout_cache in zone.findall('layout-cache'):
+            zone.remove(layout_cache)
+            stats['layout-caches'] += 1
+
+    thumbnails = root.find('thumbnails')
+    if thumbnails is not None:
+        stats['thumbnails'] = len(thumbnails)
+        root.remove(thumbnails)
+
+    for worksheet in worksheets_elem.findall('worksheet'):
+        for view in worksheet.iter('view'):
+            for dependencies in view.findall('datasource-dependencies'):
+                if not mentions_datasource(worksheet, dependencies, dependencies.get('datasource')):
+                    view.remove(dependencies)
+                    stats['datasource-dependencies'] += 1
+    return stats
+
+def verify_slim(original, slimmed, dashboards=PRINTED_DASHBOARDS):
+    """Raise SlimmingError unless the slimmed bytes still cover everything the printed pages use"""
+    before = ColumnGraph(data=original)
+    after = ColumnGraph(data=slimmed)
+    printed = [name for name in before.dashboards if name in dashboards]
+
+    missing_dashboards = set(printed) - set(after.dashboards)
+    if missing_dashboards:
+        raise SlimmingError(f"Dashboards lost: {sorted(missing_dashboards)}")
+
+    root = ET.fromstring(slimmed)
+    worksheet_names = {worksheet.get('name') for worksheet in root.find('worksheets').findall('worksheet')}
+    for dashboard in root.find('dashboards').findall('dashboard'):
+        for zone in dashboard.iter('zone'):
+            name = zone.get('name')
+            if zone.get('type') is None and name and name not in worksheet_names and zone.get('param') is None:
+                raise SlimmingError(f"{dashboard.get('name')} has a zone for missing worksheet '{name}'")
+    known = worksheet_names | set(after.dashboards)
+    for window in root.find('windows').findall('window'):
+        if window.get('name') not in known:
+            raise SlimmingError(f"Window for missing sheet '{window.get('name')}'")
+
+    if before.required_columns(printed) != after.required_columns(printed):
+        raise SlimmingError("The printed pages read different data columns after slimming")
+    new_unresolved = set(after.unresolved(printed)) - set(before.unresolved(printed))
+    if new_unresolved:
+        raise SlimmingError(f"Fields no longer resolve after slimming: {sorted(new_unresolved)}")
+
+def slim_workbook(data, dashboards=PRINTED_DASHBOARDS):
+    """Return (slimmed bytes, removal counts) for workbook bytes, verified against the original"""
+    root = ET.fromstring(data)
+    stats = slim_root(root, dashboards)
+    slimmed = ET.tostring(root, encoding='utf-8', xml_declaration=True)
+    verify_slim(data, slimmed, dashboards)
+    return slimmed, stats
+
+def describe(stats):
+    """One-line summary of what slimming removed"""
+    return ", ".join(f"{count} {name}" for name, count in stats.items() if count)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Strip a workbook down to its printed dashboards")
+    parser.add_argument("workbook", help="path to the .twb")
+    parser.add_argument("--output", help="where to write the slimmed workbook (default: <name> slim.twb)")
+    args = parser.parse_args()
+
+    source_path = Path(args.workbook)
+    output_path = Path(args.output) if args.output else source_path.with_name(f"{source_path.stem} slim.twb")
+    start = time.perf_counter()
+    data = source_path.read_bytes()
+    slimmed, stats = slim_workbook(data)
+    output_path.write_bytes(slimmed)
+    print(f"✅ {output_path}: {len(data) / 1e6:.2f} MB -> {len(slimmed) / 1e6:.2f} MB "
+          f"in {time.perf_counter() - start:.1f}s")
+    print(f"Removed: {describe(stats) or 'nothing'}")
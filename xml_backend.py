@@ -0,0 +1,174 @@
+import argparse
+import os
+import time
+import xml.etree.ElementTree as ET
+from pathlib import Path
+
+try:
+    from lxml import etree
+except ImportError:
+    etree = None
+
+# {uri: prefix} ElementTree writes without being told, extended by register_namespace below
+NAMESPACE_PREFIXES = {
+    'http://www.w3.org/XML/1998/namespace': 'xml',
+    'http://www.w3.org/1999/xhtml': 'html',
+    'http://www.w3.org/1999/02/22-rdf-syntax-ns#': 'rdf',
+    'http://schemas.xmlsoap.org/wsdl/': 'wsdl',
+    'http://www.w3.org/2001/XMLSchema': 'xs',
+    'http://www.w3.org/2001/XMLSchema-instance': 'xsi',
+    'http://purl.org/dc/elements/1.1/': 'dc',
+}
+
+def register_namespace(prefix, uri):
+    """ET.register_namespace, also recorded in NAMESPACE_PREFIXES for the streaming writer"""
+    ET.register_namespace(prefix, uri)
+    NAMESPACE_PREFIXES[uri] = prefix
+
+# Tableau's user namespace keeps its own prefix instead of ElementTree's ns0
+register_namespace('user', 'http://www.tableausoftware.com/xml/user')
+
+# Set TWB_XML_BACKEND=stdlib (or lxml) to choose a backend; spawned worker processes inherit it
+BACKEND_ENV = "TWB_XML_BACKEND"
+
+# The searches the workbook rewrites make, compiled once per backend
+QUERIES = {
+    'parameter_1_columns': ".//column[@name='[Parameter 1]']",
+    'parameter_2_columns': ".//column[@name='[Parameter 2]']",
+    'categorical_filters': ".//filter[@class='categorical']",
+    'excel_connections': ".//connection[@class='excel-direct']",
+    'columns': ".//column",
+    'values': ".//value",
+    'members': ".//member",
+}
+
+class StdlibBackend:
+    """xml.etree.ElementTree: always available, and the reference for the serialised bytes"""
+
+    name = 'stdlib'
+
+    def __init__(self):
+        # ElementPath compiles and caches each path on first use, so the strings are the compiled form
+        self.queries = dict(QUERIES)
+
+    def fromstring(self, data):
+        return ET.fromstring(data)
+
+    def parse(self, path):
+        return ET.parse(path).getroot()
+
+    def find_all(self, root, query):
+        return root.findall(self.queries[query])
+
+    def sub_element(self, parent, tag, attrib):
+        return ET.SubElement(parent, tag, attrib)
+
+    def writer(self, root):
+        """Return a function serialising root as tree.write(..., xml_declaration=True) would"""
+        return lambda: ET.tostring(root, encoding='utf-8', xml_declaration=True)
+
+def stdlib_prefix(uri):
+    """The prefix ElementTree will write for a namespace URI (registered, or ns0)"""
+    probe = ET.tostring(ET.Element(f"{{{uri}}}probe")).decode('utf-8')
+    return probe[1:probe.index(':')]
+
+class LxmlBackend:
+    """
+    lxml: libxml2 parsing, precompiled XPath and C serialisation.
+
+    Output is byte-identical to StdlibBackend. Comments and processing instructions are
+    dropped at parse time as ElementTree drops them, and libxml2's empty-element form is
+    rewritten from '<tag/>' to '<tag />'. Documents whose namespace declarations
+    ElementTree would write differently (declared below the root, or under another
+    prefix) are serialised with ElementTree's own writer, which walks lxml trees directly.
+    """
+
+    name = 'lxml'
+
+    def __init__(self):
+        self.parser = etree.XMLParser(remove_comments=True, remove_pis=True, huge_tree=True)
+        self.queries = {name: etree.XPath(path.replace(".//", "descendant::", 1))
+                        for name, path in QUERIES.items()}
+
+    def fromstring(self, data):
+        root = etree.fromstring(data, self.parser)
+        # ElementTree only declares the namespaces that are actually used
+        etree.cleanup_namespaces(root)
+        return root
+
+    def parse(self, path):
+        return self.fromstring(Path(path).read_bytes())
+
+    def find_all(self, root, query):
+        return self.queries[query](root)
+
+    def sub_element(self, parent, tag, attrib):
+        return etree.SubElement(parent, tag, attrib)
+
+    def native_matches(self, root):
+        """True if libxml2 declares namespaces exactly where and as ElementTree would"""
+        if any(stdlib_prefix(uri) != prefix for prefix, uri in root.nsmap.items()):
+            return False
+        return all(element.nsmap == root.nsmap for element in root.iter(tag=etree.Element))
+
+    def writer(self, root):
+        if not self.native_matches(root):
+            return lambda: ET.tostring(root, encoding='utf-8', xml_declaration=True)
+        # '/>' only occurs at the end of an empty element: '>' is escaped in text and attributes
+        return lambda: etree.tostring(root, encoding='utf-8', xml_declaration=True).replace(b"/>", b" />")
+
+BACKENDS = {'stdlib': StdlibBackend, 'lxml': LxmlBackend}
+
+# One instance per backend name, so queries are compiled once per process
+_INSTANCES = {}
+
+def get_backend(name=None):
+    """Return the named backend, else $TWB_XML_BACKEND, else lxml when installed, else stdlib"""
+    name = name or os.environ.get(BACKEND_ENV) or ('lxml' if etree is not None else 'stdlib')
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown XML backend '{name}', expected one of {sorted(BACKENDS)}")
+    if name == 'lxml' and etree is None:
+        print("Warning: lxml is not installed, using the stdlib XML backend (pip install lxml)")
+        name = 'stdlib'
+    if name not in _INSTANCES:
+        _INSTANCES[name] = BACKENDS[name]()
+    return _INSTANCES[name]
+
+def time_backend(backend, data, variants):
+    """Seconds to parse once, run every query once, then mutate and serialise `variants` times"""
+    start = time.perf_counter()
+    root = backend.fromstring(data)
+    parsed = time.perf_counter()
+    sites = {query: backend.find_all(root, query) for query in QUERIES}
+    queried = time.perf_counter()
+    write = backend.writer(root)
+    outputs = []
+    for number in range(variants):
+        for column in sites['parameter_1_columns']:
+            column.set('value', f'"PAC - Benchmark {number}"')
+        outputs.append(write())
+    written = time.perf_counter()
+    return {'parse': parsed - start, 'query': queried - parsed, 'write': (written - queried) / max(1, variants),
+            'outputs': outputs}
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare the XML backends on a workbook and check the output matches")
+    parser.add_argument("workbooks", nargs="+", help=".twb files to benchmark")
+    parser.add_argument("--variants", type=int, default=10, help="mutate-and-write rounds per workbook")
+    args = parser.parse_args()
+
+    if etree is None:
+        print("❌ lxml is not installed; only the stdlib backend is available")
+        raise SystemExit(1)
+    for path in args.workbooks:
+        data = Path(path).read_bytes()
+        stdlib = time_backend(get_backend('stdlib'), data, args.variants)
+        lxml = time_backend(get_backend('lxml'), data, args.variants)
+        identical = stdlib['outputs'] == lxml['outputs']
+        print(f"{'✅' if identical else '❌'} {Path(path).name} ({len(data) / 1e6:.2f} MB): "
+              f"output {'identical' if identical else 'DIFFERS'}")
+        for phase in ('parse', 'query', 'write'):
+            print(f"   {phase:<6} stdlib {stdlib[phase] * 1e3:7.1f} ms   lxml {lxml[phase] * 1e3:7.1f} ms   "
+                  f"({stdlib[phase] / max(lxml[phase], 1e-9):.1f}x)")
+        if not identical:
+            raise SystemExit(1)